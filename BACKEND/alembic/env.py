@@ -22,6 +22,14 @@ if config.config_file_name is not None:
 
 #model database
 from src.models import Base
+from src import database_url_from_env
+from dotenv import load_dotenv
+
+# Pakai kredensial yang sama dengan aplikasi (.env) jika alembic.ini
+# masih berisi URL contoh.
+load_dotenv()
+if config.get_main_option("sqlalchemy.url", "").startswith("driver://"):
+    config.set_main_option("sqlalchemy.url", database_url_from_env().replace("%", "%%"))
 
 # Set target metadata agar Alembic bisa membaca tabel Patient
 target_metadata = Base.metadata
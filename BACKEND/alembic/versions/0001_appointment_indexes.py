@@ -0,0 +1,53 @@
+"""appointment composite indexes
+
+Revision ID: 0001_appointment_indexes
+Revises:
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_appointment_indexes'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (nama index, kolom) -- harus sama dengan __table_args__ models.Appointment
+APPOINTMENT_INDEXES = [
+    ("ix_appointments_doctor_date_time", ["doctor_id", "appointment_date", "appointment_time"]),
+    ("ix_appointments_patient_status_date", ["patient_id", "status", "appointment_date"]),
+    ("ix_appointments_created_at_id", ["created_at", "id"]),
+]
+
+# Catatan: medical_records.appointment_id dan doctors.user_id sudah UNIQUE,
+# sehingga join ke appointments/users sudah punya index dari constraint tsb.
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY agar tabel appointments tidak terkunci saat index dibangun;
+    # perintah ini tidak boleh berjalan di dalam transaksi.
+    with op.get_context().autocommit_block():
+        for name, columns in APPOINTMENT_INDEXES:
+            op.create_index(
+                name, "appointments", columns,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(APPOINTMENT_INDEXES):
+            op.drop_index(
+                name, table_name="appointments",
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,34 @@
+"""updated_at columns for conditional GET
+
+Revision ID: 0002_updated_at_columns
+Revises: 0001_appointment_indexes
+Create Date: 2026-10-18 10:15:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_updated_at_columns'
+down_revision: Union[str, Sequence[str], None] = '0001_appointment_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ["users", "doctors", "appointments", "medical_records"]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # server_default now() juga mengisi baris lama, jadi ETag langsung valid
+    for table in TABLES:
+        op.add_column(table, sa.Column("updated_at", sa.DateTime(), server_default=sa.func.now()))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in reversed(TABLES):
+        op.drop_column(table, "updated_at")
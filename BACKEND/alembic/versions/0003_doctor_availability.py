@@ -0,0 +1,137 @@
+"""structured doctor availability
+
+Revision ID: 0003_doctor_availability
+Revises: 0002_updated_at_columns
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import re
+from datetime import time
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_doctor_availability'
+down_revision: Union[str, Sequence[str], None] = '0002_updated_at_columns'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Parser jadwal teks lama disalin dari src/availability.py saat migration ini
+# ditulis: migration tidak boleh ikut berubah jika parser aplikasi berubah.
+WEEKDAYS = {
+    'senin': 0, 'selasa': 1, 'rabu': 2, 'kamis': 3,
+    'jumat': 4, "jum'at": 4, 'sabtu': 5, 'minggu': 6, 'ahad': 6,
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6,
+}
+
+_DAY = r"(?:senin|selasa|rabu|kamis|jum'?at|sabtu|minggu|ahad|monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
+_TO = r"\s*(?:-|–|s/d|sd|sampai|hingga|to)\s*"
+_CLOCK = r"(\d{1,2})[.:](\d{2})(?:\s*wib)?"
+_TOKEN_RE = re.compile(
+    r"(?P<range>" + _CLOCK + _TO + _CLOCK + r")"
+    r"|(?P<days>(?P<first>" + _DAY + r")" + _TO + r"(?P<last>" + _DAY + r"))"
+    r"|(?P<every>(?:setiap|tiap) hari|every ?day|daily)"
+    r"|(?P<day>" + _DAY + r")"
+)
+
+
+def parse_legacy_schedule(text):
+    """Teks jadwal lama -> list (weekday, start_time, end_time); [] jika tidak terbaca."""
+    intervals = []
+    days, days_have_time = set(), False
+    for match in _TOKEN_RE.finditer((text or '').lower()):
+        if match.group('range'):
+            if not days:
+                return []
+            h1, m1, h2, m2 = (int(g) for g in match.group(2, 3, 4, 5))
+            try:
+                start, end = time(h1, m1), time(h2, m2)
+            except ValueError:
+                return []
+            if end <= start:
+                return []
+            intervals.extend((day, start, end) for day in sorted(days))
+            days_have_time = True
+            continue
+
+        if days_have_time:
+            days, days_have_time = set(), False
+        if match.group('every'):
+            days.update(range(7))
+        elif match.group('days'):
+            day = WEEKDAYS[match.group('first').replace("'", "")]
+            last = WEEKDAYS[match.group('last').replace("'", "")]
+            days.add(day)
+            while day != last:
+                day = (day + 1) % 7
+                days.add(day)
+        else:
+            days.add(WEEKDAYS[match.group('day').replace("'", "")])
+
+    if days and not days_have_time:
+        return []
+    return sorted(set(intervals))
+
+
+def context_is_offline():
+    return op.get_context().as_sql
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    availability = op.create_table(
+        "doctor_availability",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("doctor_id", sa.Integer(), sa.ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("weekday", sa.Integer(), nullable=False),
+        sa.Column("start_time", sa.Time(), nullable=False),
+        sa.Column("end_time", sa.Time(), nullable=False),
+        sa.Column("slot_minutes", sa.Integer(), nullable=False, server_default="30"),
+        sa.CheckConstraint("weekday BETWEEN 0 AND 6", name="availability_weekday_check"),
+        sa.CheckConstraint("end_time > start_time", name="availability_range_check"),
+        sa.CheckConstraint("slot_minutes > 0", name="availability_slot_check"),
+    )
+    op.create_index("ix_doctor_availability_doctor_id", "doctor_availability", ["doctor_id"])
+
+    op.create_table(
+        "doctor_availability_exceptions",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("doctor_id", sa.Integer(), sa.ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False),
+        sa.Column("exception_date", sa.Date(), nullable=False),
+        sa.Column("start_time", sa.Time()),
+        sa.Column("end_time", sa.Time()),
+        sa.Column("is_available", sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.Column("slot_minutes", sa.Integer(), nullable=False, server_default="30"),
+        sa.Column("note", sa.Text()),
+    )
+    op.create_index(
+        "ix_availability_exceptions_doctor_date",
+        "doctor_availability_exceptions", ["doctor_id", "exception_date"])
+
+    # Migrasi data: parse teks doctors.schedule lama ke interval mingguan.
+    # Teks yang tidak bisa dibaca dibiarkan (dokter tsb belum punya slot).
+    if context_is_offline():
+        return
+    conn = op.get_bind()
+    rows = conn.execute(sa.text("SELECT id, schedule FROM doctors WHERE schedule IS NOT NULL")).fetchall()
+    intervals = [
+        {"doctor_id": doctor_id, "weekday": day, "start_time": start, "end_time": end, "slot_minutes": 30}
+        for doctor_id, schedule in rows
+        for day, start, end in parse_legacy_schedule(schedule)
+    ]
+    if intervals:
+        op.bulk_insert(availability, intervals)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_availability_exceptions_doctor_date", table_name="doctor_availability_exceptions")
+    op.drop_table("doctor_availability_exceptions")
+    op.drop_index("ix_doctor_availability_doctor_id", table_name="doctor_availability")
+    op.drop_table("doctor_availability")
@@ -0,0 +1,59 @@
+"""unique active appointment per doctor slot
+
+Revision ID: 0004_unique_active_slot
+Revises: 0003_doctor_availability
+Create Date: 2026-10-18 11:45:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004_unique_active_slot'
+down_revision: Union[str, Sequence[str], None] = '0003_doctor_availability'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+DUPLICATES_SQL = """
+    SELECT doctor_id, appointment_date, appointment_time, count(*)
+    FROM appointments
+    WHERE status <> 'cancelled'
+    GROUP BY doctor_id, appointment_date, appointment_time
+    HAVING count(*) > 1
+    LIMIT 20
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Data lama mungkin sudah berisi double booking: hentikan dengan pesan
+    # jelas agar diselesaikan manual (batalkan salah satu) sebelum migrasi.
+    if not op.get_context().as_sql:
+        duplicates = op.get_bind().execute(sa.text(DUPLICATES_SQL)).fetchall()
+        if duplicates:
+            raise RuntimeError(
+                "Masih ada slot dokter dengan lebih dari satu appointment aktif "
+                f"(doctor_id, tanggal, jam, jumlah): {duplicates}"
+            )
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "uq_appointments_doctor_slot", "appointments",
+            ["doctor_id", "appointment_date", "appointment_time"],
+            unique=True,
+            postgresql_where=sa.text("status <> 'cancelled'"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "uq_appointments_doctor_slot", table_name="appointments",
+            postgresql_concurrently=True,
+        )
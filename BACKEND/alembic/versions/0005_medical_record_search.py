@@ -0,0 +1,51 @@
+"""full-text search column on medical_records
+
+Revision ID: 0005_medical_record_search
+Revises: 0004_unique_active_slot
+Create Date: 2026-10-18 13:20:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005_medical_record_search'
+down_revision: Union[str, Sequence[str], None] = '0004_unique_active_slot'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_VECTOR_SQL = """
+    ALTER TABLE medical_records ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('indonesian', coalesce(diagnosis, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(diagnosis, '')), 'A') ||
+        setweight(to_tsvector('indonesian', coalesce(notes, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(notes, '')), 'B')
+    ) STORED
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Kolom generated STORED menulis ulang tabel (butuh PostgreSQL >= 12,
+    # config 'indonesian' tersedia sejak versi tsb)
+    op.execute(SEARCH_VECTOR_SQL)
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_medical_records_search", "medical_records", ["search_vector"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_medical_records_search", table_name="medical_records",
+            postgresql_concurrently=True,
+        )
+    op.drop_column("medical_records", "search_vector")
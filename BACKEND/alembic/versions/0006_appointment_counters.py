@@ -0,0 +1,50 @@
+"""appointment status counters per doctor / patient
+
+Revision ID: 0006_appointment_counters
+Revises: 0005_medical_record_search
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006_appointment_counters'
+down_revision: Union[str, Sequence[str], None] = '0005_medical_record_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+STATUSES = ('pending', 'confirmed', 'completed', 'cancelled')
+
+BACKFILL_SQL = """
+    INSERT INTO appointment_counters (owner_type, owner_id, {columns})
+    SELECT '{owner_type}', {owner_column}, {counts}
+    FROM appointments
+    GROUP BY {owner_column}
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "appointment_counters",
+        sa.Column("owner_type", sa.String(10), primary_key=True),
+        sa.Column("owner_id", sa.Integer(), primary_key=True),
+        *[sa.Column(status, sa.Integer(), nullable=False, server_default="0") for status in STATUSES],
+        sa.CheckConstraint("owner_type IN ('doctor', 'patient')", name="appointment_counter_owner_check"),
+    )
+
+    # Isi awal dari data yang sudah ada (sama dengan reconcile_counters)
+    counts = ", ".join(f"sum(CASE WHEN status = '{status}' THEN 1 ELSE 0 END)" for status in STATUSES)
+    for owner_type, owner_column in (("doctor", "doctor_id"), ("patient", "patient_id")):
+        op.execute(BACKFILL_SQL.format(
+            columns=", ".join(STATUSES), owner_type=owner_type, owner_column=owner_column, counts=counts))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("appointment_counters")
@@ -0,0 +1,94 @@
+"""range-partition appointments by month
+
+Revision ID: 0007_partition_appointments
+Revises: 0006_appointment_counters
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from src.partitions import (APPOINTMENT_COLUMNS, DEFAULT_MONTHS_AHEAD, PARENT, RECORD_FK,
+                            convert_to_partitioned)
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007_partition_appointments'
+down_revision: Union[str, Sequence[str], None] = '0006_appointment_counters'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PLAIN_TABLE_SQL = f"""
+    CREATE TABLE {PARENT} (
+        id integer NOT NULL DEFAULT nextval('appointments_id_seq'::regclass) PRIMARY KEY,
+        patient_id integer NOT NULL REFERENCES users (id),
+        doctor_id integer NOT NULL REFERENCES doctors (id),
+        appointment_date date NOT NULL,
+        appointment_time time without time zone NOT NULL,
+        status varchar(20) NOT NULL,
+        created_at timestamp without time zone DEFAULT now(),
+        updated_at timestamp without time zone DEFAULT now(),
+        CONSTRAINT appointment_status_check
+            CHECK (status IN ('pending', 'confirmed', 'completed', 'cancelled'))
+    )
+"""
+
+INDEXES = [
+    "ix_appointments_doctor_date_time",
+    "ix_appointments_patient_status_date",
+    "ix_appointments_created_at_id",
+    "uq_appointments_doctor_slot",
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Tanggal appointment disalin ke rekam medis: foreign key ke tabel
+    # partisi harus memuat kolom partisi (primary key (id, appointment_date))
+    op.add_column("medical_records", sa.Column("appointment_date", sa.Date()))
+    op.execute(
+        "UPDATE medical_records m SET appointment_date = a.appointment_date "
+        "FROM appointments a WHERE a.id = m.appointment_id"
+    )
+    op.alter_column("medical_records", "appointment_date", nullable=False)
+
+    # Tabel disalin ulang di bawah ACCESS EXCLUSIVE lock (jendela maintenance);
+    # partisi dibuat dari bulan appointment tertua s/d 12 bulan ke depan.
+    # Butuh PostgreSQL 15 agar appointment yang sudah punya rekam medis bisa
+    # dipindah ke bulan lain (lihat partitions.RECORD_MOVE_ERROR)
+    convert_to_partitioned(op.get_bind(), DEFAULT_MONTHS_AHEAD)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Schema archive (partition_appointments --archive-before) tidak disentuh
+    op.execute(f"LOCK TABLE {PARENT}, medical_records IN ACCESS EXCLUSIVE MODE")
+    op.drop_constraint(RECORD_FK, "medical_records", type_="foreignkey")
+    op.execute(f"ALTER TABLE {PARENT} RENAME TO {PARENT}_partitioned")
+    for name in INDEXES + ["appointments_pkey"]:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name}_partitioned")
+    op.execute("ALTER SEQUENCE appointments_id_seq OWNED BY NONE")
+
+    op.execute(PLAIN_TABLE_SQL)
+    op.execute(
+        f"INSERT INTO {PARENT} ({APPOINTMENT_COLUMNS}) "
+        f"SELECT {APPOINTMENT_COLUMNS} FROM {PARENT}_partitioned"
+    )
+    op.execute(f"ALTER SEQUENCE appointments_id_seq OWNED BY {PARENT}.id")
+    op.execute(f"DROP TABLE {PARENT}_partitioned")
+
+    op.create_index("ix_appointments_doctor_date_time", PARENT,
+                    ["doctor_id", "appointment_date", "appointment_time"])
+    op.create_index("ix_appointments_patient_status_date", PARENT,
+                    ["patient_id", "status", "appointment_date"])
+    op.create_index("ix_appointments_created_at_id", PARENT, ["created_at", "id"])
+    op.create_index("uq_appointments_doctor_slot", PARENT,
+                    ["doctor_id", "appointment_date", "appointment_time"],
+                    unique=True, postgresql_where=sa.text("status <> 'cancelled'"))
+
+    op.create_foreign_key("medical_records_appointment_id_fkey", "medical_records", PARENT,
+                          ["appointment_id"], ["id"])
+    op.drop_column("medical_records", "appointment_date")
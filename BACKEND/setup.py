@@ -15,7 +15,9 @@ requires = [
 
 dev_requires = [
     'pyramid_debugtoolbar',
-    'pytest'
+    'pytest',
+    # bench_endpoints (src/scripts/bench_endpoints.py)
+    'webtest'
 ]
 
 setup(
@@ -25,10 +27,25 @@ setup(
     install_requires=requires,
     extras_require={
         'dev' : dev_requires,
+        # Renderer JSON cepat (src/renderers.py), fallback ke json stdlib
+        'fast': ['orjson'],
+        # Mode ASGI (src/asgi.py): uvicorn + driver database asyncio
+        'asgi': ['uvicorn', 'greenlet', 'asyncpg', 'aiosqlite'],
     },
     entry_points={
         'paste.app_factory': [
             'main = src:main',
         ],
+        'console_scripts': [
+            'check_query_plans = src.scripts.check_query_plans:main',
+            'bench_json = src.scripts.bench_json:main',
+            'seed_clinic = src.scripts.seed_clinic:main',
+            'bench_endpoints = src.scripts.bench_endpoints:main',
+            'serve_asgi = src.asgi:serve',
+            'bench_concurrency = src.scripts.bench_concurrency:main',
+            'reconcile_counters = src.scripts.reconcile_counters:main',
+            'partition_appointments = src.scripts.partition_appointments:main',
+            'grant_admin = src.scripts.grant_admin:main',
+        ],
     },
-)
\ No newline at end of file
+)
\ No newline at end of file
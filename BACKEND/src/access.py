@@ -0,0 +1,64 @@
+import ipaddress
+
+from pyramid.httpexceptions import HTTPForbidden, HTTPUnauthorized
+
+# =======================================================
+# AKSES ENDPOINT INTERNAL (MONITORING)
+# =======================================================
+# Endpoint monitoring membuka detail internal proses (isi cache, pool,
+# replica, rate limiter, teks SQL per route di /api/_metrics). Hanya alamat
+# di internal.allowed_ips (IP / CIDR, dipisah spasi atau baris baru) yang
+# boleh mengakses; default hanya localhost. Di belakang reverse proxy
+# REMOTE_ADDR = alamat proxy, jadi path /api/_* juga perlu dibatasi di proxy.
+
+INTERNAL_ROUTES = frozenset({'cache_stats', 'pool_stats', 'metrics'})
+DEFAULT_ALLOWED_IPS = '127.0.0.1 ::1'
+
+
+def parse_networks(value):
+    """'10.0.0.0/8 127.0.0.1' -> tuple ip_network."""
+    return tuple(ipaddress.ip_network(item, strict=False) for item in value.split())
+
+
+def is_allowed(networks, address):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def internal_access_subscriber(event):
+    """ContextFound: tolak (403) route internal dari alamat yang tidak diizinkan."""
+    request = event.request
+    route = request.matched_route
+    if route is None or route.name not in INTERNAL_ROUTES:
+        return
+    if not is_allowed(request.registry.internal_networks, request.remote_addr or ''):
+        raise HTTPForbidden(json_body={'error': 'Endpoint internal hanya bisa diakses dari internal.allowed_ips'})
+
+
+# =======================================================
+# AKSES ENDPOINT ADMIN (EXPORT MASSAL)
+# =======================================================
+# Export berisi seluruh data pasien & rekam medis: wajib token dengan role
+# admin, apa pun nilai auth.require_token. Tanpa token -> 401, role lain ->
+# 403. Role admin tidak bisa dibuat lewat /api/auth/register; beri dengan
+# command grant_admin lalu login ulang (role dibaca dari claim token).
+
+ADMIN_ROUTES = frozenset({'export_appointments', 'export_medical_records'})
+ADMIN_ROLE = 'admin'
+
+
+def admin_access_subscriber(event):
+    """ContextFound: route admin hanya untuk token (jwt_tween) dengan role admin."""
+    request = event.request
+    route = request.matched_route
+    if route is None or route.name not in ADMIN_ROUTES:
+        return
+    claims = getattr(request, 'jwt_claims', None)
+    if claims is None:
+        raise HTTPUnauthorized(json_body={'error': 'Token admin wajib disertakan'},
+                               headers={'WWW-Authenticate': 'Bearer'})
+    if claims.get('role') != ADMIN_ROLE:
+        raise HTTPForbidden(json_body={'error': 'Endpoint ini khusus admin'})
@@ -0,0 +1,235 @@
+import argparse
+import asyncio
+import io
+import os
+import sys
+
+import greenlet
+import transaction
+from pyramid.paster import get_appsettings, setup_logging
+from sqlalchemy.util import ScopedRegistry
+from sqlalchemy.util.concurrency import await_only, greenlet_spawn
+
+from . import main, warm_up
+from .models import DBSession, request_transaction_manager
+from .replicas import replica_router
+
+# =======================================================
+# MODE ASGI (EVENT LOOP + SQLALCHEMY ASYNCIO)
+# =======================================================
+# Alternatif Waitress: aplikasi Pyramid yang sama (route, tween, view,
+# pyramid_tm) dijalankan di event loop asyncio, satu greenlet per request.
+#   - engine database memakai driver asyncio (asyncpg / aiosqlite, lihat
+#     create_engine_from_settings). View tetap memakai DBSession biasa; setiap
+#     query menunggu hasil dengan await di dalam greenlet, jadi selama
+#     database bekerja event loop melayani request lain
+#   - bcrypt tetap di pool hashing.* dan ditunggu dengan await (hashing.py)
+#   - DBSession & transaction manager dibuat per request (greenlet), bukan
+#     per thread, karena semua request berbagi thread event loop
+# Konkurensi dibatasi ukuran pool database (sqlalchemy.pool_size +
+# max_overflow, default 20 + 10 di mode ini), bukan jumlah thread.
+#
+# Menjalankan:
+#   serve_asgi development.ini --port 6543 --workers 2
+#   CLINIGA_INI=development.ini uvicorn --factory src.asgi:app_from_env
+# Butuh: pip install -e .[asgi]
+
+ASGI_POOL_SIZE = 20
+ASGI_MAX_OVERFLOW = 10
+
+
+def make_asgi_app(global_config, **settings):
+    """Aplikasi ASGI dari setting .ini yang sama dengan src.main."""
+    settings['db.asyncio'] = 'true'
+    settings.setdefault('sqlalchemy.pool_size', str(ASGI_POOL_SIZE))
+    settings.setdefault('sqlalchemy.max_overflow', str(ASGI_MAX_OVERFLOW))
+    # Session per greenlet request; di thread biasa greenlet-nya satu per
+    # thread, jadi tetap sama dengan scoped_session bawaan
+    DBSession.registry = ScopedRegistry(DBSession.session_factory, greenlet.getcurrent)
+    return AsgiApp(main(global_config, **settings))
+
+
+def app_from_env():
+    """Factory untuk `uvicorn --factory`: file .ini dari env CLINIGA_INI."""
+    config_uri = os.environ['CLINIGA_INI']
+    return make_asgi_app({'__file__': os.path.abspath(config_uri)}, **get_appsettings(config_uri))
+
+
+# -------------------------------------------------------
+# WSGI ENVIRON DARI SCOPE ASGI
+# -------------------------------------------------------
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            return None
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            return b''.join(chunks)
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+def _environ(scope, body):
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        # PEP 3333: string "bytes-as-latin-1"
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1] or 80),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+        elif name != 'CONTENT_LENGTH':
+            key = 'HTTP_' + name
+            environ[key] = environ[key] + ',' + value if key in environ else value
+    return environ
+
+
+# -------------------------------------------------------
+# APLIKASI ASGI
+# -------------------------------------------------------
+class AsgiApp:
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.registry = wsgi_app.registry
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        if scope['type'] != 'http':
+            raise ValueError(f'Scope ASGI {scope["type"]!r} tidak didukung')
+        body = await _read_body(receive)
+        if body is None:
+            return  # client putus sebelum body selesai dikirim
+        # Response streaming panjang (SSE) berhenti saat client putus
+        disconnected = asyncio.ensure_future(_wait_disconnect(receive))
+        try:
+            await greenlet_spawn(self._handle, _environ(scope, body), send, disconnected)
+        finally:
+            disconnected.cancel()
+
+    def _handle(self, environ, send, disconnected):
+        # Berjalan di greenlet milik request ini
+        manager = transaction.TransactionManager(explicit=True)
+        environ['tm.manager'] = manager  # dipakai pyramid_tm sebagai request.tm
+        token = request_transaction_manager.set(manager)  # dipakai zope.sqlalchemy
+        try:
+            started = {}
+            written = []  # body dari write() sebelum header terkirim
+
+            def send_body(chunk):
+                await_only(send({'type': 'http.response.body', 'body': chunk, 'more_body': True}))
+
+            def write(data):
+                # Callable write() WSGI (PEP 3333, API lama): ditampung sampai
+                # header dikirim, setelah itu langsung dikirim ke client
+                if started.get('sent'):
+                    if data:
+                        send_body(data)
+                else:
+                    written.append(data)
+
+            def start_response(status, headers, exc_info=None):
+                if exc_info is not None and started.get('sent'):
+                    raise exc_info[1].with_traceback(exc_info[2])
+                started['status'], started['headers'] = status, headers
+                return write
+
+            app_iter = self.wsgi_app(environ, start_response)
+            try:
+                await_only(send({
+                    'type': 'http.response.start',
+                    'status': int(started['status'].split(' ', 1)[0]),
+                    'headers': [(k.lower().encode('latin-1'), v.encode('latin-1'))
+                                for k, v in started['headers']],
+                }))
+                started['sent'] = True
+                for chunk in written:
+                    if chunk:
+                        send_body(chunk)
+                # app_iter streaming (streaming.py) juga membaca database di sini
+                for chunk in app_iter:
+                    if disconnected.done():
+                        break
+                    if chunk:
+                        send_body(chunk)
+                await_only(send({'type': 'http.response.body', 'body': b''}))
+            finally:
+                close = getattr(app_iter, 'close', None)
+                if close is not None:
+                    close()
+        finally:
+            DBSession.remove()
+            request_transaction_manager.reset(token)
+
+    # ---------------------------------------------------
+    # LIFESPAN (startup / shutdown)
+    # ---------------------------------------------------
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await greenlet_spawn(self._startup)
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await greenlet_spawn(self._shutdown)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def _startup(self):
+        # Sama dengan src.main di mode WSGI
+        try:
+            warm_up(DBSession.get_bind(), self.registry.settings)
+        finally:
+            DBSession.remove()
+
+    def _shutdown(self):
+        self.registry.hasher.shutdown()
+        DBSession.get_bind().dispose()
+        for replica in replica_router.replicas:
+            replica.engine.dispose()
+        DBSession.remove()
+
+
+# -------------------------------------------------------
+# CONSOLE SCRIPT
+# -------------------------------------------------------
+def serve(argv=sys.argv):
+    """Jalankan mode ASGI dengan uvicorn: serve_asgi development.ini"""
+    parser = argparse.ArgumentParser(description=serve.__doc__)
+    parser.add_argument('config_uri', help='File .ini (sama dengan pserve)')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=6543)
+    parser.add_argument('--workers', type=int, default=1, help='Jumlah proses')
+    args = parser.parse_args(argv[1:])
+
+    import uvicorn
+
+    setup_logging(args.config_uri)
+    os.environ['CLINIGA_INI'] = args.config_uri
+    uvicorn.run('src.asgi:app_from_env', factory=True, host=args.host, port=args.port,
+                workers=args.workers, lifespan='on', backlog=2048)
+    return 0
@@ -0,0 +1,237 @@
+import re
+from datetime import datetime, time, timedelta
+
+from .models import Appointment, DoctorAvailability, DoctorAvailabilityException
+
+# =======================================================
+# JADWAL PRAKTIK TERSTRUKTUR & PERHITUNGAN SLOT KOSONG
+# =======================================================
+# Jam praktik disimpan per hari (DoctorAvailability) + pengecualian per
+# tanggal (DoctorAvailabilityException). Slot kosong dihitung dengan:
+#   1. bangun daftar slot terurut per tanggal dari interval mingguan
+#      (dikoreksi pengecualian),
+#   2. SATU query appointment non-cancelled dokter tsb di rentang tanggal,
+#      terurut (date, time) -> memakai ix_appointments_doctor_date_time,
+#   3. merge linear kedua daftar terurut tsb.
+
+DEFAULT_SLOT_MINUTES = 30
+MAX_RANGE_DAYS = 62
+
+WEEKDAYS = {
+    'senin': 0, 'selasa': 1, 'rabu': 2, 'kamis': 3,
+    'jumat': 4, "jum'at": 4, 'sabtu': 5, 'minggu': 6, 'ahad': 6,
+    'monday': 0, 'tuesday': 1, 'wednesday': 2, 'thursday': 3,
+    'friday': 4, 'saturday': 5, 'sunday': 6,
+}
+
+_DAY = r"(?:senin|selasa|rabu|kamis|jum'?at|sabtu|minggu|ahad|monday|tuesday|wednesday|thursday|friday|saturday|sunday)"
+_TO = r"\s*(?:-|–|s/d|sd|sampai|hingga|to)\s*"
+_CLOCK = r"(\d{1,2})[.:](\d{2})(?:\s*wib)?"
+# Satu pola untuk semua token, dicocokkan berurutan dari kiri ke kanan
+_TOKEN_RE = re.compile(
+    r"(?P<range>" + _CLOCK + _TO + _CLOCK + r")"
+    r"|(?P<days>(?P<first>" + _DAY + r")" + _TO + r"(?P<last>" + _DAY + r"))"
+    r"|(?P<every>(?:setiap|tiap) hari|every ?day|daily)"
+    r"|(?P<day>" + _DAY + r")"
+)
+
+
+def _weekday(name):
+    return WEEKDAYS[name.replace("'", "")]
+
+
+# -------------------------------------------------------
+# PARSER JADWAL LAMA (TEKS BEBAS)
+# -------------------------------------------------------
+def parse_legacy_schedule(text):
+    """Teks jadwal lama -> list (weekday, start_time, end_time).
+
+    Teks dibaca sebagai urutan token hari dan rentang jam; setiap rentang jam
+    berlaku untuk hari-hari yang disebut sebelumnya, dan hari yang muncul
+    setelah rentang jam memulai kelompok baru. Contoh yang dikenali:
+        "Senin-Jumat, 09.00 - 15.00"
+        "Senin - Jumat (09:00 - 15:00); Sabtu (10:00 - 12:00)"
+        "Senin, Rabu 09.00-12.00, Jumat 13.00-15.00"
+        "Sabtu Minggu 10:00-14:00"
+        "Setiap hari 08.00-16.00"
+    ValueError jika teks tidak bisa dibaca seluruhnya (rentang jam tanpa
+    hari, hari tanpa jam, jam tidak valid, atau tidak ada jadwal sama sekali).
+    """
+    intervals = []
+    days, days_have_time = set(), False
+    for match in _TOKEN_RE.finditer((text or '').lower()):
+        if match.group('range'):
+            if not days:
+                raise ValueError(f'Jam "{match.group(0)}" tidak didahului nama hari')
+            h1, m1, h2, m2 = (int(g) for g in match.group(2, 3, 4, 5))
+            try:
+                start, end = time(h1, m1), time(h2, m2)
+            except ValueError:
+                raise ValueError(f'Jam tidak valid: "{match.group(0)}"')
+            if end <= start:
+                raise ValueError(f'Jam selesai harus setelah jam mulai: "{match.group(0)}"')
+            intervals.extend((day, start, end) for day in sorted(days))
+            days_have_time = True
+            continue
+
+        if days_have_time:
+            # Hari setelah rentang jam: kelompok jadwal berikutnya
+            days, days_have_time = set(), False
+        if match.group('every'):
+            days.update(range(7))
+        elif match.group('days'):
+            day, last = _weekday(match.group('first')), _weekday(match.group('last'))
+            days.add(day)
+            while day != last:
+                day = (day + 1) % 7
+                days.add(day)
+        else:
+            days.add(_weekday(match.group('day')))
+
+    if days and not days_have_time:
+        raise ValueError('Hari terakhir tidak diikuti rentang jam')
+    if not intervals:
+        raise ValueError('Tidak ada jadwal (hari + rentang jam) yang dikenali')
+    return sorted(set(intervals))
+
+
+def parse_interval_json(item):
+    """{"weekday": 0, "start": "09:00", "end": "15:00", "slot_minutes": 30} -> kwargs model."""
+    weekday = int(item['weekday'])
+    start = datetime.strptime(item['start'], '%H:%M').time()
+    end = datetime.strptime(item['end'], '%H:%M').time()
+    slot_minutes = int(item.get('slot_minutes', DEFAULT_SLOT_MINUTES))
+    if not 0 <= weekday <= 6 or end <= start or slot_minutes <= 0:
+        raise ValueError('Interval jadwal tidak valid')
+    return {'weekday': weekday, 'start_time': start, 'end_time': end, 'slot_minutes': slot_minutes}
+
+
+def parse_exception_json(item):
+    """{"date": "2025-12-25", "start"?, "end"?, "is_available"?, "note"?} -> kwargs model."""
+    start = datetime.strptime(item['start'], '%H:%M').time() if item.get('start') else None
+    end = datetime.strptime(item['end'], '%H:%M').time() if item.get('end') else None
+    if (start is None) != (end is None) or (start and end <= start):
+        raise ValueError('Jam pengecualian tidak valid')
+    is_available = bool(item.get('is_available', False))
+    if is_available and start is None:
+        raise ValueError('Jam tambahan wajib mengisi start & end')
+    return {
+        'exception_date': datetime.strptime(item['date'], '%Y-%m-%d').date(),
+        'start_time': start,
+        'end_time': end,
+        'is_available': is_available,
+        'slot_minutes': int(item.get('slot_minutes', DEFAULT_SLOT_MINUTES)),
+        'note': item.get('note'),
+    }
+
+
+def replace_weekly(doctor, intervals):
+    """Ganti seluruh jam praktik mingguan dokter (list kwargs parse_interval_json)."""
+    doctor.availability = [DoctorAvailability(**kw) for kw in intervals]
+
+
+# -------------------------------------------------------
+# PERHITUNGAN SLOT
+# -------------------------------------------------------
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def _subtract(intervals, start, end):
+    """Kurangi [start, end) dari list (start, end, slot) -- semua dalam menit."""
+    result = []
+    for a, b, slot in intervals:
+        if end <= a or start >= b:
+            result.append((a, b, slot))
+            continue
+        if a < start:
+            result.append((a, start, slot))
+        if end < b:
+            result.append((end, b, slot))
+    return result
+
+
+def _day_slots(intervals):
+    """Interval (menit) -> list (menit_mulai, durasi) terurut tanpa duplikat."""
+    starts = {}
+    for a, b, slot in intervals:
+        m = a
+        while m + slot <= b:
+            starts.setdefault(m, slot)
+            m += slot
+    return sorted(starts.items())
+
+
+def candidate_slots(weekly, exceptions, start_date, end_date):
+    """List (date, menit_mulai, durasi) terurut untuk rentang [start_date, end_date]."""
+    by_weekday = {}
+    for row in weekly:
+        by_weekday.setdefault(row.weekday, []).append(
+            (_minutes(row.start_time), _minutes(row.end_time), row.slot_minutes))
+    by_date = {}
+    for exc in exceptions:
+        by_date.setdefault(exc.exception_date, []).append(exc)
+
+    slots = []
+    day = start_date
+    while day <= end_date:
+        intervals = list(by_weekday.get(day.weekday(), []))
+        # Libur diterapkan dulu, baru jam tambahan (jadwal pengganti)
+        for exc in sorted(by_date.get(day, []), key=lambda e: e.is_available):
+            if exc.is_available:
+                intervals.append((_minutes(exc.start_time), _minutes(exc.end_time), exc.slot_minutes))
+            elif exc.start_time is None:
+                intervals = []
+            else:
+                intervals = _subtract(intervals, _minutes(exc.start_time), _minutes(exc.end_time))
+        slots.extend((day, m, length) for m, length in _day_slots(intervals))
+        day += timedelta(days=1)
+    return slots
+
+
+def free_slots(session, doctor_id, start_date, end_date, now=None):
+    """Slot kosong dokter -> list (date, menit_mulai, durasi) terurut."""
+    now = now or datetime.now()
+
+    weekly = session.query(DoctorAvailability)\
+        .filter(DoctorAvailability.doctor_id == doctor_id).all()
+    exceptions = session.query(DoctorAvailabilityException)\
+        .filter(DoctorAvailabilityException.doctor_id == doctor_id,
+                DoctorAvailabilityException.exception_date.between(start_date, end_date)).all()
+
+    candidates = candidate_slots(weekly, exceptions, start_date, end_date)
+    if not candidates:
+        return []
+
+    booked = session.query(Appointment.appointment_date, Appointment.appointment_time)\
+        .filter(Appointment.doctor_id == doctor_id,
+                Appointment.appointment_date.between(start_date, end_date),
+                Appointment.status != 'cancelled')\
+        .order_by(Appointment.appointment_date, Appointment.appointment_time)\
+        .all()
+    booked = [(d, _minutes(t)) for d, t in booked]
+    now_key = (now.date(), _minutes(now))
+
+    # Merge linear: kedua list terurut (date, menit). Slot terisi jika ada
+    # appointment dengan jam di dalam [mulai, mulai + durasi).
+    result = []
+    i = 0
+    for day, start, length in candidates:
+        while i < len(booked) and booked[i] < (day, start):
+            i += 1
+        taken = i < len(booked) and booked[i][0] == day and booked[i][1] < start + length
+        if not taken and (day, start) > now_key:
+            result.append((day, start, length))
+    return result
+
+
+def format_slots(slots):
+    """List (date, menit, durasi) -> [{"date": ..., "times": ["09:00", ...]}]."""
+    grouped = []
+    for day, minute, _ in slots:
+        label = '%02d:%02d' % divmod(minute, 60)
+        if grouped and grouped[-1]['date'] == str(day):
+            grouped[-1]['times'].append(label)
+        else:
+            grouped.append({'date': str(day), 'times': [label]})
+    return grouped
@@ -0,0 +1,216 @@
+from datetime import datetime
+
+from sqlalchemy import tuple_
+
+from .models import Appointment, Doctor, User
+from .counters import count_transition
+from .live import publish_appointment
+from .queries import insert_appointments_if_free, update_appointments
+from .transitions import transition_error
+
+# =======================================================
+# BULK CREATE / UPDATE APPOINTMENT
+# =======================================================
+# Dipakai front-desk untuk memindah/membatalkan seluruh jadwal satu dokter.
+# Alurnya selalu:
+#   1. validasi format tiap item di Python (tanpa query),
+#   2. SATU query untuk memuat semua data yang dibutuhkan (FK / status lama /
+#      slot yang sudah terisi),
+#   3. validasi aturan (transisi status, bentrok slot) per item,
+#   4. SATU statement tulis untuk semua item yang lolos.
+# Semuanya di dalam transaksi pyramid_tm yang sama. Hasil dikembalikan per
+# item dengan urutan yang sama seperti input.
+
+MAX_BULK_ITEMS = 500
+
+SLOT_TAKEN = 'Slot jadwal dokter ini sudah dipesan. Silakan pilih jam lain.'
+
+
+def _ok(index, appointment_id, **extra):
+    return dict({'index': index, 'status': 'success', 'appointment_id': appointment_id}, **extra)
+
+
+def _error(index, code, message, appointment_id=None):
+    return {'index': index, 'status': 'error', 'code': code,
+            'appointment_id': appointment_id, 'error': message}
+
+
+def _is_active(status):
+    return status != 'cancelled'
+
+
+# -------------------------------------------------------
+# BULK CREATE
+# -------------------------------------------------------
+def bulk_create(session, items, now=None):
+    """Buat banyak appointment (status 'pending'). Mengembalikan list hasil per item."""
+    now = now or datetime.now()
+    results = [None] * len(items)
+    parsed = []
+
+    required_fields = ['patient_id', 'doctor_id', 'appointment_date', 'appointment_time']
+    for index, data in enumerate(items):
+        if not isinstance(data, dict) or not all(k in data for k in required_fields):
+            results[index] = _error(index, 400, 'Data tidak lengkap. Wajib: ' + ', '.join(required_fields))
+            continue
+        try:
+            row = {
+                'patient_id': int(data['patient_id']),
+                'doctor_id': int(data['doctor_id']),
+                'appointment_date': datetime.strptime(data['appointment_date'], '%Y-%m-%d').date(),
+                'appointment_time': datetime.strptime(data['appointment_time'], '%H:%M').time(),
+                'status': 'pending'
+            }
+        except (TypeError, ValueError):
+            results[index] = _error(index, 400, 'Format tanggal/jam salah. Gunakan YYYY-MM-DD dan HH:MM')
+            continue
+        if datetime.combine(row['appointment_date'], row['appointment_time']) <= now:
+            results[index] = _error(index, 400, 'Tanggal dan waktu janji temu harus di masa depan')
+            continue
+        parsed.append((index, row))
+
+    # Cek FK sekaligus supaya satu id salah tidak menggagalkan seluruh batch
+    patient_ids = {row['patient_id'] for _, row in parsed}
+    doctor_ids = {row['doctor_id'] for _, row in parsed}
+    known_patients = {id_ for (id_,) in session.query(User.id).filter(User.id.in_(patient_ids))} \
+        if patient_ids else set()
+    known_doctors = {id_ for (id_,) in session.query(Doctor.id).filter(Doctor.id.in_(doctor_ids))} \
+        if doctor_ids else set()
+
+    pending = {}
+    for index, row in parsed:
+        slot = (row['doctor_id'], row['appointment_date'], row['appointment_time'])
+        if row['patient_id'] not in known_patients:
+            results[index] = _error(index, 404, 'Pasien tidak ditemukan')
+        elif row['doctor_id'] not in known_doctors:
+            results[index] = _error(index, 404, 'Dokter tidak ditemukan')
+        elif slot in pending:
+            results[index] = _error(index, 409, SLOT_TAKEN)
+        else:
+            pending[slot] = (index, row)
+
+    created = insert_appointments_if_free(session, [row for _, row in pending.values()])
+    for slot, (index, row) in pending.items():
+        if slot in created:
+            results[index] = _ok(index, created[slot])
+            count_transition(session, row['doctor_id'], row['patient_id'], None, 'pending')
+            publish_appointment(session, 'created', dict(row, id=created[slot]))
+        else:
+            results[index] = _error(index, 409, SLOT_TAKEN)
+    return results
+
+
+# -------------------------------------------------------
+# BULK UPDATE (status / reschedule)
+# -------------------------------------------------------
+def bulk_update(session, items):
+    """Ubah status/tanggal/jam banyak appointment. Mengembalikan list hasil per item.
+
+    Item diproses berurutan. Slot yang dikosongkan (dibatalkan/dipindah) di
+    batch yang sama belum bisa dipakai item lain -- kirim di batch berikutnya.
+    Dengan begitu UPDATE satu statement tidak pernah melanggar unique index
+    walaupun urutan baris yang di-update tidak ditentukan database.
+    """
+    results = [None] * len(items)
+    parsed = []
+    seen_ids = set()
+    hints = {}  # appointment_id -> current_date (tanggal saat ini, opsional)
+
+    for index, data in enumerate(items):
+        appointment_id = data.get('appointment_id') if isinstance(data, dict) else None
+        if not appointment_id:
+            results[index] = _error(index, 400, 'appointment_id wajib disertakan')
+            continue
+        try:
+            appointment_id = int(appointment_id)
+            changes = {}
+            if 'appointment_date' in data:
+                changes['appointment_date'] = datetime.strptime(data['appointment_date'], '%Y-%m-%d').date()
+            if 'appointment_time' in data:
+                changes['appointment_time'] = datetime.strptime(data['appointment_time'], '%H:%M').time()
+            current_date = (datetime.strptime(data['current_date'], '%Y-%m-%d').date()
+                            if data.get('current_date') else None)
+        except (TypeError, ValueError):
+            results[index] = _error(index, 400, 'Format tanggal/jam salah', appointment_id)
+            continue
+        if 'status' in data:
+            changes['status'] = data['status']
+        if appointment_id in seen_ids:
+            results[index] = _error(index, 400, 'appointment_id muncul lebih dari sekali', appointment_id)
+            continue
+        seen_ids.add(appointment_id)
+        if current_date is not None:
+            hints[appointment_id] = current_date
+        parsed.append((index, appointment_id, changes))
+
+    # Status lama semua item dalam satu SELECT (dikunci sampai commit). Jika
+    # semua item menyertakan current_date, hanya partisi bulan-bulan itu yang
+    # disentuh (tanpa itu lookup by id memeriksa setiap partisi)
+    current = {}
+    if seen_ids:
+        query = session.query(
+            Appointment.id, Appointment.doctor_id, Appointment.patient_id, Appointment.status,
+            Appointment.appointment_date, Appointment.appointment_time
+        ).filter(Appointment.id.in_(seen_ids))
+        if len(hints) == len(seen_ids):
+            query = query.filter(Appointment.appointment_date.in_(set(hints.values())))
+        current = {row.id: row for row in query.with_for_update().all()}
+
+    planned = []
+    for index, appointment_id, changes in parsed:
+        row = current.get(appointment_id)
+        if row is None or hints.get(appointment_id, row.appointment_date) != row.appointment_date:
+            results[index] = _error(index, 404, 'Janji temu tidak ditemukan', appointment_id)
+            continue
+        if 'status' in changes:
+            error = transition_error(row.status, changes['status'])
+            if error:
+                results[index] = _error(index, 400, error, appointment_id)
+                continue
+        new = {
+            'id': appointment_id,
+            'status': changes.get('status', row.status),
+            'appointment_date': changes.get('appointment_date', row.appointment_date),
+            'appointment_time': changes.get('appointment_time', row.appointment_time),
+        }
+        planned.append((index, row, new))
+
+    # Slot tujuan yang perlu dicek: item yang aktif dan slotnya berubah /
+    # aktif kembali dari cancelled
+    targets = {
+        (row.doctor_id, new['appointment_date'], new['appointment_time'])
+        for _, row, new in planned
+        if _is_active(new['status'])
+    }
+    occupied = {}
+    if targets:
+        for other in session.query(
+            Appointment.id, Appointment.doctor_id,
+            Appointment.appointment_date, Appointment.appointment_time
+        ).filter(
+            tuple_(Appointment.doctor_id, Appointment.appointment_date, Appointment.appointment_time).in_(targets),
+            Appointment.status != 'cancelled'
+        ):
+            occupied[(other.doctor_id, other.appointment_date, other.appointment_time)] = other.id
+
+    rows = []
+    for index, row, new in planned:
+        slot = (row.doctor_id, new['appointment_date'], new['appointment_time'])
+        if _is_active(new['status']):
+            holder = occupied.get(slot)
+            if holder is not None and holder != row.id:
+                results[index] = _error(index, 409, SLOT_TAKEN, row.id)
+                continue
+            occupied[slot] = row.id
+        rows.append(dict(new, previous_date=row.appointment_date))
+        count_transition(session, row.doctor_id, row.patient_id, row.status, new['status'])
+        publish_appointment(session, 'updated', dict(new, doctor_id=row.doctor_id, patient_id=row.patient_id))
+        results[index] = _ok(index, row.id, data={
+            'id': row.id,
+            'status': new['status'],
+            'date': new['appointment_date'],
+            'time': new['appointment_time']
+        })
+
+    update_appointments(session, rows)
+    return results
@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session, joinedload, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+
+from .models import User, Doctor
+from .replicas import on_primary
+
+# =======================================================
+# CACHE ENTITAS (USER & DOCTOR) BERDASARKAN PRIMARY KEY
+# =======================================================
+# Read-through: get_user/get_doctor cek cache dulu, kalau tidak ada baru
+# query (User + Doctor sekaligus dengan joinedload) lalu simpan salinan
+# detached-nya. Saat dipakai, salinan di-merge(load=False) ke session
+# request, jadi objek bisa diubah & di-flush seperti hasil query biasa
+# tanpa SELECT tambahan.
+#
+# Invalidasi: setiap flush/commit yang menyentuh User/Doctor menghapus
+# entri terkait. Cache ini per proses; TTL membatasi data basi jika ada
+# proses lain yang menulis ke database.
+#
+# Cache miss selalu dibaca dari primary (on_primary): salinan dari replica
+# yang tertinggal bisa tersimpan sampai TTL habis walau sudah diinvalidasi.
+
+
+class EntityCache:
+    def __init__(self, ttl=300, max_size=10000):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def configure(self, ttl=None, max_size=None):
+        if ttl is not None:
+            self.ttl = ttl
+        if max_size is not None:
+            self.max_size = max_size
+        self.clear()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= now:
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *keys):
+        with self._lock:
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'ttl': self.ttl,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / total, 4) if total else None,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+entity_cache = EntityCache()
+
+
+# -------------------------------------------------------
+# SALINAN DETACHED
+# -------------------------------------------------------
+def _copy_columns(obj):
+    mapper = inspect(obj).mapper
+    clone = mapper.class_()
+    for attr in mapper.column_attrs:
+        set_committed_value(clone, attr.key, getattr(obj, attr.key))
+    return clone
+
+
+def _detached_user(user):
+    user_copy = _copy_columns(user)
+    doctor_copy = _copy_columns(user.doctor) if user.doctor else None
+    # set_committed_value: relasi dianggap sudah ter-load, tanpa history
+    set_committed_value(user_copy, 'doctor', doctor_copy)
+    make_transient_to_detached(user_copy)
+    if doctor_copy is not None:
+        set_committed_value(doctor_copy, 'user', user_copy)
+        make_transient_to_detached(doctor_copy)
+    return user_copy
+
+
+# -------------------------------------------------------
+# READ-THROUGH LOOKUP
+# -------------------------------------------------------
+def get_user(session, user_id):
+    """User berdasarkan id (beserta user.doctor), atau None."""
+    user_id = int(user_id)
+    cached = entity_cache.get(('User', user_id))
+    if cached is not None:
+        return session.merge(cached, load=False)
+
+    user = on_primary(session.query(User).options(joinedload(User.doctor)))\
+        .filter(User.id == user_id).first()
+    if user is not None:
+        _store(user)
+    return user
+
+
+def get_doctor(session, doctor_id):
+    """Doctor berdasarkan id (beserta doctor.user), atau None."""
+    doctor_id = int(doctor_id)
+    user_id = entity_cache.get(('Doctor', doctor_id))
+    if user_id is not None:
+        user = get_user(session, user_id)
+        if user is not None and user.doctor is not None:
+            return user.doctor
+
+    doctor = on_primary(session.query(Doctor).options(joinedload(Doctor.user)))\
+        .filter(Doctor.id == doctor_id).first()
+    if doctor is not None:
+        _store(doctor.user)
+    return doctor
+
+
+def _store(user):
+    entity_cache.set(('User', user.id), _detached_user(user))
+    if user.doctor is not None:
+        # Doctor cukup menyimpan pointer ke user_id; datanya ikut entri User
+        entity_cache.set(('Doctor', user.doctor.id), user.id)
+
+
+# -------------------------------------------------------
+# INVALIDASI DARI EVENT SESSION
+# -------------------------------------------------------
+def _keys_for(obj):
+    if isinstance(obj, User):
+        return [('User', obj.id)]
+    if isinstance(obj, Doctor):
+        return [('User', obj.user_id), ('Doctor', obj.id)]
+    return []
+
+
+@event.listens_for(Session, 'after_flush')
+def _invalidate_after_flush(session, flush_context):
+    keys = []
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        keys.extend(_keys_for(obj))
+    if keys:
+        entity_cache.invalidate(*keys)
+        session.info.setdefault('entity_cache_keys', set()).update(keys)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    # Hapus sekali lagi: thread lain bisa saja mengisi ulang cache dengan
+    # data lama di antara flush dan commit.
+    keys = session.info.pop('entity_cache_keys', None)
+    if keys:
+        entity_cache.invalidate(*keys)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_after_rollback(session, previous_transaction):
+    session.info.pop('entity_cache_keys', None)
@@ -0,0 +1,166 @@
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from pyramid.httpexceptions import HTTPNotModified
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from .models import DBSession
+
+# =======================================================
+# CONDITIONAL GET (ETag / If-None-Match / Last-Modified)
+# =======================================================
+# Setiap route baca yang mendukung 304 mendaftarkan fungsi "validator" lewat
+# @etag_validator('<route_name>'). Validator hanya menjalankan query agregat
+# murah (COUNT + MAX(updated_at)) untuk scope request tsb, jadi 304 bisa
+# dikirim sebelum view membangun body-nya.
+#
+# COUNT + MAX(updated_at) saja tidak cukup: CURRENT_TIMESTAMP SQLite hanya
+# per detik dan now() PostgreSQL = waktu mulai transaksi (transaksi yang
+# mulai lebih dulu tapi commit belakangan tidak menaikkan MAX). Karena itu
+# ETag juga memuat table_versions: counter per tabel yang naik setiap
+# transaksi yang menulis tabel tsb commit di proses ini.
+#
+# Validator mengembalikan (nilai_untuk_hash, last_modified) atau None jika
+# parameter tidak valid (biarkan view yang mengembalikan error-nya).
+
+VALIDATORS = {}
+
+
+def etag_validator(route_name):
+    def decorator(fn):
+        VALIDATORS[route_name] = fn
+        return fn
+    return decorator
+
+
+# -------------------------------------------------------
+# VERSI TABEL (NAIK SETIAP COMMIT YANG MENULIS)
+# -------------------------------------------------------
+class TableVersions:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions = {}
+
+    def bump(self, tables):
+        with self._lock:
+            for table in tables:
+                self._versions[table] = self._versions.get(table, 0) + 1
+
+    def get(self, *tables):
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+
+table_versions = TableVersions()
+
+
+def _written_tables(session):
+    return session.info.setdefault('written_tables', set())
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_flushed(session, flush_context):
+    tables = _written_tables(session)
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        table = getattr(obj, '__table__', None)
+        if table is not None:
+            tables.add(table.name)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_executed(orm_execute_state):
+    # INSERT / UPDATE / DELETE lewat session.execute (bulk, ON CONFLICT) tidak
+    # melewati flush
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if not orm_execute_state.is_select and table is not None:
+        _written_tables(orm_execute_state.session).add(table.name)
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_versions(session):
+    # Setelah commit (bukan saat flush): ETag baru tidak pernah dipasangkan
+    # dengan body lama yang dibaca sebelum data ter-commit
+    tables = session.info.pop('written_tables', None)
+    if tables:
+        table_versions.bump(tables)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_written(session, previous_transaction):
+    session.info.pop('written_tables', None)
+
+
+# -------------------------------------------------------
+# ZONA WAKTU KOLOM DATETIME
+# -------------------------------------------------------
+# Kolom DateTime tanpa zona waktu diisi func.now(): SQLite CURRENT_TIMESTAMP
+# = UTC, PostgreSQL now() = zona waktu session (setting TimeZone server).
+_database_zones = {}  # url engine -> tzinfo
+
+
+def database_timezone(bind):
+    if bind.dialect.name != 'postgresql':
+        return timezone.utc
+    zone = _database_zones.get(bind.url)
+    if zone is None:
+        with bind.connect() as connection:
+            name, offset = connection.execute(
+                text("SELECT current_setting('TimeZone'), EXTRACT(TIMEZONE FROM now())")).one()
+        try:
+            zone = ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            # Format POSIX ('<+07>-07'): pakai offset saat ini
+            zone = timezone(timedelta(seconds=int(offset)))
+        _database_zones[bind.url] = zone
+    return zone
+
+
+def _make_etag(request, parts):
+    raw = '|'.join([request.matched_route.name, request.query_string] + [str(p) for p in parts])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()[:20]
+
+
+def latest(*values):
+    """MAX dari beberapa timestamp, mengabaikan None."""
+    values = [v for v in values if v is not None]
+    return max(values) if values else None
+
+
+def conditional_get_subscriber(event):
+    """Subscriber ContextFound: route sudah diketahui, view belum dipanggil."""
+    request = event.request
+    if request.method != 'GET' or request.matched_route is None:
+        return
+    validator = VALIDATORS.get(request.matched_route.name)
+    if validator is None:
+        return
+
+    result = validator(request)
+    if result is None:
+        return
+    parts, last_modified = result
+
+    etag = _make_etag(request, parts)
+    if isinstance(last_modified, datetime) and last_modified.tzinfo is None:
+        last_modified = last_modified.replace(tzinfo=database_timezone(DBSession.get_bind()))
+
+    def set_validators(request, response):
+        if response.status_code in (200, 304):
+            response.etag = (etag, False)  # weak ETag
+            if last_modified is not None:
+                response.last_modified = last_modified
+            response.cache_control = 'no-cache'
+    request.add_response_callback(set_validators)
+
+    if request.headers.get('If-None-Match'):
+        fresh = etag in request.if_none_match
+    elif request.if_modified_since and last_modified is not None:
+        fresh = last_modified.replace(microsecond=0) <= request.if_modified_since
+    else:
+        fresh = False
+
+    if fresh:
+        raise HTTPNotModified()
@@ -0,0 +1,156 @@
+from sqlalchemy import event, func, text, true
+from sqlalchemy.orm import Session, aliased
+
+from .models import Appointment, AppointmentCounter
+from .partitions import ARCHIVE_SCHEMA, has_archive
+from .queries import dialect_insert, next_appointment_query
+from .transitions import VALID_STATUSES
+
+# =======================================================
+# COUNTER STATUS APPOINTMENT (DASHBOARD DOKTER / PASIEN)
+# =======================================================
+# appointment_counters menyimpan satu baris per dokter dan per pasien berisi
+# jumlah appointment untuk setiap status, jadi /api/stats/... cukup membaca
+# satu baris by primary key alih-alih menghitung ulang semua appointment.
+#
+# Setiap tempat yang membuat appointment / mengubah statusnya memanggil
+# count_transition() di dalam transaksi request. Delta dikumpulkan per baris
+# lalu ditulis sebagai SATU upsert (kolom = kolom + delta) tepat sebelum
+# COMMIT:
+#   - rollback / doom -> delta ikut dibuang, counter tidak pernah melenceng
+#   - lock baris counter dokter yang sibuk hanya ditahan sesaat di akhir
+#     transaksi, dan baris ditulis berurutan supaya tidak saling deadlock
+#
+# Data yang diubah langsung di database tidak ikut terhitung; cek & perbaiki
+# dengan: reconcile_counters [--dry-run]
+
+STATUSES = VALID_STATUSES
+
+
+def _zero():
+    return dict.fromkeys(STATUSES, 0)
+
+
+def count_transition(session, doctor_id, patient_id, old_status, new_status):
+    """Catat perpindahan status satu appointment (old_status None = baru dibuat)."""
+    if old_status == new_status:
+        return
+    deltas = session.info.setdefault('counter_deltas', {})
+    for key in (('doctor', doctor_id), ('patient', patient_id)):
+        counts = deltas.setdefault(key, _zero())
+        if old_status is not None:
+            counts[old_status] -= 1
+        if new_status is not None:
+            counts[new_status] += 1
+
+
+# Baris per statement upsert (6 parameter per baris, jauh di bawah batas
+# parameter PostgreSQL / SQLite)
+UPSERT_BATCH = 1000
+
+
+def _upsert(session, rows, absolute=False):
+    # rows: list dict owner_type, owner_id, <status>... (urut primary key)
+    table = AppointmentCounter.__table__
+    insert = dialect_insert(session)
+    for start in range(0, len(rows), UPSERT_BATCH):
+        stmt = insert(table).values(rows[start:start + UPSERT_BATCH])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['owner_type', 'owner_id'],
+            set_={status: stmt.excluded[status] if absolute else table.c[status] + stmt.excluded[status]
+                  for status in STATUSES}
+        )
+        session.execute(stmt)
+
+
+def apply_deltas(session, deltas):
+    rows = [dict(counts, owner_type=owner_type, owner_id=owner_id)
+            for (owner_type, owner_id), counts in sorted(deltas.items())
+            if any(counts.values())]
+    if rows:
+        _upsert(session, rows)
+
+
+@event.listens_for(Session, 'before_commit')
+def _write_counters(session):
+    deltas = session.info.pop('counter_deltas', None)
+    if deltas:
+        apply_deltas(session, deltas)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_deltas(session, previous_transaction):
+    session.info.pop('counter_deltas', None)
+
+
+# -------------------------------------------------------
+# BACA
+# -------------------------------------------------------
+def get_counts_and_next(session, owner_type, owner_id, today):
+    """({status: jumlah}, appointment aktif terdekat) satu dokter / pasien.
+
+    Satu query: baris counter (primary key) LEFT JOIN satu baris
+    next_appointment_query. (None, None) jika belum punya baris counter,
+    artinya belum pernah punya appointment (atau pemiliknya tidak ada).
+    """
+    upcoming = aliased(Appointment, next_appointment_query(
+        session, today, **{f'{owner_type}_id': owner_id}).limit(1).subquery())
+    row = session.query(AppointmentCounter, upcoming)\
+        .outerjoin(upcoming, true())\
+        .filter(AppointmentCounter.owner_type == owner_type, AppointmentCounter.owner_id == owner_id)\
+        .first()
+    if row is None:
+        return None, None
+    counter, appointment = row
+    return counter.to_json(), appointment
+
+
+# -------------------------------------------------------
+# REKONSILIASI
+# -------------------------------------------------------
+def expected_counts(session):
+    """{(owner_type, owner_id): {status: jumlah}} dihitung ulang dari appointments."""
+    expected = {}
+    for owner_type, column in (('doctor', Appointment.doctor_id), ('patient', Appointment.patient_id)):
+        rows = session.query(column, Appointment.status, func.count(Appointment.id))\
+            .group_by(column, Appointment.status)
+        for owner_id, status, count in rows:
+            expected.setdefault((owner_type, owner_id), _zero())[status] = count
+
+    # Partisi yang sudah diarsipkan (partitions.archive_partition) tetap dihitung
+    if has_archive(session.connection()):
+        for owner_type in ('doctor', 'patient'):
+            rows = session.execute(text(
+                f'SELECT {owner_type}_id, status, count(*) FROM {ARCHIVE_SCHEMA}.appointments '
+                f'GROUP BY {owner_type}_id, status'))
+            for owner_id, status, count in rows:
+                counts = expected.setdefault((owner_type, owner_id), _zero())
+                counts[status] = counts.get(status, 0) + count
+    return expected
+
+
+def reconcile_counters(session, fix=True):
+    """Bandingkan counter dengan hitungan ulang penuh; fix=True menulis nilai benar.
+
+    Mengembalikan list drift: dict owner_type, owner_id, expected, actual.
+    Pemanggil yang commit. Di PostgreSQL tabel counter dikunci (EXCLUSIVE,
+    SELECT tetap jalan) sebelum menghitung: transaksi yang sedang berjalan
+    menunggu di upsert-nya dan baru menambahkan delta setelah rekonsiliasi
+    commit, jadi hasilnya tetap konsisten walau aplikasi sedang dipakai.
+    """
+    if fix and session.get_bind().dialect.name == 'postgresql':
+        session.execute(text('LOCK TABLE appointment_counters IN EXCLUSIVE MODE'))
+
+    expected = expected_counts(session)
+    actual = {(row.owner_type, row.owner_id): row.to_json() for row in session.query(AppointmentCounter)}
+
+    drift = []
+    for key in sorted(set(expected) | set(actual)):
+        want, have = expected.get(key, _zero()), actual.get(key, _zero())
+        if want != have:
+            drift.append({'owner_type': key[0], 'owner_id': key[1], 'expected': want, 'actual': have})
+
+    if fix and drift:
+        _upsert(session, [dict(item['expected'], owner_type=item['owner_type'], owner_id=item['owner_id'])
+                          for item in drift], absolute=True)
+    return drift
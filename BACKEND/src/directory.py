@@ -0,0 +1,263 @@
+import hashlib
+import logging
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .models import DBSession, Doctor, User
+
+log = logging.getLogger(__name__)
+
+# =======================================================
+# INDEX DIREKTORI DOKTER (IN-MEMORY)
+# =======================================================
+# Dibangun sekali saat startup dari satu query (doctors JOIN users):
+#   _by_spec : specialization -> list id dokter (terurut)
+#   _names   : list (token_nama, id) terurut, untuk prefix search dengan bisect
+# Setelah commit yang menyentuh Doctor/User, hanya dokter terkait yang
+# di-refresh (lihat event di bawah). max_age membatasi umur index jika ada
+# proses lain yang menulis ke database.
+#
+# ETag /api/doctors diambil dari version() index ini (digest isi snapshot),
+# bukan dari database: body dan ETag selalu berasal dari sumber yang sama,
+# jadi index yang belum di-refresh tidak menghasilkan ETag "baru" untuk body lama.
+
+_TOKEN_RE = re.compile(r'[^\w]+', re.UNICODE)
+
+
+def _name_tokens(name):
+    lowered = name.lower()
+    tokens = {t for t in _TOKEN_RE.split(lowered) if t}
+    tokens.add(lowered)
+    return tokens
+
+
+class DoctorDirectory:
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._entries = {}   # id -> dict response
+        self._by_spec = {}   # specialization -> [id, ...] terurut
+        self._names = []     # [(token, id), ...] terurut
+        self._ids = []       # semua id terurut
+        self._updated = {}   # id -> updated_at terbaru (dokter / user-nya)
+        self._version = None # (digest, last_modified), dihitung ulang setelah berubah
+        self._loaded_at = None
+
+    # ---------------------------------------------------
+    # BUILD & UPDATE
+    # ---------------------------------------------------
+    def _rows(self, session, doctor_ids=None):
+        query = session.query(Doctor.id, User.name, Doctor.specialization, Doctor.schedule,
+                              Doctor.updated_at.label('doctor_updated'),
+                              User.updated_at.label('user_updated'))\
+            .join(User, Doctor.user_id == User.id)
+        if doctor_ids is not None:
+            query = query.filter(Doctor.id.in_(doctor_ids))
+        return query.all()
+
+    @staticmethod
+    def _entry(row):
+        return {
+            "id": row.id,
+            "name": row.name,
+            "specialization": row.specialization,
+            "schedule": row.schedule
+        }
+
+    @staticmethod
+    def _updated_at(row):
+        values = [v for v in (row.doctor_updated, row.user_updated) if v is not None]
+        return max(values) if values else None
+
+    def load(self, bind=None):
+        """Bangun ulang seluruh index dari database."""
+        session = Session(bind=bind or DBSession.get_bind())
+        try:
+            rows = self._rows(session)
+        finally:
+            session.close()
+
+        entries, by_spec, names, updated = {}, {}, [], {}
+        for row in rows:
+            entries[row.id] = self._entry(row)
+            updated[row.id] = self._updated_at(row)
+            by_spec.setdefault(row.specialization, []).append(row.id)
+            names.extend((token, row.id) for token in _name_tokens(row.name))
+        for ids in by_spec.values():
+            ids.sort()
+        names.sort()
+
+        with self._lock:
+            self._entries, self._by_spec, self._names = entries, by_spec, names
+            self._ids = sorted(entries)
+            self._updated = updated
+            self._version = None
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        with self._lock:
+            stale = self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age
+        if stale:
+            self.load()
+
+    def invalidate(self):
+        """Paksa index dibangun ulang penuh pada akses berikutnya."""
+        with self._lock:
+            self._loaded_at = None
+
+    def _remove_locked(self, doctor_id):
+        old = self._entries.pop(doctor_id, None)
+        self._updated.pop(doctor_id, None)
+        if old is None:
+            return
+        ids = self._by_spec.get(old['specialization'], [])
+        pos = bisect_left(ids, doctor_id)
+        if pos < len(ids) and ids[pos] == doctor_id:
+            del ids[pos]
+        if not ids:
+            self._by_spec.pop(old['specialization'], None)
+        for token in _name_tokens(old['name']):
+            pos = bisect_left(self._names, (token, doctor_id))
+            if pos < len(self._names) and self._names[pos] == (token, doctor_id):
+                del self._names[pos]
+        pos = bisect_left(self._ids, doctor_id)
+        if pos < len(self._ids) and self._ids[pos] == doctor_id:
+            del self._ids[pos]
+
+    def refresh(self, doctor_ids=(), user_ids=(), bind=None):
+        """Refresh sebagian: dokter dengan id tsb / milik user tsb."""
+        if self._loaded_at is None:
+            return
+        session = Session(bind=bind or DBSession.get_bind())
+        try:
+            doctor_ids = set(doctor_ids)
+            if user_ids:
+                doctor_ids.update(
+                    id_ for (id_,) in session.query(Doctor.id).filter(Doctor.user_id.in_(user_ids)))
+            if not doctor_ids:
+                return
+            rows = self._rows(session, doctor_ids)
+        finally:
+            session.close()
+
+        with self._lock:
+            for doctor_id in doctor_ids:
+                self._remove_locked(doctor_id)
+            for row in rows:
+                self._entries[row.id] = self._entry(row)
+                self._updated[row.id] = self._updated_at(row)
+                insort(self._by_spec.setdefault(row.specialization, []), row.id)
+                for token in _name_tokens(row.name):
+                    insort(self._names, (token, row.id))
+                insort(self._ids, row.id)
+            self._version = None
+
+    # ---------------------------------------------------
+    # QUERY
+    # ---------------------------------------------------
+    def _prefix_ids(self, prefix):
+        prefix = prefix.lower()
+        start = bisect_left(self._names, (prefix,))
+        end = bisect_left(self._names, (prefix + '\U0010ffff',))
+        return {id_ for _, id_ in self._names[start:end]}
+
+    def version(self):
+        """(digest, last_modified) isi index saat ini, untuk ETag /api/doctors."""
+        self.ensure_loaded()
+        with self._lock:
+            if self._version is None:
+                digest = hashlib.sha1()
+                for id_ in self._ids:
+                    entry = self._entries[id_]
+                    digest.update(repr((id_, entry['name'], entry['specialization'],
+                                        entry['schedule'])).encode('utf-8'))
+                updated = [v for v in self._updated.values() if v is not None]
+                self._version = (digest.hexdigest()[:16], max(updated) if updated else None)
+            return self._version
+
+    def all(self):
+        self.ensure_loaded()
+        with self._lock:
+            return [self._entries[id_] for id_ in self._ids]
+
+    def get(self, doctor_id):
+        """Data satu dokter (None jika tidak ada)."""
+        self.ensure_loaded()
+        with self._lock:
+            return self._entries.get(doctor_id)
+
+    def search(self, specialization=None, q=None, after=None, limit=50):
+        """Cari dokter. Mengembalikan dict: doctors, total, facets, next_cursor.
+
+        facets dihitung dari hasil filter nama (q) saja, supaya UI tetap bisa
+        menampilkan jumlah per spesialisasi saat salah satu dipilih.
+        """
+        self.ensure_loaded()
+        with self._lock:
+            if q:
+                name_ids = self._prefix_ids(q)
+                facets = {}
+                for id_ in name_ids:
+                    spec = self._entries[id_]['specialization']
+                    facets[spec] = facets.get(spec, 0) + 1
+            else:
+                name_ids = None
+                facets = {spec: len(ids) for spec, ids in self._by_spec.items()}
+
+            if specialization is not None:
+                candidates = self._by_spec.get(specialization, [])
+                if name_ids is not None:
+                    candidates = [id_ for id_ in candidates if id_ in name_ids]
+            elif name_ids is not None:
+                candidates = sorted(name_ids)
+            else:
+                candidates = self._ids
+
+            start = bisect_left(candidates, after + 1) if after is not None else 0
+            page = candidates[start:start + limit]
+            has_more = start + limit < len(candidates)
+            return {
+                'doctors': [self._entries[id_] for id_ in page],
+                'total': len(candidates),
+                'facets': dict(sorted(facets.items())),
+                'next_cursor': page[-1] if has_more and page else None
+            }
+
+
+doctor_directory = DoctorDirectory()
+
+
+# -------------------------------------------------------
+# REFRESH INKREMENTAL SETELAH COMMIT
+# -------------------------------------------------------
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    changes = session.info.setdefault('directory_changes', {'doctors': set(), 'users': set()})
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Doctor):
+            changes['doctors'].add(obj.id)
+        elif isinstance(obj, User) and obj.role == 'doctor':
+            changes['users'].add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    changes = session.info.pop('directory_changes', None)
+    if not changes or not (changes['doctors'] or changes['users']):
+        return
+    try:
+        doctor_directory.refresh(changes['doctors'], changes['users'], bind=session.get_bind())
+    except Exception:
+        # Jangan gagalkan request yang sudah commit; index dibangun ulang saat max_age habis
+        log.exception('Gagal refresh index direktori dokter')
+        doctor_directory.invalidate()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_changes(session, previous_transaction):
+    session.info.pop('directory_changes', None)
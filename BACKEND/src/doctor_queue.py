@@ -0,0 +1,174 @@
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import date, time as time_of_day
+
+from sqlalchemy.orm import Session
+
+from .models import DBSession, Appointment, Doctor
+
+# =======================================================
+# ANTRIAN HARI INI PER DOKTER (IN-MEMORY)
+# =======================================================
+# GET /api/doctors/{id}/queue dipanggil dokter setiap beberapa detik selama
+# jam praktik. Daftarnya dijaga di memori proses:
+#   _queues : doctor_id -> list (jam, id appointment) terurut
+#   _index  : id appointment -> (doctor_id, key, entry)
+# hanya untuk appointment HARI INI berstatus pending / confirmed.
+#
+#   - dibangun saat startup dengan satu query (doctors JOIN appointments
+#     lewat index dokter-tanggal-jam)
+#   - diperbarui dari event live sync (live.py) yang sudah dikirim setiap
+#     view penulis appointment (create/edit/bulk, rekam medis) setelah
+#     commit; di PostgreSQL lewat LISTEN/NOTIFY, jadi tulisan proses lain
+#     ikut masuk
+#   - tanggal berganti (lewat tengah malam) atau umur > max_age -> dibangun
+#     ulang saat dibaca; listener putus -> dibangun ulang juga (resync)
+#
+# Setting:
+#   queue.max_age = 300     # detik, batas umur jika ada tulisan di luar aplikasi
+
+QUEUE_STATUSES = ('pending', 'confirmed')
+
+
+def _as_date(value):
+    # Event lokal membawa objek date/time, event NOTIFY membawa string ISO
+    return value if isinstance(value, date) else date.fromisoformat(value)
+
+
+def _as_time(value):
+    return value if isinstance(value, time_of_day) else time_of_day.fromisoformat(value)
+
+
+class DoctorQueue:
+    def __init__(self, max_age=300):
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._day = None
+        self._queues = {}    # doctor_id -> [(appointment_time, id), ...] terurut
+        self._index = {}     # id -> (doctor_id, key, entry)
+        self._buffers = []   # event yang datang selama load() berjalan
+        self._loaded_at = None
+
+    # ---------------------------------------------------
+    # BUILD
+    # ---------------------------------------------------
+    def load(self, bind=None):
+        """Bangun ulang antrian hari ini dari database."""
+        today = date.today()
+        buffer = []
+        with self._lock:
+            self._buffers.append(buffer)
+        try:
+            session = Session(bind=bind or DBSession.get_bind())
+            try:
+                rows = session.query(
+                    Appointment.id, Appointment.patient_id, Appointment.doctor_id,
+                    Appointment.appointment_date, Appointment.appointment_time, Appointment.status
+                ).join(Doctor, Appointment.doctor_id == Doctor.id).filter(
+                    Appointment.appointment_date == today,
+                    Appointment.status.in_(QUEUE_STATUSES)
+                ).all()
+            finally:
+                session.close()
+        except Exception:
+            with self._lock:
+                self._buffers = [b for b in self._buffers if b is not buffer]
+            raise
+
+        queues, index = {}, {}
+        for row in rows:
+            key = (row.appointment_time, row.id)
+            queues.setdefault(row.doctor_id, []).append(key)
+            index[row.id] = (row.doctor_id, key, self._entry(row._asdict()))
+        for keys in queues.values():
+            keys.sort()
+
+        with self._lock:
+            self._buffers = [b for b in self._buffers if b is not buffer]
+            self._day, self._queues, self._index = today, queues, index
+            # Commit yang terjadi selama query berjalan belum tentu terlihat
+            for item in buffer:
+                self._apply_locked(item)
+            self._loaded_at = time.monotonic()
+
+    def ensure_loaded(self):
+        with self._lock:
+            stale = self._loaded_at is None or self._day != date.today() \
+                or time.monotonic() - self._loaded_at > self.max_age
+        if stale:
+            self.load()
+
+    def invalidate(self):
+        """Paksa antrian dibangun ulang pada akses berikutnya."""
+        with self._lock:
+            self._loaded_at = None
+
+    # ---------------------------------------------------
+    # UPDATE DARI EVENT LIVE SYNC (consumer live_hub)
+    # ---------------------------------------------------
+    @staticmethod
+    def _entry(values):
+        return {
+            'id': values['id'],
+            'patient_id': values['patient_id'],
+            'doctor_id': values['doctor_id'],
+            'appointment_date': _as_date(values['appointment_date']),
+            'appointment_time': _as_time(values['appointment_time']),
+            'status': values['status']
+        }
+
+    def _apply_locked(self, item):
+        appointment_id = item['appointment_id']
+        old = self._index.pop(appointment_id, None)
+        if old is not None:
+            doctor_id, key, _ = old
+            keys = self._queues.get(doctor_id, [])
+            pos = bisect_left(keys, key)
+            if pos < len(keys) and keys[pos] == key:
+                del keys[pos]
+            if not keys:
+                self._queues.pop(doctor_id, None)
+
+        if item['status'] not in QUEUE_STATUSES or _as_date(item['appointment_date']) != self._day:
+            return
+        entry = self._entry(dict(item, id=appointment_id))
+        key = (entry['appointment_time'], appointment_id)
+        insort(self._queues.setdefault(entry['doctor_id'], []), key)
+        self._index[appointment_id] = (entry['doctor_id'], key, entry)
+
+    def apply_events(self, events):
+        """Terapkan event appointment yang sudah commit (lihat live.py)."""
+        with self._lock:
+            for buffer in self._buffers:
+                buffer.extend(events)
+            if self._loaded_at is None:
+                return
+            for item in events:
+                self._apply_locked(item)
+
+    def resync(self):
+        # Event bisa hilang (listener putus): bangun ulang saat dibaca
+        self.invalidate()
+
+    # ---------------------------------------------------
+    # QUERY
+    # ---------------------------------------------------
+    def get(self, doctor_id):
+        """(tanggal, [appointment ...]) antrian hari ini satu dokter, urut jam."""
+        self.ensure_loaded()
+        with self._lock:
+            return self._day, [self._index[id_][2] for _, id_ in self._queues.get(doctor_id, ())]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'day': self._day,
+                'doctors': len(self._queues),
+                'appointments': len(self._index),
+                'age_seconds': round(time.monotonic() - self._loaded_at, 1)
+                if self._loaded_at is not None else None
+            }
+
+
+doctor_queue = DoctorQueue()
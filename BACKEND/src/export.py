@@ -0,0 +1,113 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+
+from pyramid.response import Response
+from sqlalchemy.orm import Session
+
+from . import renderers
+from .models import DBSession
+from .replicas import read_bind
+
+# =======================================================
+# EXPORT MASSAL (CSV / NDJSON)
+# =======================================================
+# /api/export/appointments dan /api/export/medical-records bisa berisi jutaan
+# baris. Berbeda dengan streaming.py (satu dokumen JSON), export ditulis per
+# baris dalam format yang bisa dibaca bertahap oleh penerimanya:
+#   format=csv     header + satu baris per record (default)
+#   format=ndjson  satu objek JSON per baris
+#
+#   - query dijalankan dengan server-side cursor (stream_results: di
+#     psycopg2 = named cursor), baris diambil FETCH_SIZE sekaligus
+#   - baris ditulis ke buffer dan dikirim per ~CHUNK_SIZE byte lewat
+#     app_iter, jadi memori worker tetap beberapa MB berapapun jumlah barisnya
+#   - client yang mengirim Accept-Encoding: gzip menerima response yang
+#     dikompres on the fly (Content-Encoding: gzip)
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+
+FETCH_SIZE = 2000
+CHUNK_SIZE = 64 * 1024
+GZIP_LEVEL = 6
+
+
+def _cell(value):
+    # None -> '' dan date/time -> ISO sudah ditangani csv.writer (str());
+    # datetime diberi pemisah 'T' supaya sama dengan JSON / NDJSON
+    return value.isoformat() if type(value) is datetime else value
+
+
+def _csv_lines(rows, columns):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_cell(value) for value in row])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def _ndjson_lines(rows, columns):
+    chunk = bytearray()
+    for row in rows:
+        chunk += renderers.dumps(dict(zip(columns, row)))
+        chunk += b'\n'
+        if len(chunk) >= CHUNK_SIZE:
+            yield bytes(chunk)
+            chunk.clear()
+    yield bytes(chunk)
+
+
+WRITERS = {'csv': _csv_lines, 'ndjson': _ndjson_lines}
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    try:
+        for chunk in chunks:
+            data = compressor.compress(chunk)
+            if data:
+                yield data
+        yield compressor.flush()
+    finally:
+        # Client putus di tengah jalan: session & cursor di bawahnya ikut ditutup
+        chunks.close()
+
+
+def _iter_export(query, bind, fmt, fetch_size):
+    # Session terpisah: generator berjalan setelah pyramid_tm menutup
+    # transaksi request (sama dengan streaming.py)
+    session = Session(bind=bind)
+    try:
+        result = session.execute(
+            query.statement.execution_options(stream_results=True, yield_per=fetch_size))
+        columns = list(result.keys())
+        for chunk in WRITERS[fmt](result, columns):
+            if chunk:
+                yield chunk
+    finally:
+        session.close()
+
+
+def stream_export(request, query, fmt, filename, fetch_size=FETCH_SIZE):
+    """Response download berisi hasil query dalam format fmt (csv / ndjson)."""
+    content_type, extension = FORMATS[fmt]
+    response = Response(content_type=content_type, charset='utf-8')
+    response.content_disposition = f'attachment; filename="{filename}.{extension}"'
+    response.vary = ('Accept-Encoding',)
+    # Bind dipilih sekarang, selagi request (dan pilihan replica-nya) masih aktif
+    app_iter = _iter_export(query, read_bind(DBSession), fmt, fetch_size)
+    # Tanpa header Accept-Encoding (curl polos, script) -> tidak dikompres
+    if 'Accept-Encoding' in request.headers and request.accept_encoding.acceptable_offers(['gzip']):
+        response.content_encoding = 'gzip'
+        app_iter = _gzip(app_iter)
+    response.app_iter = app_iter
+    return response
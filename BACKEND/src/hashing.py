@@ -0,0 +1,114 @@
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError
+
+import bcrypt
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+# =======================================================
+# EXECUTOR HASHING PASSWORD (BCRYPT)
+# =======================================================
+# bcrypt sengaja lambat (~250 ms per hash). Supaya login/register yang ramai
+# tidak menghabiskan CPU untuk endpoint lain, semua hashing dikirim ke pool
+# berukuran tetap. Jika antrian penuh, langsung gagal dengan HashingBusy
+# (dijadikan 503 oleh views/errors.py) daripada ikut mengantri.
+#
+# Di mode ASGI (asgi.py) view berjalan di event loop: hasil hashing
+# ditunggu dengan await, jadi loop tetap melayani request lain.
+
+DEFAULT_ROUNDS = 12
+
+
+class HashingBusy(Exception):
+    """Antrian hashing penuh atau terlalu lama menunggu."""
+
+
+# Fungsi worker harus top-level supaya bisa di-pickle ke process pool
+def _hashpw(password, rounds):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _checkpw(password, hashed):
+    return bcrypt.checkpw(password, hashed)
+
+
+def hash_rounds(hashed):
+    """Ambil cost factor dari hash bcrypt, contoh "$2b$12$..." -> 12."""
+    try:
+        return int(hashed.split('$')[2])
+    except (IndexError, ValueError):
+        return None
+
+
+class PasswordHasher:
+    def __init__(self, executor='process', workers=2, max_pending=32, rounds=DEFAULT_ROUNDS, timeout=10.0):
+        self.executor_kind = executor
+        self.workers = workers
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            executor=settings.get('hashing.executor', 'process'),
+            workers=int(settings.get('hashing.workers', 2)),
+            max_pending=int(settings.get('hashing.max_pending', 32)),
+            rounds=int(settings.get('hashing.rounds', DEFAULT_ROUNDS)),
+            timeout=float(settings.get('hashing.timeout', 10)),
+        )
+
+    def _get_executor(self):
+        # Dibuat saat pertama dipakai (setelah server jalan), bukan saat import
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.executor_kind == 'thread':
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers, thread_name_prefix='bcrypt')
+                    else:
+                        # spawn: aman dipakai dari proses yang sudah punya banyak thread
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context('spawn'))
+        return self._executor
+
+    def submit(self, fn, *args):
+        """Kirim pekerjaan ke pool; HashingBusy jika antrian sudah penuh."""
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _run(self, fn, *args):
+        future = self.submit(fn, *args)
+        try:
+            if in_greenlet():
+                return await_only(asyncio.wait_for(asyncio.wrap_future(future), self.timeout))
+            return future.result(timeout=self.timeout)
+        except (TimeoutError, asyncio.TimeoutError):
+            future.cancel()
+            raise HashingBusy()
+
+    def hash(self, password):
+        return self._run(_hashpw, password.encode('utf-8'), self.rounds).decode('utf-8')
+
+    def check(self, password, hashed):
+        return self._run(_checkpw, password.encode('utf-8'), hashed.encode('utf-8'))
+
+    def needs_rehash(self, hashed):
+        return hash_rounds(hashed) != self.rounds
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,339 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import deque
+
+from pyramid.response import Response
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+from sqlalchemy.util.concurrency import await_only, in_greenlet
+
+from . import renderers
+
+log = logging.getLogger(__name__)
+
+# =======================================================
+# LIVE SYNC APPOINTMENT (LISTEN/NOTIFY -> SSE)
+# =======================================================
+# View yang menulis appointment (create/edit/bulk, rekam medis) memanggil
+# publish_appointment(session, ...) di dalam transaksi request. Event baru
+# dikirim saat commit:
+#   - PostgreSQL: pg_notify dijalankan tepat sebelum COMMIT di koneksi
+#     transaksi itu sendiri; Postgres meneruskannya hanya jika commit berhasil
+#   - dialect lain (SQLite dev): langsung ke hub proses ini setelah commit
+# Setiap proses punya SATU koneksi LISTEN (thread listener, dibuka saat
+# subscriber pertama datang) yang membagikan event ke semua koneksi SSE
+# (GET /api/appointments/stream) lewat antrian in-memory per subscriber.
+# Jumlah client yang menonton tidak menambah query ke database.
+#
+# Struktur in-memory lain (doctor_queue.py) bisa ikut menerima semua event
+# lewat live_hub.add_consumer().
+#
+# Koneksi listener putus / antrian subscriber penuh -> subscriber menerima
+# event "resync" dan sebaiknya memuat ulang list lewat /api/appointments/filter.
+#
+# Catatan Waitress: satu koneksi SSE memakai satu thread selama terbuka,
+# jadi default live.max_subscribers = threads // 2. Untuk banyak penonton
+# jalankan serve_asgi (satu event loop untuk semua koneksi).
+#
+# Setting:
+#   live.max_subscribers = 2     # koneksi SSE per proses (lebih -> 503)
+#   live.heartbeat = 15          # detik antar komentar keep-alive SSE
+
+CHANNEL = 'cliniga_appointments'
+
+# Payload NOTIFY dibatasi 8000 byte; event dikirim per kelompok
+EVENTS_PER_NOTIFY = 20
+
+# Event yang boleh menumpuk per subscriber sebelum diganti "resync"
+MAX_QUEUED = 200
+
+LISTENER_RETRY = 5
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+def _frame(name, data):
+    return b'event: ' + name + b'\ndata: ' + data + b'\n\n'
+
+
+RESYNC = _frame(b'resync', b'{}')
+
+
+def _event(kind, appointment, extra):
+    get = appointment.get if isinstance(appointment, dict) else lambda name: getattr(appointment, name)
+    return dict({
+        'type': kind,
+        'appointment_id': get('id'),
+        'doctor_id': get('doctor_id'),
+        'patient_id': get('patient_id'),
+        'status': get('status'),
+        'appointment_date': get('appointment_date'),
+        'appointment_time': get('appointment_time'),
+    }, **extra)
+
+
+def publish_appointment(session, kind, appointment, **extra):
+    """Antrikan event appointment; terkirim ke subscriber setelah transaksi commit.
+
+    appointment: objek Appointment atau dict dengan kolom yang sama
+    (id, doctor_id, patient_id, status, appointment_date, appointment_time).
+    """
+    session.info.setdefault('live_events', []).append(_event(kind, appointment, extra))
+
+
+# -------------------------------------------------------
+# SUBSCRIBER
+# -------------------------------------------------------
+class Subscription:
+    """Antrian event satu koneksi SSE.
+
+    get() menunggu dengan threading.Event di thread Waitress, atau dengan
+    await di greenlet request mode ASGI (event loop tidak ikut diblok).
+    """
+
+    def __init__(self, hub, keys):
+        self.hub = hub
+        self.keys = keys
+        self._frames = deque()
+        self._lock = threading.Lock()
+        if in_greenlet():
+            self._loop = asyncio.get_running_loop()
+            self._wakeup = asyncio.Event()
+        else:
+            self._loop = None
+            self._wakeup = threading.Event()
+
+    def put(self, frame):
+        # Dipanggil dari thread listener (atau thread yang commit)
+        with self._lock:
+            if len(self._frames) >= MAX_QUEUED:
+                self._frames.clear()
+                frame = RESYNC  # client terlalu lambat: minta muat ulang
+            self._frames.append(frame)
+        if self._loop is None:
+            self._wakeup.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def get(self, timeout):
+        """Frame SSE yang menunggu (list kosong jika timeout)."""
+        if not self._frames:
+            if self._loop is None:
+                self._wakeup.wait(timeout)
+            else:
+                try:
+                    await_only(asyncio.wait_for(self._wakeup.wait(), timeout))
+                except asyncio.TimeoutError:
+                    pass
+        self._wakeup.clear()
+        with self._lock:
+            frames = list(self._frames)
+            self._frames.clear()
+        return frames
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+# -------------------------------------------------------
+# HUB (SATU PER PROSES)
+# -------------------------------------------------------
+class LiveHub:
+    def __init__(self):
+        self.url = None
+        self.max_subscribers = 2
+        self.heartbeat = 15
+        self.delivered = 0
+        self._subscribers = {}   # ('doctor'|'patient', id) -> set(Subscription)
+        self._count = 0
+        self._lock = threading.Lock()
+        self._listener = None
+        self._listening = threading.Event()
+        self._consumers = []     # struktur in-memory lain yang ikut menerima event
+
+    def configure(self, engine, max_subscribers=2, heartbeat=15):
+        # Listener hanya untuk PostgreSQL; dialect lain dikirim langsung saat commit
+        self.url = engine.url if engine.dialect.name == 'postgresql' else None
+        self.max_subscribers = max_subscribers
+        self.heartbeat = heartbeat
+
+    def subscribe(self, doctor_id=None, patient_id=None):
+        keys = []
+        if doctor_id is not None:
+            keys.append(('doctor', doctor_id))
+        if patient_id is not None:
+            keys.append(('patient', patient_id))
+        subscription = Subscription(self, keys)
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                raise TooManySubscribers()
+            self._count += 1
+            for key in keys:
+                self._subscribers.setdefault(key, set()).add(subscription)
+            # Listener dibuka saat dibutuhkan (setelah fork worker, bukan saat import)
+            self._start_listener_locked()
+        return subscription
+
+    def _start_listener_locked(self):
+        if self.url is not None and self._listener is None:
+            self._listener = threading.Thread(target=self._listen, name='live-listener', daemon=True)
+            self._listener.start()
+
+    def add_consumer(self, consumer, wait=5):
+        """Daftarkan penerima SEMUA event appointment (mis. doctor_queue).
+
+        consumer.apply_events(events) dipanggil setelah commit, consumer.resync()
+        saat event mungkin hilang. Di PostgreSQL listener langsung dibuka dan
+        ditunggu sampai LISTEN aktif (maks `wait` detik), supaya consumer yang
+        dibangun sesudahnya tidak melewatkan commit.
+        """
+        with self._lock:
+            if consumer not in self._consumers:
+                self._consumers.append(consumer)
+            self._start_listener_locked()
+        if self.url is not None:
+            self._listening.wait(wait)
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._count -= 1
+            for key in subscription.keys:
+                subscribers = self._subscribers.get(key)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscribers[key]
+
+    def dispatch(self, events):
+        """Bagikan event ke consumer dan subscriber dokter / pasien terkait."""
+        for consumer in self._consumers:
+            try:
+                consumer.apply_events(events)
+            except Exception:
+                log.exception('Consumer live sync gagal menerapkan event')
+                consumer.resync()
+        for item in events:
+            with self._lock:
+                targets = set(self._subscribers.get(('doctor', item['doctor_id']), ())) \
+                    | self._subscribers.get(('patient', item['patient_id']), set())
+            if not targets:
+                continue
+            # Diserialisasi sekali per event, bukan per subscriber
+            frame = _frame(b'appointment', renderers.dumps(item))
+            for subscription in targets:
+                subscription.put(frame)
+            self.delivered += len(targets)
+
+    def _resync_all(self):
+        for consumer in self._consumers:
+            consumer.resync()
+        with self._lock:
+            targets = set().union(*self._subscribers.values()) if self._subscribers else set()
+        for subscription in targets:
+            subscription.put(RESYNC)
+
+    def stats(self):
+        return {
+            'subscribers': self._count,
+            'max_subscribers': self.max_subscribers,
+            'delivered': self.delivered,
+            'listening': self._listener is not None and self._listener.is_alive(),
+        }
+
+    # ---------------------------------------------------
+    # LISTENER (thread, psycopg2 juga saat server memakai asyncpg)
+    # ---------------------------------------------------
+    def _listen(self):
+        engine = create_engine(self.url.set(drivername='postgresql+psycopg2'), poolclass=NullPool)
+        missed = False
+        while True:
+            raw = None
+            try:
+                raw = engine.raw_connection()
+                conn = raw.driver_connection
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {CHANNEL}')
+                self._listening.set()
+                if missed:
+                    # Event selama koneksi putus hilang: minta client memuat ulang
+                    self._resync_all()
+                    missed = False
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.dispatch(json.loads(conn.notifies.pop(0).payload))
+            except Exception:
+                self._listening.clear()
+                missed = True
+                log.exception('Listener live sync terputus, mencoba lagi dalam %s detik', LISTENER_RETRY)
+            finally:
+                if raw is not None:
+                    try:
+                        raw.close()
+                    except Exception:
+                        pass
+            time.sleep(LISTENER_RETRY)
+
+
+live_hub = LiveHub()
+
+
+# -------------------------------------------------------
+# RESPONSE SSE
+# -------------------------------------------------------
+def _iter_frames(subscription, heartbeat):
+    try:
+        # Header & retry dikirim langsung supaya client tahu stream sudah terbuka
+        yield b'retry: 3000\n\n'
+        while True:
+            frames = subscription.get(heartbeat)
+            # Komentar keep-alive juga mendeteksi client yang sudah putus
+            yield b''.join(frames) if frames else b': ping\n\n'
+    finally:
+        subscription.close()
+
+
+def sse_response(subscription):
+    """Response text/event-stream yang menulis event subscriber sampai client putus."""
+    response = Response(content_type='text/event-stream', charset='utf-8')
+    response.cache_control = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: jangan di-buffer
+    response.app_iter = _iter_frames(subscription, subscription.hub.heartbeat)
+    return response
+
+
+# -------------------------------------------------------
+# KIRIM SAAT COMMIT
+# -------------------------------------------------------
+@event.listens_for(Session, 'before_commit')
+def _notify_before_commit(session):
+    events = session.info.get('live_events')
+    if not events or session.get_bind().dialect.name != 'postgresql':
+        return
+    del session.info['live_events']
+    for start in range(0, len(events), EVENTS_PER_NOTIFY):
+        payload = renderers.dumps(events[start:start + EVENTS_PER_NOTIFY]).decode('utf-8')
+        session.execute(text('SELECT pg_notify(:channel, :payload)'), {'channel': CHANNEL, 'payload': payload})
+
+
+@event.listens_for(Session, 'after_commit')
+def _dispatch_after_commit(session):
+    # Tanpa LISTEN/NOTIFY (SQLite): hanya subscriber di proses ini
+    events = session.info.pop('live_events', None)
+    if events:
+        live_hub.dispatch(events)
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_events(session, previous_transaction):
+    session.info.pop('live_events', None)
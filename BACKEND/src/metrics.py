@@ -0,0 +1,249 @@
+import threading
+import time
+from contextvars import ContextVar
+
+from pyramid.interfaces import IRoutesMapper
+from sqlalchemy import event
+
+# =======================================================
+# METRIK PER ROUTE (LATENSI, STATUS, BIAYA SQL)
+# =======================================================
+# - metrics_tween: latensi & status per route
+# - instrument_engine: hook before/after_cursor_execute, jumlah query, total
+#   waktu DB dan statement paling lambat dihitung ke request yang sedang
+#   berjalan di thread yang sama
+# - render_prometheus: format teks Prometheus untuk GET /api/_metrics
+# - slowest_queries: teks SQL paling lambat per route untuk /api/_pool/stats
+#   (tidak dijadikan label Prometheus: setiap statement baru = series baru)
+#
+# Setiap thread Waitress menulis ke statistiknya sendiri (threading.local),
+# jadi jalur request tidak mengambil lock sama sekali. Lock hanya dipakai
+# sekali per thread saat statistiknya didaftarkan, dan scrape menjumlahkan
+# semua thread. Biaya SQL request yang sedang berjalan disimpan di
+# ContextVar (per thread di WSGI, per request di mode ASGI).
+#
+# Catatan: response streaming (app_iter) ditulis setelah tween selesai,
+# jadi latensi & query saat streaming tidak ikut terhitung.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Panjang maksimal teks SQL statement paling lambat di /api/_pool/stats
+MAX_STATEMENT_LENGTH = 200
+
+NOT_FOUND = '(not_found)'
+
+
+class _ThreadStats:
+    __slots__ = ('latency', 'statuses', 'db')
+
+    def __init__(self):
+        self.latency = {}   # route -> [count per bucket..., +Inf, sum]
+        self.statuses = {}  # (route, method, status) -> jumlah
+        self.db = {}        # route -> [queries, detik, slowest_detik, slowest_sql]
+
+
+class RequestMetrics:
+    def __init__(self):
+        self._local = threading.local()
+        self._threads = []
+        self._register_lock = threading.Lock()
+        # [queries, detik, slowest_detik, slowest_sql] untuk request berjalan
+        self._current = ContextVar('request_metrics_current', default=None)
+
+    # ---------------------------------------------------
+    # HOT PATH (tanpa lock)
+    # ---------------------------------------------------
+    def _stats(self):
+        stats = getattr(self._local, 'stats', None)
+        if stats is None:
+            stats = self._local.stats = _ThreadStats()
+            with self._register_lock:
+                self._threads.append(stats)
+        return stats
+
+    def begin_request(self):
+        self._current.set([0, 0.0, 0.0, None])
+
+    def end_request(self, route, method, status, elapsed):
+        stats = self._stats()
+        cost = self._current.get()
+        self._current.set(None)
+
+        latency = stats.latency.get(route)
+        if latency is None:
+            latency = stats.latency[route] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if elapsed <= bound:
+                latency[i] += 1
+                break
+        else:
+            latency[len(LATENCY_BUCKETS)] += 1
+        latency[-1] += elapsed
+
+        key = (route, method, status)
+        stats.statuses[key] = stats.statuses.get(key, 0) + 1
+
+        if cost is not None:
+            db = stats.db.get(route)
+            if db is None:
+                db = stats.db[route] = [0, 0.0, 0.0, None]
+            db[0] += cost[0]
+            db[1] += cost[1]
+            if cost[2] > db[2]:
+                db[2], db[3] = cost[2], cost[3]
+
+    def record_query(self, statement, elapsed):
+        cost = self._current.get()
+        if cost is None:
+            return  # query di luar request (startup, thread latar)
+        cost[0] += 1
+        cost[1] += elapsed
+        if elapsed > cost[2]:
+            cost[2], cost[3] = elapsed, statement
+
+    # ---------------------------------------------------
+    # SCRAPE
+    # ---------------------------------------------------
+    def collect(self):
+        """Jumlahkan statistik semua thread -> (latency, statuses, db)."""
+        with self._register_lock:
+            threads = list(self._threads)
+        latency, statuses, db = {}, {}, {}
+        for stats in threads:
+            # dict.copy() atomik di bawah GIL; isi list boleh sedikit tertinggal
+            for route, values in stats.latency.copy().items():
+                total = latency.setdefault(route, [0] * (len(LATENCY_BUCKETS) + 1) + [0.0])
+                for i, v in enumerate(values):
+                    total[i] += v
+            for key, count in stats.statuses.copy().items():
+                statuses[key] = statuses.get(key, 0) + count
+            for route, values in stats.db.copy().items():
+                total = db.setdefault(route, [0, 0.0, 0.0, None])
+                total[0] += values[0]
+                total[1] += values[1]
+                if values[2] > total[2]:
+                    total[2], total[3] = values[2], values[3]
+        return latency, statuses, db
+
+    def slowest_queries(self):
+        """{route: {'seconds', 'statement'}} query paling lambat per route sejak start."""
+        db = self.collect()[2]
+        return {route: {'seconds': round(values[2], 6), 'statement': _shorten_statement(values[3])}
+                for route, values in sorted(db.items()) if values[3] is not None}
+
+
+request_metrics = RequestMetrics()
+
+
+# -------------------------------------------------------
+# TWEEN
+# -------------------------------------------------------
+def _route_name(request, registry):
+    route = getattr(request, 'matched_route', None)
+    if route is None:
+        # Request dihentikan sebelum routing (mis. 401 dari jwt_tween)
+        mapper = registry.queryUtility(IRoutesMapper)
+        info = mapper(request) if mapper is not None else None
+        route = info['route'] if info else None
+    return route.name if route is not None else NOT_FOUND
+
+
+def metrics_tween_factory(handler, registry):
+    def metrics_tween(request):
+        request_metrics.begin_request()
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = handler(request)
+            status = response.status_code
+            return response
+        finally:
+            request_metrics.end_request(
+                _route_name(request, registry), request.method, status,
+                time.perf_counter() - start)
+    return metrics_tween
+
+
+# -------------------------------------------------------
+# HOOK SQLALCHEMY
+# -------------------------------------------------------
+def instrument_engine(engine):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if starts:
+            request_metrics.record_query(statement, time.perf_counter() - starts.pop())
+
+
+# -------------------------------------------------------
+# FORMAT PROMETHEUS
+# -------------------------------------------------------
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + '}'
+
+
+def _shorten_statement(sql):
+    sql = ' '.join((sql or '').split())
+    return sql if len(sql) <= MAX_STATEMENT_LENGTH else sql[:MAX_STATEMENT_LENGTH] + '...'
+
+
+def render_prometheus(metrics=request_metrics, pool=None):
+    """Teks exposition Prometheus (version 0.0.4). pool: hasil pool.pool_stats()."""
+    latency, statuses, db = metrics.collect()
+    lines = []
+
+    lines += ['# HELP cliniga_http_request_duration_seconds Latensi request per route.',
+              '# TYPE cliniga_http_request_duration_seconds histogram']
+    for route in sorted(latency):
+        values = latency[route]
+        running = 0
+        for bound, count in zip(LATENCY_BUCKETS, values):
+            running += count
+            lines.append(f'cliniga_http_request_duration_seconds_bucket{_labels(route=route, le=bound)} {running}')
+        running += values[len(LATENCY_BUCKETS)]
+        lines.append(f'cliniga_http_request_duration_seconds_bucket{_labels(route=route, le="+Inf")} {running}')
+        lines.append(f'cliniga_http_request_duration_seconds_sum{_labels(route=route)} {values[-1]:.6f}')
+        lines.append(f'cliniga_http_request_duration_seconds_count{_labels(route=route)} {running}')
+
+    lines += ['# HELP cliniga_http_requests_total Jumlah request per route, method dan status.',
+              '# TYPE cliniga_http_requests_total counter']
+    for (route, method, status), count in sorted(statuses.items()):
+        lines.append(f'cliniga_http_requests_total{_labels(route=route, method=method, status=status)} {count}')
+
+    lines += ['# HELP cliniga_db_queries_total Jumlah query SQL per route.',
+              '# TYPE cliniga_db_queries_total counter']
+    for route in sorted(db):
+        lines.append(f'cliniga_db_queries_total{_labels(route=route)} {db[route][0]}')
+
+    lines += ['# HELP cliniga_db_query_seconds_total Total waktu query SQL per route.',
+              '# TYPE cliniga_db_query_seconds_total counter']
+    for route in sorted(db):
+        lines.append(f'cliniga_db_query_seconds_total{_labels(route=route)} {db[route][1]:.6f}')
+
+    lines += ['# HELP cliniga_db_slowest_query_seconds Query paling lambat per route sejak start.',
+              '# TYPE cliniga_db_slowest_query_seconds gauge']
+    for route in sorted(db):
+        if db[route][3] is not None:
+            lines.append(f'cliniga_db_slowest_query_seconds{_labels(route=route)} {db[route][2]:.6f}')
+
+    if pool:
+        for name, kind, help_text in (
+            ('checked_out', 'gauge', 'Koneksi yang sedang dipakai.'),
+            ('saturation', 'gauge', 'checked_out / (pool_size + max_overflow).'),
+            ('checkouts', 'counter', 'Jumlah checkout koneksi.'),
+            ('timeouts', 'counter', 'Checkout yang gagal karena pool_timeout.'),
+            ('invalidations', 'counter', 'Koneksi yang dibuang (basi / error).'),
+        ):
+            metric = f'cliniga_db_pool_{name}' + ('_total' if kind == 'counter' else '')
+            lines += [f'# HELP {metric} {help_text}', f'# TYPE {metric} {kind}',
+                      f'{metric} {pool[name] or 0}']
+
+    return '\n'.join(lines) + '\n'
@@ -7,17 +7,41 @@ from sqlalchemy import (
     Time,
     DateTime,
     ForeignKey,
+    ForeignKeyConstraint,
+    UniqueConstraint,
     CheckConstraint,
-    func
+    Index,
+    Boolean,
+    DDL,
+    event,
+    func,
+    text
 )
+from contextvars import ContextVar
+
+import transaction
 from sqlalchemy.orm import declarative_base, relationship, sessionmaker, scoped_session
 from zope.sqlalchemy import register
 
+from .replicas import RoutingSession
+
 # =======================================================
 # 1. SETUP KONEKSI KHUSUS PYRAMID
 # =======================================================
-DBSession = scoped_session(sessionmaker())
-register(DBSession)
+# Transaction manager milik request yang sedang berjalan. Di WSGI tidak di-set
+# (transaction.manager per thread, seperti biasa); di mode ASGI banyak request
+# berbagi satu thread, jadi asgi.py memberi setiap request manager sendiri.
+request_transaction_manager = ContextVar('request_transaction_manager', default=None)
+
+
+class _CurrentTransactionManager:
+    def __getattr__(self, name):
+        return getattr(request_transaction_manager.get() or transaction.manager, name)
+
+
+# RoutingSession: SELECT request GET ke read replica jika db.replica_urls di-set
+DBSession = scoped_session(sessionmaker(class_=RoutingSession))
+register(DBSession, transaction_manager=_CurrentTransactionManager())
 
 Base = declarative_base()
 
@@ -34,6 +58,7 @@ class User(Base):
     password = Column(Text, nullable=False)
     role = Column(String(20), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     # Relasi
     doctor = relationship("Doctor", back_populates="user", uselist=False)
@@ -45,7 +70,7 @@ class User(Base):
             "name": self.name,
             "email": self.email,
             "role": self.role,
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "created_at": self.created_at
         }
 
 
@@ -57,10 +82,16 @@ class Doctor(Base):
     specialization = Column(String(100), nullable=False)
     schedule = Column(Text)
     created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     # Relasi
     user = relationship("User", back_populates="doctor")
     appointments = relationship("Appointment", back_populates="doctor")
+    availability = relationship(
+        "DoctorAvailability", back_populates="doctor",
+        order_by="(DoctorAvailability.weekday, DoctorAvailability.start_time)",
+        cascade="all, delete-orphan"
+    )
 
     def to_json(self):
         return {
@@ -68,7 +99,7 @@ class Doctor(Base):
             "user_id": self.user_id,
             "specialization": self.specialization,
             "schedule": self.schedule,
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "created_at": self.created_at
         }
 
 
@@ -82,14 +113,36 @@ class Appointment(Base):
     appointment_time = Column(Time, nullable=False)
     status = Column(String(20), nullable=False)
     created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     __table_args__ = (
         CheckConstraint(
             "status IN ('pending', 'confirmed', 'completed', 'cancelled')",
             name="appointment_status_check"
         ),
+        # Index komposit sesuai pola akses di queries.appointment_list_query
+        # (dibuat lewat migration alembic 0001_appointment_indexes)
+        Index("ix_appointments_doctor_date_time", "doctor_id", "appointment_date", "appointment_time"),
+        Index("ix_appointments_patient_status_date", "patient_id", "status", "appointment_date"),
+        Index("ix_appointments_created_at_id", "created_at", "id"),
+        # Satu slot dokter hanya boleh dipakai satu appointment aktif
+        # (migration 0004_unique_active_slot)
+        Index(
+            "uq_appointments_doctor_slot", "doctor_id", "appointment_date", "appointment_time",
+            unique=True,
+            postgresql_where=text("status <> 'cancelled'"),
+            sqlite_where=text("status <> 'cancelled'")
+        ),
+        # Target foreign key komposit rekam medis. Di PostgreSQL tabel ini
+        # dipartisi per bulan (migration 0007, partitions.py) dengan primary
+        # key (id, appointment_date) yang mengambil peran constraint ini
+        UniqueConstraint("id", "appointment_date", name="uq_appointments_id_date"),
     )
 
+    # Identitas ORM = primary key tabel partisi: UPDATE dari ORM menyertakan
+    # appointment_date lama di WHERE, jadi hanya satu partisi yang disentuh
+    __mapper_args__ = {"primary_key": [id, appointment_date]}
+
     # Relasi
     patient = relationship("User", back_populates="my_appointments")
     doctor = relationship("Doctor", back_populates="appointments")
@@ -100,10 +153,10 @@ class Appointment(Base):
             "id": self.id,
             "patient_id": self.patient_id,
             "doctor_id": self.doctor_id,
-            "appointment_date": str(self.appointment_date), # Pakai str() lebih aman untuk Date object
-            "appointment_time": str(self.appointment_time), # Pakai str() lebih aman untuk Time object
+            "appointment_date": self.appointment_date, # date/time diserialisasi oleh renderer JSON
+            "appointment_time": self.appointment_time,
             "status": self.status,
-            "created_at": self.created_at.isoformat() if self.created_at else None
+            "created_at": self.created_at
         }
 
 
@@ -111,10 +164,22 @@ class MedicalRecord(Base):
     __tablename__ = "medical_records"
 
     id = Column(Integer, primary_key=True)
-    appointment_id = Column(Integer, ForeignKey("appointments.id"), unique=True, nullable=False)
+    appointment_id = Column(Integer, unique=True, nullable=False)
+    # Salinan tanggal appointment: bagian dari foreign key ke tabel partisi
+    appointment_date = Column(Date, nullable=False)
     diagnosis = Column(Text, nullable=False)
     notes = Column(Text)
     created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # Reschedule ikut memperbarui appointment_date di sini (ON UPDATE CASCADE)
+        ForeignKeyConstraint(
+            ["appointment_id", "appointment_date"], ["appointments.id", "appointments.appointment_date"],
+            name="medical_records_appointment_fkey", onupdate="CASCADE",
+            deferrable=True, initially="IMMEDIATE"
+        ),
+    )
 
     # Relasi
     appointment = relationship("Appointment", back_populates="medical_record")
@@ -125,5 +190,113 @@ class MedicalRecord(Base):
             "appointment_id": self.appointment_id,
             "diagnosis": self.diagnosis,
             "notes": self.notes,
-            "created_at": self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+            "created_at": self.created_at
+        }
+
+
+class AppointmentCounter(Base):
+    """Jumlah appointment per status untuk satu dokter / pasien.
+
+    Diperbarui di transaksi yang sama dengan perubahan status (counters.py),
+    dibaca dashboard dengan satu lookup primary key.
+    """
+    __tablename__ = "appointment_counters"
+
+    owner_type = Column(String(10), primary_key=True)  # 'doctor' / 'patient'
+    owner_id = Column(Integer, primary_key=True)       # doctors.id / users.id
+    pending = Column(Integer, nullable=False, server_default="0")
+    confirmed = Column(Integer, nullable=False, server_default="0")
+    completed = Column(Integer, nullable=False, server_default="0")
+    cancelled = Column(Integer, nullable=False, server_default="0")
+
+    __table_args__ = (
+        CheckConstraint("owner_type IN ('doctor', 'patient')", name="appointment_counter_owner_check"),
+    )
+
+    def to_json(self):
+        return {
+            "pending": self.pending,
+            "confirmed": self.confirmed,
+            "completed": self.completed,
+            "cancelled": self.cancelled
+        }
+
+
+# Kolom full-text search rekam medis (khusus PostgreSQL, migration
+# 0005_medical_record_search). Sengaja tidak di-map ke ORM agar model tetap
+# bisa dipakai di SQLite; query-nya ada di search.py.
+MEDICAL_RECORD_SEARCH_DDL = [
+    """
+    ALTER TABLE medical_records ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('indonesian', coalesce(diagnosis, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(diagnosis, '')), 'A') ||
+        setweight(to_tsvector('indonesian', coalesce(notes, '')), 'B') ||
+        setweight(to_tsvector('simple', coalesce(notes, '')), 'B')
+    ) STORED
+    """,
+    "CREATE INDEX ix_medical_records_search ON medical_records USING gin (search_vector)",
+]
+
+for _sql in MEDICAL_RECORD_SEARCH_DDL:
+    event.listen(MedicalRecord.__table__, 'after_create', DDL(_sql).execute_if(dialect='postgresql'))
+
+
+class DoctorAvailability(Base):
+    """Jam praktik mingguan terstruktur (weekday 0 = Senin ... 6 = Minggu)."""
+    __tablename__ = "doctor_availability"
+
+    id = Column(Integer, primary_key=True)
+    doctor_id = Column(Integer, ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False, index=True)
+    weekday = Column(Integer, nullable=False)
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    slot_minutes = Column(Integer, nullable=False, server_default="30")
+
+    __table_args__ = (
+        CheckConstraint("weekday BETWEEN 0 AND 6", name="availability_weekday_check"),
+        CheckConstraint("end_time > start_time", name="availability_range_check"),
+        CheckConstraint("slot_minutes > 0", name="availability_slot_check"),
+    )
+
+    # Relasi
+    doctor = relationship("Doctor", back_populates="availability")
+
+    def to_json(self):
+        return {
+            "weekday": self.weekday,
+            "start": self.start_time.strftime('%H:%M'),
+            "end": self.end_time.strftime('%H:%M'),
+            "slot_minutes": self.slot_minutes
+        }
+
+
+class DoctorAvailabilityException(Base):
+    """Pengecualian jadwal pada tanggal tertentu.
+
+    is_available = False -> libur (seluruh hari jika jam kosong, atau jam tsb saja)
+    is_available = True  -> jam praktik tambahan di tanggal tsb
+    """
+    __tablename__ = "doctor_availability_exceptions"
+
+    id = Column(Integer, primary_key=True)
+    doctor_id = Column(Integer, ForeignKey("doctors.id", ondelete="CASCADE"), nullable=False)
+    exception_date = Column(Date, nullable=False)
+    start_time = Column(Time)
+    end_time = Column(Time)
+    is_available = Column(Boolean, nullable=False, server_default="false")
+    slot_minutes = Column(Integer, nullable=False, server_default="30")
+    note = Column(Text)
+
+    __table_args__ = (
+        Index("ix_availability_exceptions_doctor_date", "doctor_id", "exception_date"),
+    )
+
+    def to_json(self):
+        return {
+            "date": self.exception_date,
+            "start": self.start_time.strftime('%H:%M') if self.start_time else None,
+            "end": self.end_time.strftime('%H:%M') if self.end_time else None,
+            "is_available": self.is_available,
+            "slot_minutes": self.slot_minutes,
+            "note": self.note
+        }
@@ -0,0 +1,122 @@
+import base64
+import json
+from datetime import date, time, datetime
+
+from sqlalchemy import DateTime, literal, tuple_
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.functions import FunctionElement
+
+# =======================================================
+# KEYSET (CURSOR) PAGINATION
+# =======================================================
+# Cursor berisi nilai kolom urutan dari baris terakhir halaman sebelumnya,
+# sehingga halaman berikutnya cukup "WHERE (kolom...) > (nilai...)"
+# tanpa OFFSET yang makin lambat di halaman belakang.
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+_PARSERS = {
+    'date': date.fromisoformat,
+    'time': time.fromisoformat,
+    'datetime': datetime.fromisoformat,
+    'int': int,
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+class sortable_datetime(FunctionElement):
+    """Kolom / nilai datetime dalam bentuk yang bisa diurutkan & dibandingkan.
+
+    SQLite menyimpan DateTime sebagai teks: CURRENT_TIMESTAMP (server default)
+    tanpa mikrodetik, nilai dari Python / cursor dengan '.ffffff'. Sebagai
+    teks '10:00:00' < '10:00:00.000000', jadi cursor tidak pernah maju;
+    julianday() membandingkan keduanya sebagai waktu. Dialect lain: kolom apa
+    adanya (index tetap dipakai).
+    """
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(sortable_datetime)
+def _compile_sortable(element, compiler, **kw):
+    return compiler.process(element.clauses, **kw)
+
+
+@compiles(sortable_datetime, 'sqlite')
+def _compile_sortable_sqlite(element, compiler, **kw):
+    return f'julianday({compiler.process(element.clauses, **kw)})'
+
+
+class KeysetSort:
+    """Definisi urutan keyset: daftar (kolom, tipe) dan arah urutan."""
+
+    def __init__(self, name, columns, descending=False):
+        self.name = name
+        self.columns = columns  # list of (Column, tipe)
+        self.descending = descending
+
+    def _sql(self, col, kind):
+        return sortable_datetime(col) if kind == 'datetime' else col
+
+    def order_by(self):
+        if self.descending:
+            return [self._sql(col, kind).desc() for col, kind in self.columns]
+        return [self._sql(col, kind).asc() for col, kind in self.columns]
+
+    def apply_after(self, query, values):
+        cols = tuple_(*[self._sql(col, kind) for col, kind in self.columns])
+        vals = tuple_(*[self._sql(literal(value, col.type), kind)
+                        for (col, kind), value in zip(self.columns, values)])
+        if self.descending:
+            return query.filter(cols < vals)
+        return query.filter(cols > vals)
+
+    def values_of(self, obj):
+        return [getattr(obj, col.key) for col, _ in self.columns]
+
+    def encode(self, obj):
+        raw = [v.isoformat() if hasattr(v, 'isoformat') else v for v in self.values_of(obj)]
+        payload = json.dumps({'s': self.name, 'v': raw}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode(self, token):
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if payload.get('s') != self.name or len(payload['v']) != len(self.columns):
+                raise InvalidCursor(token)
+            return [_PARSERS[kind](raw) for (_, kind), raw in zip(self.columns, payload['v'])]
+        except (KeyError, TypeError, ValueError) as e:
+            raise InvalidCursor(token) from e
+
+
+def parse_limit(params, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """Ambil ?limit= dari query string, dibatasi maksimal `maximum` (None = tanpa batas)."""
+    raw = params.get('limit')
+    if raw is None or raw == '':
+        return default
+    limit = int(raw)
+    if limit < 1:
+        raise ValueError('limit harus >= 1')
+    if maximum is not None:
+        limit = min(limit, maximum)
+    return limit
+
+
+def paginate(query, sort, after=None, limit=DEFAULT_LIMIT):
+    """Jalankan satu halaman query.
+
+    Mengembalikan (items, next_cursor). next_cursor None jika sudah halaman terakhir.
+    """
+    if after:
+        query = sort.apply_after(query, sort.decode(after))
+    # Ambil 1 baris ekstra untuk tahu apakah masih ada halaman berikutnya
+    rows = query.order_by(*sort.order_by()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = sort.encode(rows[-1]) if has_more and rows else None
+    return rows, next_cursor
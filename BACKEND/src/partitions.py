@@ -0,0 +1,353 @@
+import re
+import time
+from datetime import date
+
+from sqlalchemy import bindparam, text
+
+# =======================================================
+# PARTISI BULANAN TABEL APPOINTMENTS (POSTGRESQL)
+# =======================================================
+# Sejak migration 0007 tabel appointments di PostgreSQL dipartisi RANGE
+# (appointment_date) per bulan:
+#   appointments_pYYYY_MM   [tanggal 1 bulan itu, tanggal 1 bulan berikutnya)
+#   appointments_default    tanggal yang partisinya belum dibuat (booking jauh
+#                           ke depan); dipindah saat partisinya dibuat
+# Primary key menjadi (id, appointment_date); rekam medis mereferensikan
+# pasangan kolom yang sama (medical_records.appointment_date).
+#
+# Query dengan filter appointment_date (upcoming, slot, antrian, riwayat
+# dengan rentang tanggal) hanya menyentuh partisi bulan terkait.
+#
+# Partisi ke depan dibuat otomatis saat aplikasi start
+# (db.partition_months_ahead) dan oleh command harian:
+#   partition_appointments                          # buat partisi 12 bulan ke depan
+#   partition_appointments --archive-before 2024-01 # arsipkan bulan yang sudah tutup
+#
+# Arsip: partisi yang SEMUA appointment-nya sudah completed/cancelled dilepas
+# (DETACH) dari appointments dan dipasang ke archive.appointments; rekam
+# medisnya ikut dipindah ke archive.medical_records. Foreign key di kedua
+# schema tetap berlaku, counter dashboard tetap menghitungnya (counters.py),
+# dan riwayat, detail, pencarian serta export rekam medis membaca UNION ALL
+# tabel utama + arsip (queries.record_sources).
+
+PARENT = 'appointments'
+DEFAULT_PARTITION = 'appointments_default'
+ARCHIVE_SCHEMA = 'archive'
+DEFAULT_MONTHS_AHEAD = 12
+OPEN_STATUSES = ('pending', 'confirmed')
+
+# Foreign key rekam medis -> appointments (DEFERRABLE supaya baris bisa
+# dipindah antar partisi di dalam satu transaksi)
+RECORD_FK = 'medical_records_appointment_fkey'
+
+# Reschedule ke bulan lain = UPDATE yang memindah baris antar partisi.
+# Sebelum PostgreSQL 15 itu dijalankan sebagai DELETE + INSERT, ON UPDATE
+# CASCADE RECORD_FK tidak berlaku dan rekam medisnya melanggar foreign key:
+# PostgreSQL 15 adalah versi minimum untuk memindah appointment yang sudah
+# punya rekam medis ke bulan lain (dalam bulan yang sama semua versi aman).
+RECORD_MOVE_ERROR = ('Appointment yang sudah punya rekam medis tidak bisa dipindah ke bulan lain '
+                     '(butuh PostgreSQL 15). Pilih tanggal di bulan yang sama.')
+
+# Kolom rekam medis yang disalin ke arsip (search_vector = kolom generated)
+RECORD_COLUMNS = 'id, appointment_id, appointment_date, diagnosis, notes, created_at, updated_at'
+
+# Satu proses saja yang membuat / melepas partisi pada satu waktu
+_LOCK_KEY = 7_240_001
+
+_NAME_RE = re.compile(r'^appointments_p(\d{4})_(\d{2})$')
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{PARENT}_p{month.year:04d}_{month.month:02d}'
+
+
+def is_partitioned(connection):
+    """True jika appointments di database ini sudah tabel partisi."""
+    if connection.dialect.name != 'postgresql':
+        return False
+    kind = connection.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {'name': PARENT}
+    ).scalar()
+    return kind == 'p'
+
+
+def monthly_partitions(connection, parent=PARENT):
+    """{bulan (date tanggal 1): nama tabel} partisi bulanan milik parent."""
+    rows = connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:parent)"
+    ), {'parent': parent})
+    partitions = {}
+    for (name,) in rows:
+        match = _NAME_RE.match(name)
+        if match:
+            partitions[date(int(match.group(1)), int(match.group(2)), 1)] = name
+    return partitions
+
+
+def is_record_fk_violation(error):
+    """True jika IntegrityError berasal dari RECORD_FK (bukan bentrok slot)."""
+    orig = getattr(error, 'orig', None)
+    constraint = getattr(getattr(orig, 'diag', None), 'constraint_name', None)
+    return getattr(orig, 'pgcode', None) == '23503' and constraint == RECORD_FK
+
+
+def lock_maintenance(connection, lock_timeout=5):
+    connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': _LOCK_KEY})
+    # DDL partisi butuh lock singkat di tabel induk; jangan antri lama di
+    # belakang query panjang (dan membuat request lain ikut menunggu)
+    connection.execute(text(f"SET LOCAL lock_timeout = '{int(lock_timeout)}s'"))
+
+
+# -------------------------------------------------------
+# KONVERSI TABEL BIASA -> TABEL PARTISI
+# -------------------------------------------------------
+# Dipakai migration 0007 dan schema sementara check_query_plans.
+PARTITIONED_TABLE_SQL = f"""
+    CREATE TABLE {PARENT} (
+        id integer NOT NULL DEFAULT nextval('{{sequence}}'::regclass),
+        patient_id integer NOT NULL REFERENCES users (id),
+        doctor_id integer NOT NULL REFERENCES doctors (id),
+        appointment_date date NOT NULL,
+        appointment_time time without time zone NOT NULL,
+        status varchar(20) NOT NULL,
+        created_at timestamp without time zone DEFAULT now(),
+        updated_at timestamp without time zone DEFAULT now(),
+        CONSTRAINT appointments_pkey PRIMARY KEY (id, appointment_date),
+        CONSTRAINT appointment_status_check
+            CHECK (status IN ('pending', 'confirmed', 'completed', 'cancelled'))
+    ) PARTITION BY RANGE (appointment_date)
+"""
+
+# Index di tabel induk otomatis dibuat di setiap partisi (sama dengan models.Appointment)
+PARTITIONED_INDEXES = [
+    f"CREATE INDEX ix_appointments_doctor_date_time ON {PARENT} (doctor_id, appointment_date, appointment_time)",
+    f"CREATE INDEX ix_appointments_patient_status_date ON {PARENT} (patient_id, status, appointment_date)",
+    f"CREATE INDEX ix_appointments_created_at_id ON {PARENT} (created_at, id)",
+    f"CREATE UNIQUE INDEX uq_appointments_doctor_slot ON {PARENT} "
+    f"(doctor_id, appointment_date, appointment_time) WHERE status <> 'cancelled'",
+]
+
+APPOINTMENT_COLUMNS = ('id, patient_id, doctor_id, appointment_date, appointment_time, '
+                       'status, created_at, updated_at')
+
+RECORD_FK_SQL = f"""
+    ALTER TABLE medical_records ADD CONSTRAINT {RECORD_FK}
+        FOREIGN KEY (appointment_id, appointment_date) REFERENCES {PARENT} (id, appointment_date)
+        ON UPDATE CASCADE DEFERRABLE INITIALLY IMMEDIATE
+"""
+
+
+def convert_to_partitioned(connection, months_ahead=DEFAULT_MONTHS_AHEAD, today=None):
+    """Ubah appointments (tabel biasa) menjadi tabel partisi bulanan, data ikut.
+
+    medical_records.appointment_date harus sudah terisi. Tabel dikunci
+    ACCESS EXCLUSIVE selama penyalinan: jalankan di jendela maintenance.
+    """
+    connection.execute(text(f'LOCK TABLE {PARENT}, medical_records IN ACCESS EXCLUSIVE MODE'))
+
+    # Foreign key lama rekam medis (appointment_id saja / komposit) dilepas dulu
+    old_fks = connection.execute(text(
+        "SELECT conname FROM pg_constraint WHERE contype = 'f' "
+        "AND conrelid = to_regclass('medical_records') AND confrelid = to_regclass(:parent)"
+    ), {'parent': PARENT}).scalars().all()
+    for name in old_fks:
+        connection.execute(text(f'ALTER TABLE medical_records DROP CONSTRAINT {name}'))
+
+    # Tabel lama (beserta nama index-nya) disingkirkan; sequence id dipakai ulang
+    sequence = connection.execute(
+        text("SELECT pg_get_serial_sequence(:parent, 'id')"), {'parent': PARENT}).scalar()
+    connection.execute(text(f'ALTER TABLE {PARENT} RENAME TO {PARENT}_old'))
+    for name in connection.execute(text(
+        "SELECT indexrelid::regclass::text FROM pg_index WHERE indrelid = to_regclass(:old)"
+    ), {'old': f'{PARENT}_old'}).scalars().all():
+        connection.execute(text(f'ALTER INDEX {name} RENAME TO {name.split(".")[-1]}_old'))
+    connection.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY NONE'))
+
+    connection.execute(text(PARTITIONED_TABLE_SQL.format(sequence=sequence)))
+    first = connection.execute(text(f'SELECT min(appointment_date) FROM {PARENT}_old')).scalar()
+    this_month = month_start(today or date.today())
+    month = month_start(first) if first is not None and first < this_month else this_month
+    last = add_months(this_month, months_ahead)
+    while month <= last:
+        connection.execute(text(
+            f"CREATE TABLE {partition_name(month)} PARTITION OF {PARENT} "
+            f"FOR VALUES FROM ('{month}') TO ('{add_months(month, 1)}')"))
+        month = add_months(month, 1)
+    connection.execute(text(f'CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {PARENT} DEFAULT'))
+
+    connection.execute(text(
+        f'INSERT INTO {PARENT} ({APPOINTMENT_COLUMNS}) SELECT {APPOINTMENT_COLUMNS} FROM {PARENT}_old'))
+    connection.execute(text(f'ALTER SEQUENCE {sequence} OWNED BY {PARENT}.id'))
+    connection.execute(text(f'DROP TABLE {PARENT}_old'))
+    # Index dibangun setelah data masuk (lebih cepat daripada per baris)
+    for ddl in PARTITIONED_INDEXES:
+        connection.execute(text(ddl))
+    connection.execute(text(RECORD_FK_SQL))
+    connection.execute(text(f'ANALYZE {PARENT}'))
+
+
+# -------------------------------------------------------
+# PARTISI BARU
+# -------------------------------------------------------
+def create_partition(connection, month):
+    """Buat partisi satu bulan; baris bulan itu di partisi default ikut dipindah.
+
+    CREATE TABLE + ATTACH (bukan CREATE TABLE ... PARTITION OF) supaya tabel
+    induk hanya dikunci SHARE UPDATE EXCLUSIVE: baca & tulis tetap jalan.
+    """
+    name, lower, upper = partition_name(month), month, add_months(month, 1)
+    connection.execute(text(
+        f'CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'))
+    connection.execute(text(f'SET CONSTRAINTS {RECORD_FK} DEFERRED'))
+    connection.execute(text(
+        f'WITH moved AS (DELETE FROM {DEFAULT_PARTITION} '
+        f'WHERE appointment_date >= :lower AND appointment_date < :upper RETURNING *) '
+        f'INSERT INTO {name} SELECT * FROM moved'
+    ), {'lower': lower, 'upper': upper})
+    connection.execute(text(
+        f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')"))
+    return name
+
+
+def missing_partitions(connection, months_ahead=DEFAULT_MONTHS_AHEAD, today=None):
+    """Bulan (tanggal 1) dari bulan ini s/d months_ahead ke depan yang belum punya partisi."""
+    existing = monthly_partitions(connection)
+    first = month_start(today or date.today())
+    months = [add_months(first, offset) for offset in range(months_ahead + 1)]
+    return [month for month in months if month not in existing]
+
+
+def ensure_partitions(connection, months_ahead=DEFAULT_MONTHS_AHEAD, today=None, lock_timeout=5):
+    """Buat partisi yang belum ada dari bulan ini s/d months_ahead bulan ke depan.
+
+    Dijalankan di dalam transaksi pemanggil. Mengembalikan list nama
+    partisi yang dibuat (kosong jika tabel belum dipartisi).
+    """
+    if not is_partitioned(connection):
+        return []
+    lock_maintenance(connection, lock_timeout)
+    return [create_partition(connection, month)
+            for month in missing_partitions(connection, months_ahead, today)]
+
+
+def ensure_partitions_on_startup(engine, settings):
+    """Dipanggil src.main / lifespan ASGI; error dilempar ke pemanggil (warning).
+
+    db.partition_months_ahead = 0 mematikannya (hanya lewat command harian).
+    """
+    months_ahead = int(settings.get('db.partition_months_ahead', DEFAULT_MONTHS_AHEAD))
+    if engine.dialect.name != 'postgresql' or months_ahead <= 0:
+        return []
+    with engine.begin() as connection:
+        return ensure_partitions(connection, months_ahead, lock_timeout=2)
+
+
+# -------------------------------------------------------
+# ARSIP
+# -------------------------------------------------------
+ARCHIVE_DDL = [
+    f'CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}',
+    f"""
+    CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.appointments
+        (LIKE appointments INCLUDING DEFAULTS INCLUDING CONSTRAINTS,
+         PRIMARY KEY (id, appointment_date))
+        PARTITION BY RANGE (appointment_date)
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS {ARCHIVE_SCHEMA}.medical_records
+        (LIKE medical_records INCLUDING DEFAULTS INCLUDING GENERATED,
+         PRIMARY KEY (id),
+         FOREIGN KEY (appointment_id, appointment_date)
+             REFERENCES {ARCHIVE_SCHEMA}.appointments (id, appointment_date)
+             DEFERRABLE INITIALLY DEFERRED)
+    """,
+]
+
+
+def archive_candidates(connection, before):
+    """[(bulan, nama, jumlah appointment masih aktif)] partisi sebelum bulan `before`."""
+    candidates = []
+    for month, name in sorted(monthly_partitions(connection).items()):
+        if add_months(month, 1) > month_start(before):
+            continue
+        candidates.append((month, name, count_open(connection, name)))
+    return candidates
+
+
+def count_open(connection, name):
+    """Jumlah appointment pending/confirmed di satu partisi."""
+    return connection.execute(
+        text(f'SELECT count(*) FROM {name} WHERE status IN :statuses')
+        .bindparams(bindparam('statuses', expanding=True)),
+        {'statuses': list(OPEN_STATUSES)}
+    ).scalar()
+
+
+def archive_partition(connection, month):
+    """Pindahkan satu partisi bulanan (dan rekam medisnya) ke schema arsip.
+
+    Dijalankan di dalam transaksi pemanggil; mengembalikan jumlah rekam medis
+    yang ikut dipindah, atau None jika partisi ternyata masih punya
+    appointment pending/confirmed (tidak ada yang diubah).
+    """
+    name, lower, upper = partition_name(month), month, add_months(month, 1)
+    # Hitungan archive_candidates bisa sudah basi (booking / reschedule masuk
+    # sesudahnya): kunci partisi dari penulisan (baca tetap jalan) lalu hitung
+    # ulang di transaksi ini, sebelum ada yang dipindah
+    connection.execute(text(f'LOCK TABLE {name} IN SHARE ROW EXCLUSIVE MODE'))
+    if count_open(connection, name):
+        return None
+    for ddl in ARCHIVE_DDL:
+        connection.execute(text(ddl))
+    params = {'lower': lower, 'upper': upper}
+    # Rekam medis dulu: DETACH ditolak selama masih ada baris yang mereferensikan
+    moved = connection.execute(text(
+        f'WITH moved AS (DELETE FROM medical_records '
+        f'WHERE appointment_date >= :lower AND appointment_date < :upper '
+        f'RETURNING {RECORD_COLUMNS}) '
+        f'INSERT INTO {ARCHIVE_SCHEMA}.medical_records ({RECORD_COLUMNS}) SELECT {RECORD_COLUMNS} FROM moved'
+    ), params).rowcount
+    connection.execute(text(f'ALTER TABLE {PARENT} DETACH PARTITION {name}'))
+    connection.execute(text(f'ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}'))
+    connection.execute(text(
+        f"ALTER TABLE {ARCHIVE_SCHEMA}.appointments ATTACH PARTITION {ARCHIVE_SCHEMA}.{name} "
+        f"FOR VALUES FROM ('{lower}') TO ('{upper}')"))
+    return moved
+
+
+def has_archive(connection):
+    if connection.dialect.name != 'postgresql':
+        return False
+    return connection.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"), {'name': f'{ARCHIVE_SCHEMA}.appointments'}
+    ).scalar()
+
+
+# has_archive() untuk query per request (riwayat, search, export), dicache per
+# database supaya tidak menambah satu query di setiap request. Schema arsip
+# tidak pernah dihapus: "ada" disimpan seterusnya, "belum ada" dicek ulang
+# paling cepat tiap ARCHIVE_RECHECK detik (setelah command arsip dijalankan)
+ARCHIVE_RECHECK = 60
+_archive_checked = {}  # url engine -> (ada, waktu cek)
+
+
+def archive_available(connection):
+    if connection.dialect.name != 'postgresql':
+        return False
+    url = connection.engine.url
+    exists, checked_at = _archive_checked.get(url, (False, None))
+    if exists or (checked_at is not None and time.monotonic() - checked_at < ARCHIVE_RECHECK):
+        return exists
+    exists = bool(has_archive(connection))
+    _archive_checked[url] = (exists, time.monotonic())
+    return exists
@@ -0,0 +1,193 @@
+import configparser
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# =======================================================
+# CONNECTION POOL DATABASE
+# =======================================================
+# Ukuran pool mengikuti jumlah thread Waitress ([server:main] threads):
+# satu request memegang paling banyak satu koneksi, jadi
+#   pool_size    = threads
+#   max_overflow = threads // 2 (minimal 2) untuk koneksi di luar thread
+#                  request (streaming, refresh index, script)
+# Semua bisa ditimpa lewat setting sqlalchemy.* di .ini.
+#
+# Pool mencatat waktu tunggu checkout dan tingkat keterisian, tersedia di
+# /api/_pool/stats untuk menentukan ukuran pool dari data.
+
+WAITRESS_DEFAULT_THREADS = 4
+
+# Batas histogram waktu tunggu checkout (detik)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+
+def server_threads(global_config):
+    """Jumlah thread Waitress dari [server:main] di file .ini yang sedang dipakai."""
+    path = (global_config or {}).get('__file__')
+    if path:
+        parser = configparser.ConfigParser(interpolation=None)
+        parser.read(path)
+        if parser.has_option('server:main', 'threads'):
+            return int(parser.get('server:main', 'threads'))
+    return WAITRESS_DEFAULT_THREADS
+
+
+def apply_pool_defaults(settings, threads):
+    """Isi default sqlalchemy.pool_* yang belum di-set di .ini (dimodifikasi in-place)."""
+    settings.setdefault('sqlalchemy.pool_size', str(threads))
+    settings.setdefault('sqlalchemy.max_overflow', str(max(2, threads // 2)))
+    # Gagal cepat saat pool penuh (-> 503) daripada menahan thread 30 detik
+    settings.setdefault('sqlalchemy.pool_timeout', '10')
+    # Koneksi dibuang setelah 30 menit, sebelum dipotong firewall / failover
+    settings.setdefault('sqlalchemy.pool_recycle', '1800')
+    # SELECT 1 ringan saat checkout: koneksi basi diganti, bukan jadi 500
+    settings.setdefault('sqlalchemy.pool_pre_ping', 'true')
+    return settings
+
+
+def set_statement_timeout(engine, timeout_ms):
+    """SET statement_timeout untuk setiap koneksi baru (PostgreSQL saja, 0 = mati)."""
+    if not timeout_ms or engine.dialect.name != 'postgresql':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('SET statement_timeout = %d' % int(timeout_ms))
+        cursor.close()
+        # SET di atas membuka transaksi implisit di psycopg2
+        dbapi_connection.commit()
+
+
+def enable_sqlite_foreign_keys(engine):
+    """PRAGMA foreign_keys = ON untuk setiap koneksi SQLite baru.
+
+    SQLite tidak menjalankan foreign key tanpa pragma ini, termasuk ON UPDATE
+    CASCADE yang membawa appointment_date baru ke medical_records saat
+    appointment di-reschedule (lihat models.MedicalRecord).
+    """
+    if engine.dialect.name != 'sqlite':
+        return
+
+    @event.listens_for(engine, 'connect')
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys = ON')
+        cursor.close()
+
+
+class PoolMetrics:
+    """Statistik checkout pool. Counter dilindungi lock kecil (jarang bentrok:
+    satu update per checkout)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.waited = 0          # checkout yang harus menunggu > bucket pertama
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.wait_buckets = [0] * len(WAIT_BUCKETS)
+        self.peak_checked_out = 0
+        self.connects = 0
+        self.invalidations = 0
+
+    def record_checkout(self, wait, checked_out):
+        with self._lock:
+            self.checkouts += 1
+            self.wait_total += wait
+            if wait > self.wait_max:
+                self.wait_max = wait
+            if wait > WAIT_BUCKETS[0]:
+                self.waited += 1
+            for i, bound in enumerate(WAIT_BUCKETS):
+                if wait <= bound:
+                    self.wait_buckets[i] += 1
+                    break
+            if checked_out > self.peak_checked_out:
+                self.peak_checked_out = checked_out
+
+    def record_event(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def record_timeout(self, wait):
+        with self._lock:
+            self.timeouts += 1
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self, pool):
+        with self._lock:
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            checked_out = pool.checkedout()
+            return {
+                'pool_size': pool.size(),
+                'max_overflow': pool._max_overflow,
+                'timeout': pool._timeout,
+                'checked_out': checked_out,
+                'overflow': max(pool.overflow(), 0),
+                'idle': pool.checkedin(),
+                'saturation': round(checked_out / capacity, 4) if capacity else None,
+                'peak_checked_out': self.peak_checked_out,
+                'checkouts': self.checkouts,
+                'waited': self.waited,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else None,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+                # Kumulatif: jumlah checkout dengan waktu tunggu <= batas (ms)
+                'wait_histogram_ms': self.histogram(),
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+            }
+
+    def histogram(self):
+        result, running = {}, 0
+        for bound, count in zip(WAIT_BUCKETS, self.wait_buckets):
+            running += count
+            result[str(bound * 1000)] = running
+        return result
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool yang mengukur lama checkout koneksi (antri + connect + pre-ping)."""
+
+    def __init__(self, *args, **kwargs):
+        recreated = '_dispatch' in kwargs
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+        if not recreated:
+            # Pool hasil recreate() mewarisi listener dari pool lama
+            metrics = self.metrics
+            event.listen(self, 'connect', lambda *a: metrics.record_event('connects'))
+            event.listen(self, 'invalidate', lambda *a: metrics.record_event('invalidations'))
+            event.listen(self, 'soft_invalidate', lambda *a: metrics.record_event('invalidations'))
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            conn = super().connect()
+        except PoolTimeout:
+            self.metrics.record_timeout(time.perf_counter() - start)
+            raise
+        self.metrics.record_checkout(time.perf_counter() - start, self.checkedout())
+        return conn
+
+
+class InstrumentedAsyncQueuePool(InstrumentedQueuePool, AsyncAdaptedQueuePool):
+    """Versi asyncio (mode ASGI): antrian checkout ditunggu tanpa memblokir loop."""
+
+
+def pool_stats(engine):
+    """Statistik pool engine, None jika pool-nya bukan InstrumentedQueuePool."""
+    metrics = getattr(engine.pool, 'metrics', None)
+    return metrics.snapshot(engine.pool) if metrics is not None else None
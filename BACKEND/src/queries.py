@@ -0,0 +1,304 @@
+from sqlalchemy import (Date, Integer, MetaData, String, Time, column, literal_column, select, text,
+                        union_all, update, values)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import aliased
+
+from .models import Appointment, Doctor, MedicalRecord, User
+from .pagination import KeysetSort
+from .partitions import ARCHIVE_SCHEMA, archive_available
+
+# =======================================================
+# QUERY LAYER APPOINTMENT
+# =======================================================
+# Semua query list appointment dibangun di sini supaya bentuk WHERE/ORDER BY
+# selalu cocok dengan index komposit di models.Appointment:
+#   ix_appointments_doctor_date_time     (doctor_id, appointment_date, appointment_time)
+#   ix_appointments_patient_status_date  (patient_id, status, appointment_date)
+#   ix_appointments_created_at_id        (created_at, id)
+#   uq_appointments_doctor_slot          (doctor_id, appointment_date, appointment_time)
+#                                        WHERE status <> 'cancelled'
+# Jika menambah filter/urutan baru, tambahkan juga ke HOT_QUERIES di
+# scripts/check_query_plans.py agar rencana query-nya ikut dicek.
+
+# Urutan keyset: id selalu jadi kolom terakhir sebagai tie-breaker
+SORT_BY_CREATED = KeysetSort('created', [
+    (Appointment.created_at, 'datetime'),
+    (Appointment.id, 'int'),
+], descending=True)
+
+SORT_BY_SCHEDULE = KeysetSort('schedule', [
+    (Appointment.appointment_date, 'date'),
+    (Appointment.appointment_time, 'time'),
+    (Appointment.id, 'int'),
+])
+
+
+def appointment_list_query(session, doctor_id=None, patient_id=None, status=None, upcoming_from=None):
+    """Query list appointment beserta urutan keyset yang sesuai.
+
+    upcoming_from: tanggal (date) minimal; jika diisi hasil diurutkan
+    berdasarkan jadwal terdekat, jika tidak berdasarkan created_at terbaru.
+    Mengembalikan (query, sort) -- query belum diberi ORDER BY.
+    """
+    query = session.query(Appointment)
+
+    if doctor_id is not None:
+        query = query.filter(Appointment.doctor_id == doctor_id)
+    if patient_id is not None:
+        query = query.filter(Appointment.patient_id == patient_id)
+    if status:
+        query = query.filter(Appointment.status == status)
+
+    if upcoming_from is not None:
+        query = query.filter(Appointment.appointment_date >= upcoming_from)
+        return query, SORT_BY_SCHEDULE
+
+    return query, SORT_BY_CREATED
+
+
+def next_appointment_query(session, today, doctor_id=None, patient_id=None):
+    """Appointment aktif (pending/confirmed) terdekat mulai `today`.
+
+    Cocok dengan ix_appointments_doctor_date_time (dokter) dan
+    ix_appointments_patient_status_date (pasien); pemanggil cukup .first().
+    """
+    query = session.query(Appointment).filter(
+        Appointment.status.in_(('pending', 'confirmed')),
+        Appointment.appointment_date >= today
+    )
+    if doctor_id is not None:
+        query = query.filter(Appointment.doctor_id == doctor_id)
+    if patient_id is not None:
+        query = query.filter(Appointment.patient_id == patient_id)
+    return query.order_by(*SORT_BY_SCHEDULE.order_by())
+
+
+# -------------------------------------------------------
+# ARSIP (partitions.archive_partition)
+# -------------------------------------------------------
+# Bulan yang sudah diarsipkan pindah ke archive.appointments /
+# archive.medical_records. Query BACA riwayat, detail, pencarian & export
+# memakai entitas dari record_sources(): tabel utama apa adanya selama belum
+# ada arsip, sesudahnya alias di atas UNION ALL tabel utama + arsip. Filter di
+# luar UNION ALL diteruskan PostgreSQL ke kedua sisinya, jadi partition
+# pruning & index tetap dipakai. Tulis (edit, rekam medis baru) hanya ke
+# tabel utama: bulan yang diarsipkan sudah tutup.
+_archive_metadata = MetaData()
+ARCHIVED_APPOINTMENTS = Appointment.__table__.to_metadata(_archive_metadata, schema=ARCHIVE_SCHEMA)
+ARCHIVED_RECORDS = MedicalRecord.__table__.to_metadata(_archive_metadata, schema=ARCHIVE_SCHEMA)
+
+
+def _with_archive(entity, archived, *extra_columns):
+    # Nama alias = nama tabel, jadi literal SQL seperti search.SEARCH_VECTOR
+    # ('medical_records.search_vector') tetap merujuk kolom yang benar
+    name = entity.__table__.name
+    source = union_all(
+        select(*entity.__table__.c, *extra_columns),
+        select(*archived.c, *extra_columns)
+    ).subquery(name)
+    return aliased(entity, source, name=name)
+
+
+def appointment_source(session):
+    """Entitas Appointment untuk query baca, termasuk bulan yang diarsipkan."""
+    if not archive_available(session.connection()):
+        return Appointment
+    return _with_archive(Appointment, ARCHIVED_APPOINTMENTS)
+
+
+def record_sources(session):
+    """(entitas MedicalRecord, entitas Appointment) untuk query baca rekam medis."""
+    if not archive_available(session.connection()):
+        return MedicalRecord, Appointment
+    # search_vector: kolom generated PostgreSQL, tidak dipetakan di model
+    postgres = session.get_bind().dialect.name == 'postgresql'
+    records = _with_archive(MedicalRecord, ARCHIVED_RECORDS,
+                            *([literal_column('search_vector')] if postgres else []))
+    return records, _with_archive(Appointment, ARCHIVED_APPOINTMENTS)
+
+
+def visit_sort(records=MedicalRecord, appointments=Appointment):
+    """Riwayat pasien: kunjungan terbaru dulu, id rekam medis sebagai tie-breaker."""
+    return KeysetSort('visit', [
+        (appointments.appointment_date, 'date'),
+        (appointments.appointment_time, 'time'),
+        (records.id, 'int'),
+    ], descending=True)
+
+
+def medical_record_rows_query(session, *extra_columns, records=MedicalRecord, appointments=Appointment):
+    """SELECT berproyeksi rekam medis + kunjungan + dokter (tanpa objek ORM).
+
+    Hanya kolom yang ditampilkan yang di-SELECT, termasuk tanggal kunjungan,
+    nama & spesialisasi dokter lewat JOIN -- tidak ada lazy-load per baris.
+    records / appointments: entitas dari record_sources() (default tabel utama).
+    """
+    return session.query(
+        records.id,
+        records.appointment_id,
+        records.diagnosis,
+        records.notes,
+        records.created_at,
+        appointments.appointment_date,
+        appointments.appointment_time,
+        appointments.doctor_id,
+        User.name.label('doctor_name'),
+        Doctor.specialization,
+        *extra_columns
+    ).select_from(records)\
+        .join(appointments, (records.appointment_id == appointments.id)
+              & (records.appointment_date == appointments.appointment_date))\
+        .join(Doctor, appointments.doctor_id == Doctor.id)\
+        .join(User, Doctor.user_id == User.id)
+
+
+def patient_history_query(session, patient_id, date_from=None, date_to=None):
+    """Riwayat rekam medis pasien dalam SATU query berproyeksi.
+
+    Mengembalikan (query, sort).
+    """
+    records, appointments = record_sources(session)
+    query = medical_record_rows_query(session, records=records, appointments=appointments)\
+        .filter(appointments.patient_id == patient_id)
+
+    if date_from is not None:
+        query = query.filter(appointments.appointment_date >= date_from)
+    if date_to is not None:
+        query = query.filter(appointments.appointment_date <= date_to)
+    return query, visit_sort(records, appointments)
+
+
+def _export_filters(query, appointments, date_from, date_to, doctor_id, patient_id):
+    # Rentang appointment_date -> hanya partisi bulan terkait yang di-scan
+    if date_from is not None:
+        query = query.filter(appointments.appointment_date >= date_from)
+    if date_to is not None:
+        query = query.filter(appointments.appointment_date <= date_to)
+    if doctor_id is not None:
+        query = query.filter(appointments.doctor_id == doctor_id)
+    if patient_id is not None:
+        query = query.filter(appointments.patient_id == patient_id)
+    return query
+
+
+def appointment_export_query(session, date_from=None, date_to=None, doctor_id=None,
+                             patient_id=None, status=None):
+    """SELECT berproyeksi appointment untuk export, urut jadwal (lihat export.py)."""
+    appointments = appointment_source(session)
+    query = session.query(
+        appointments.id,
+        appointments.patient_id,
+        appointments.doctor_id,
+        appointments.appointment_date,
+        appointments.appointment_time,
+        appointments.status,
+        appointments.created_at,
+        appointments.updated_at
+    )
+    query = _export_filters(query, appointments, date_from, date_to, doctor_id, patient_id)
+    if status:
+        query = query.filter(appointments.status == status)
+    return query.order_by(appointments.appointment_date, appointments.appointment_time, appointments.id)
+
+
+def medical_record_export_query(session, date_from=None, date_to=None, doctor_id=None, patient_id=None):
+    """Rekam medis + kunjungan + dokter + pasien untuk export, urut tanggal kunjungan."""
+    records, appointments = record_sources(session)
+    query = medical_record_rows_query(session, appointments.patient_id,
+                                      records=records, appointments=appointments)
+    query = _export_filters(query, appointments, date_from, date_to, doctor_id, patient_id)
+    return query.order_by(appointments.appointment_date, appointments.appointment_time, records.id)
+
+
+# Kondisi partial unique index uq_appointments_doctor_slot
+ACTIVE_SLOT_WHERE = text("status <> 'cancelled'")
+
+_INSERT_BY_DIALECT = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert,
+}
+
+
+def dialect_insert(session):
+    """insert() milik dialect session (mendukung ON CONFLICT)."""
+    return _INSERT_BY_DIALECT[session.get_bind().dialect.name]
+
+
+def insert_appointment_if_free(session, **values):
+    """INSERT ... ON CONFLICT DO NOTHING RETURNING id dalam satu round-trip.
+
+    Mengembalikan id appointment baru, atau None jika slot dokter tsb sudah
+    dipakai appointment lain yang belum dibatalkan. Keunikan dijamin oleh
+    partial unique index, jadi aman walau banyak request datang bersamaan.
+    """
+    stmt = dialect_insert(session)(Appointment).values(**values).on_conflict_do_nothing(
+        index_elements=['doctor_id', 'appointment_date', 'appointment_time'],
+        index_where=ACTIVE_SLOT_WHERE
+    ).returning(Appointment.id)
+    return session.execute(stmt).scalar()
+
+
+def insert_appointments_if_free(session, rows):
+    """Versi banyak baris dari insert_appointment_if_free (satu statement).
+
+    rows: list dict kolom Appointment. Mengembalikan dict
+    (doctor_id, appointment_date, appointment_time) -> id untuk baris yang
+    berhasil di-insert; slot yang bentrok tidak ada di hasil. Pemanggil wajib
+    memastikan tidak ada dua baris dengan slot yang sama di dalam rows.
+    """
+    if not rows:
+        return {}
+    stmt = dialect_insert(session)(Appointment).values(rows).on_conflict_do_nothing(
+        index_elements=['doctor_id', 'appointment_date', 'appointment_time'],
+        index_where=ACTIVE_SLOT_WHERE
+    ).returning(
+        Appointment.id, Appointment.doctor_id,
+        Appointment.appointment_date, Appointment.appointment_time
+    )
+    return {
+        (row.doctor_id, row.appointment_date, row.appointment_time): row.id
+        for row in session.execute(stmt)
+    }
+
+
+def update_appointments(session, rows):
+    """Update status/tanggal/jam banyak appointment sekaligus.
+
+    rows: list dict id, previous_date (tanggal sebelum diubah), status,
+    appointment_date, appointment_time (nilai akhir). WHERE memuat
+    previous_date supaya di tabel partisi hanya partisi bulan lama yang
+    disentuh. PostgreSQL memakai satu UPDATE ... FROM (VALUES ...); dialect
+    lain satu UPDATE per baris (bulk UPDATE by primary key tidak bisa
+    mengubah appointment_date, bagian dari primary key ORM).
+    """
+    if not rows:
+        return
+    if session.get_bind().dialect.name != 'postgresql':
+        for r in rows:
+            session.execute(
+                update(Appointment)
+                .where(Appointment.id == r['id'], Appointment.appointment_date == r['previous_date'])
+                .values(status=r['status'], appointment_date=r['appointment_date'],
+                        appointment_time=r['appointment_time'])
+                .execution_options(synchronize_session=False)
+            )
+        return
+
+    data = values(
+        column('id', Integer), column('previous_date', Date), column('status', String),
+        column('appointment_date', Date), column('appointment_time', Time),
+        name='v'
+    ).data([
+        (r['id'], r['previous_date'], r['status'], r['appointment_date'], r['appointment_time'])
+        for r in rows
+    ])
+    session.execute(
+        update(Appointment)
+        .where(Appointment.id == data.c.id, Appointment.appointment_date == data.c.previous_date)
+        .values(
+            status=data.c.status,
+            appointment_date=data.c.appointment_date,
+            appointment_time=data.c.appointment_time
+        )
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,183 @@
+import functools
+import logging
+import re
+import threading
+from collections import Counter
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+log = logging.getLogger(__name__)
+
+# =======================================================
+# QUERY BUDGET (DETEKSI N+1) UNTUK DEV & TEST
+# =======================================================
+# Statement SQL dikelompokkan berdasarkan "bentuk" (normalize_sql: literal &
+# parameter diganti ?, daftar IN diringkas). Jika bentuk yang sama dijalankan
+# lebih dari N kali dalam satu request, hampir pasti ada lazy-load per baris.
+#
+# Di aplikasi (hanya jika query_budget.enabled = true di .ini):
+#   query_budget.max_repeats = 5        # batas bentuk statement yang sama
+#   query_budget.max_queries = 0        # batas total query per request (0 = mati)
+#   query_budget.action = log | raise
+#
+# Di test:
+#   with assert_max_queries(3):
+#       testapp.get('/api/doctors')
+#
+#   @max_queries(3)
+#   def test_doctors(testapp): ...
+#
+# Fixture pytest ada di src/testing.py.
+
+_NUMBER_RE = re.compile(r"\b\d+(\.\d+)?\b")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_PARAM_RE = re.compile(r"%\(\w+\)s|%s|\?|:\w+|\$\d+")
+_IN_LIST_RE = re.compile(r"\(\s*\?(\s*,\s*\?)*\s*\)")
+_VALUES_LIST_RE = re.compile(r"(\(\?\+\))(\s*,\s*\(\?\+\))+")
+_SPACE_RE = re.compile(r"\s+")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def normalize_sql(statement):
+    """Bentuk statement: nilai literal/parameter -> ?, list (?, ?, ...) -> (?+)."""
+    sql = _STRING_RE.sub('?', statement)
+    sql = _PARAM_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(?+)', sql)
+    sql = _VALUES_LIST_RE.sub(r'\1', sql)
+    return _SPACE_RE.sub(' ', sql).strip()
+
+
+def _report(statements, limit_text):
+    shapes = Counter(normalize_sql(s) for s in statements)
+    lines = [f'{len(statements)} query ({limit_text}). Bentuk terbanyak:']
+    for shape, count in shapes.most_common(5):
+        lines.append(f'  {count}x {shape[:300]}')
+    return '\n'.join(lines)
+
+
+def repeated_shapes(statements, max_repeats):
+    """[(bentuk, jumlah)] untuk bentuk statement yang muncul > max_repeats kali."""
+    shapes = Counter(normalize_sql(s) for s in statements)
+    return [(shape, count) for shape, count in shapes.most_common() if count > max_repeats]
+
+
+# -------------------------------------------------------
+# PENGHITUNG QUERY (TEST)
+# -------------------------------------------------------
+class QueryCounter:
+    """Context manager pencatat statement SQL di engine, hanya dari thread pemanggil."""
+
+    def __init__(self, engine=None):
+        self.engine = engine
+        self.statements = []
+        self._thread = None
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread:
+            self.statements.append(statement)
+
+    def __enter__(self):
+        if self.engine is None:
+            from .models import DBSession
+            self.engine = DBSession.get_bind()
+        self._thread = threading.get_ident()
+        event.listen(self.engine, 'before_cursor_execute', self._on_execute)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._on_execute)
+        return False
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def shapes(self):
+        return Counter(normalize_sql(s) for s in self.statements)
+
+
+class assert_max_queries(QueryCounter):
+    """Gagal (QueryBudgetExceeded) jika blok menjalankan lebih dari `limit` query
+    atau satu bentuk statement lebih dari `max_repeats` kali."""
+
+    def __init__(self, limit, engine=None, max_repeats=None):
+        super().__init__(engine)
+        self.limit = limit
+        self.max_repeats = max_repeats
+
+    def __exit__(self, exc_type, exc, tb):
+        super().__exit__(exc_type, exc, tb)
+        if exc_type is not None:
+            return False
+        if self.count > self.limit:
+            raise QueryBudgetExceeded(_report(self.statements, f'batas {self.limit}'))
+        if self.max_repeats is not None:
+            repeated = repeated_shapes(self.statements, self.max_repeats)
+            if repeated:
+                raise QueryBudgetExceeded(
+                    _report(self.statements, f'bentuk sama > {self.max_repeats}x, kemungkinan N+1'))
+        return False
+
+
+def max_queries(limit, engine=None, max_repeats=None):
+    """Decorator test: fungsi gagal jika menjalankan lebih dari `limit` query."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with assert_max_queries(limit, engine=engine, max_repeats=max_repeats):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# -------------------------------------------------------
+# GUARD PER REQUEST (DEV)
+# -------------------------------------------------------
+# Statement request yang sedang berjalan (per thread di WSGI, per request di ASGI)
+_statements = ContextVar('query_budget_statements', default=None)
+
+
+def install_query_guard(engine):
+    """Catat statement untuk request yang sedang berjalan."""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        statements = _statements.get()
+        if statements is not None:
+            statements.append(statement)
+
+
+def query_budget_tween_factory(handler, registry):
+    settings = registry.settings
+    max_repeats = int(settings.get('query_budget.max_repeats', 5))
+    max_total = int(settings.get('query_budget.max_queries', 0))
+    action = settings.get('query_budget.action', 'log')
+
+    def query_budget_tween(request):
+        statements = []
+        token = _statements.set(statements)
+        try:
+            response = handler(request)
+        finally:
+            _statements.reset(token)
+
+        problems = []
+        repeated = repeated_shapes(statements, max_repeats)
+        if repeated:
+            problems.append(_report(statements, f'bentuk sama > {max_repeats}x, kemungkinan N+1'))
+        if max_total and len(statements) > max_total:
+            problems.append(_report(statements, f'batas {max_total}'))
+
+        response.headers['X-Query-Count'] = str(len(statements))
+        if problems:
+            message = f'{request.method} {request.path}: ' + '\n'.join(problems)
+            if action == 'raise':
+                raise QueryBudgetExceeded(message)
+            log.warning(message)
+        return response
+
+    return query_budget_tween
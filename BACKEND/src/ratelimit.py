@@ -0,0 +1,239 @@
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# =======================================================
+# RATE LIMIT ENDPOINT AUTH (BCRYPT)
+# =======================================================
+# Login, register dan ubah password masing-masing menjalankan bcrypt
+# (~250 ms CPU). Sebelum view berjalan (subscriber ContextFound, belum ada
+# query / parsing selain body JSON kecil), request diperiksa:
+#   1. token bucket per IP      (ratelimit.ip_burst, ratelimit.ip_per_minute)
+#   2. token bucket per email   (ratelimit.email_burst, ratelimit.email_per_minute)
+#      -- change-password memakai user_id
+#   3. batas request auth yang berjalan bersamaan di proses ini
+#      (ratelimit.max_concurrent, default = hashing.max_pending)
+# Melebihi salah satu -> RateLimited (429 + Retry-After, views/errors.py),
+# tanpa ikut mengantri di pool hashing.
+#
+# Penyimpanan bucket:
+#   ratelimit.backend = memory   # dict LRU per proses (ratelimit.max_keys)
+#   ratelimit.backend = shared   # tabel hash ukuran tetap di shared memory,
+#                                # dipakai bersama semua worker di satu mesin
+#                                # (serve_asgi --workers N); 24 byte per slot
+#
+# IP diambil dari REMOTE_ADDR. Di belakang reverse proxy, set trusted_proxy
+# di Waitress supaya REMOTE_ADDR berisi IP client, bukan IP proxy.
+
+# Route -> field body JSON yang menjadi kunci bucket kedua
+LIMITED_ROUTES = {
+    'login': 'email',
+    'register': 'email',
+    'account_change_password': 'user_id',
+}
+
+
+class RateLimited(Exception):
+    """Request ditolak limiter; retry_after dalam detik."""
+
+    def __init__(self, retry_after):
+        super().__init__(retry_after)
+        self.retry_after = retry_after
+
+
+def _refill(tokens, stamp, now, rate, burst):
+    return min(burst, tokens + (now - stamp) * rate)
+
+
+# -------------------------------------------------------
+# BACKEND: MEMORY (per proses)
+# -------------------------------------------------------
+class MemoryBuckets:
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()   # kunci -> (tokens, stamp)
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now):
+        """Ambil satu token; 0 jika berhasil, atau detik sampai token berikutnya."""
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            tokens = burst if bucket is None else _refill(bucket[0], bucket[1], now, rate, burst)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            # Kunci paling lama tidak dipakai dibuang (bucket-nya kembali penuh)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+# -------------------------------------------------------
+# BACKEND: SHARED MEMORY (antar proses, satu mesin)
+# -------------------------------------------------------
+# Slot: hash kunci (8 byte, 0 = kosong), tokens, stamp (time.monotonic,
+# sama untuk semua proses di satu mesin). Open addressing dengan PROBES
+# slot; jika semua terisi kunci lain, slot dengan stamp tertua dipakai ulang.
+# Dua kunci dengan hash 64-bit sama berbagi bucket (lebih ketat, tidak longgar).
+_SLOT = struct.Struct('<Qdd')
+PROBES = 8
+
+
+def _key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+
+class SharedBuckets:
+    def __init__(self, name='cliniga_ratelimit', slots=65536):
+        import fcntl
+        from multiprocessing import resource_tracker, shared_memory
+
+        self._fcntl = fcntl
+        self._lock = threading.Lock()   # flock tidak mengunci antar thread satu proses
+        self._lock_file = open(os.path.join(tempfile.gettempdir(), name + '.lock'), 'a+b')
+        with self._locked():
+            try:
+                self._shm = shared_memory.SharedMemory(name=name, create=True, size=slots * _SLOT.size)
+            except FileExistsError:
+                self._shm = shared_memory.SharedMemory(name=name)
+        # Segment dipakai bersama worker lain: jangan dihapus saat proses ini keluar
+        resource_tracker.unregister(self._shm._name, 'shared_memory')
+        self.slots = self._shm.size // _SLOT.size
+        self._buf = self._shm.buf
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            self._fcntl.flock(self._lock_file, self._fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                self._fcntl.flock(self._lock_file, self._fcntl.LOCK_UN)
+
+    def _find(self, key_hash):
+        oldest, oldest_stamp = None, None
+        for probe in range(PROBES):
+            slot = (key_hash + probe) % self.slots
+            stored, tokens, stamp = _SLOT.unpack_from(self._buf, slot * _SLOT.size)
+            if stored == key_hash:
+                return slot, tokens, stamp
+            if stored == 0:
+                return slot, None, None
+            if oldest_stamp is None or stamp < oldest_stamp:
+                oldest, oldest_stamp = slot, stamp
+        return oldest, None, None
+
+    def take(self, key, rate, burst, now):
+        key_hash = _key_hash(key)
+        with self._locked():
+            slot, tokens, stamp = self._find(key_hash)
+            tokens = burst if tokens is None else _refill(tokens, stamp, now, rate, burst)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            _SLOT.pack_into(self._buf, slot * _SLOT.size, key_hash, tokens, now)
+            return wait
+
+    def __len__(self):
+        return sum(1 for slot in range(self.slots)
+                   if _SLOT.unpack_from(self._buf, slot * _SLOT.size)[0] != 0)
+
+
+# -------------------------------------------------------
+# LIMITER
+# -------------------------------------------------------
+class AuthLimiter:
+    def __init__(self, buckets, ip_burst=20, ip_per_minute=20, email_burst=5, email_per_minute=5,
+                 max_concurrent=32):
+        self.buckets = buckets
+        self.ip = (ip_per_minute / 60.0, ip_burst)
+        self.email = (email_per_minute / 60.0, email_burst)
+        self.max_concurrent = max_concurrent
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self.rejected = {'ip': 0, 'email': 0, 'concurrency': 0}
+
+    @classmethod
+    def from_settings(cls, settings):
+        if settings.get('ratelimit.backend', 'memory') == 'shared':
+            buckets = SharedBuckets(
+                name=settings.get('ratelimit.shared_name', 'cliniga_ratelimit'),
+                slots=int(settings.get('ratelimit.shared_slots', 65536)),
+            )
+        else:
+            buckets = MemoryBuckets(max_keys=int(settings.get('ratelimit.max_keys', 100000)))
+        return cls(
+            buckets,
+            ip_burst=int(settings.get('ratelimit.ip_burst', 20)),
+            ip_per_minute=float(settings.get('ratelimit.ip_per_minute', 20)),
+            email_burst=int(settings.get('ratelimit.email_burst', 5)),
+            email_per_minute=float(settings.get('ratelimit.email_per_minute', 5)),
+            max_concurrent=int(settings.get('ratelimit.max_concurrent',
+                                            settings.get('hashing.max_pending', 32))),
+        )
+
+    def check(self, client_ip, account):
+        """RateLimited jika IP / akun melebihi bucket-nya; selain itu None."""
+        now = time.monotonic()
+        wait = self.buckets.take('ip:' + client_ip, *self.ip, now)
+        if wait:
+            self.rejected['ip'] += 1
+            raise RateLimited(wait)
+        if account:
+            wait = self.buckets.take('account:' + account, *self.email, now)
+            if wait:
+                self.rejected['email'] += 1
+                raise RateLimited(wait)
+
+    def acquire(self):
+        """Ambil slot konkurensi (RateLimited jika penuh); lepas dengan release()."""
+        if not self._slots.acquire(blocking=False):
+            self.rejected['concurrency'] += 1
+            raise RateLimited(1)
+
+    def release(self):
+        self._slots.release()
+
+    def stats(self):
+        return {
+            'backend': type(self.buckets).__name__,
+            'keys': len(self.buckets),
+            'max_concurrent': self.max_concurrent,
+            'rejected': dict(self.rejected),
+        }
+
+
+def _account(request, field):
+    # Body JSON tidak valid -> hanya bucket IP; view yang membalas 400
+    try:
+        value = request.json_body.get(field)
+    except Exception:
+        return None
+    if value is None:
+        return None
+    return field + ':' + str(value).strip().lower()[:254]
+
+
+def rate_limit_subscriber(event):
+    """ContextFound: batasi route auth sebelum view (dan bcrypt) berjalan."""
+    request = event.request
+    route = request.matched_route
+    field = LIMITED_ROUTES.get(route.name) if route is not None else None
+    if field is None:
+        return
+    limiter = request.registry.auth_limiter
+    limiter.check(request.remote_addr or '-', _account(request, field))
+    limiter.acquire()
+    request.add_finished_callback(lambda request: limiter.release())
@@ -0,0 +1,74 @@
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+
+try:
+    import orjson
+except ImportError:  # orjson opsional, fallback ke json stdlib
+    orjson = None
+
+# =======================================================
+# JSON RENDERER CEPAT
+# =======================================================
+# Menggantikan renderer 'json' bawaan Pyramid (didaftarkan di src.main),
+# jadi semua view dengan renderer='json' otomatis memakainya.
+#   - orjson jika terpasang, json stdlib jika tidak (json.backend di .ini)
+#   - date / time / datetime diserialisasi langsung (ISO 8601), jadi
+#     to_json() dan view cukup mengembalikan objeknya tanpa str()/isoformat()
+#   - hasilnya bytes dan langsung jadi response.body (tanpa decode/encode ulang)
+
+BACKENDS = ('auto', 'orjson', 'stdlib')
+
+
+def _default(obj):
+    # Tipe yang tidak ditangani native oleh backend
+    if isinstance(obj, (datetime, date, time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+
+def _orjson_dumps(value):
+    return orjson.dumps(value, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+def _stdlib_dumps(value):
+    return json.dumps(value, default=_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def get_dumps(backend='auto'):
+    """Fungsi value -> bytes JSON untuk backend yang diminta."""
+    if backend not in BACKENDS:
+        raise ValueError(f'json.backend tidak dikenal: {backend} (pilihan: {BACKENDS})')
+    if backend == 'orjson' and orjson is None:
+        raise ImportError('json.backend = orjson tetapi paket orjson tidak terpasang')
+    if backend == 'stdlib' or orjson is None:
+        return _stdlib_dumps
+    return _orjson_dumps
+
+
+# Backend aktif; dipakai renderer dan juga streaming.py agar formatnya sama
+dumps = get_dumps()
+
+
+def configure(backend='auto'):
+    """Pilih backend JSON (dipanggil dari src.main dengan setting json.backend)."""
+    global dumps
+    dumps = get_dumps(backend)
+
+
+def json_renderer_factory(info):
+    """Renderer factory Pyramid, didaftarkan sebagai renderer 'json'."""
+    def _render(value, system):
+        request = system.get('request')
+        if request is not None:
+            response = request.response
+            # Sama seperti renderer bawaan: jangan timpa content type yang di-set view
+            if response.content_type == response.default_content_type:
+                response.content_type = 'application/json'
+                response.charset = 'utf-8'
+        return dumps(value)
+    return _render
@@ -0,0 +1,251 @@
+import itertools
+import threading
+import time
+from contextvars import ContextVar
+
+from pyramid.exceptions import ConfigurationError
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from .pool import pool_stats
+
+# =======================================================
+# READ REPLICA (ROUTING SESSION)
+# =======================================================
+# Jika db.replica_urls di-set, SELECT dari request GET/HEAD dikirim ke salah
+# satu replica (round-robin). Semua yang lain tetap ke primary:
+#   - request selain GET/HEAD (beserta SELECT di dalamnya)
+#   - flush / INSERT / UPDATE / DELETE / SELECT ... FOR UPDATE / text()
+#   - route yang view-nya ditandai @view_config(..., db='primary')
+#   - query dengan .execution_options(db_primary=True) (lihat on_primary)
+#   - read-your-writes: setelah request tulis berhasil, client mendapat cookie
+#     db_primary_until; GET berikutnya selama db.read_your_writes detik
+#     dibaca dari primary, jadi data yang baru ditulis langsung terlihat
+#   - session.get_bind() tanpa statement (cek dialect, load index/cache
+#     in-process di session terpisah) -> primary, supaya cache tidak terisi
+#     data replica yang tertinggal
+#
+# Health check: replica dicek dengan SELECT 1 saat startup; replica yang
+# gagal connect / terputus (startup maupun saat request) ditandai down dan
+# dilewati, lalu dicek lagi setelah db.replica_retry_interval detik. Request
+# yang sedang memakai replica saat replica itu putus tetap gagal (500);
+# request berikutnya sudah pindah. Jika semua replica down, pembacaan jatuh
+# ke primary.
+#
+# Setting:
+#   db.replica_urls = postgresql+psycopg2://...@replica1/db postgresql+psycopg2://...@replica2/db
+#   db.read_your_writes = 5
+#   db.replica_retry_interval = 10
+
+READ_METHODS = ('GET', 'HEAD')
+
+COOKIE_NAME = 'db_primary_until'
+
+# Execution option untuk memaksa satu query ke primary
+PRIMARY_OPTION = 'db_primary'
+
+_ENVIRON_KEY = 'cliniga.db_replica'
+_UNDECIDED = object()
+
+# Request yang sedang berjalan (bukan pyramid.threadlocal: di mode ASGI
+# banyak request berbagi satu thread)
+_current_request = ContextVar('replica_current_request', default=None)
+
+
+class _Replica:
+    def __init__(self, engine, retry_interval):
+        self.engine = engine
+        self.retry_interval = retry_interval
+        self.down_until = 0.0
+        self.reads = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def mark_down(self):
+        with self._lock:
+            now = time.monotonic()
+            if self.down_until <= now:
+                self.failures += 1  # dihitung per kejadian sehat -> down
+            self.down_until = now + self.retry_interval
+
+    def available(self):
+        if not self.down_until:
+            return True
+        with self._lock:
+            if time.monotonic() < self.down_until:
+                return False
+            # Satu thread yang mencoba lagi, thread lain tetap melewati replica ini
+            self.down_until = time.monotonic() + self.retry_interval
+        return self.probe()
+
+    def probe(self):
+        try:
+            with self.engine.connect() as conn:
+                conn.execute(text('SELECT 1'))
+        except Exception:
+            self.mark_down()
+            return False
+        self.down_until = 0.0
+        return True
+
+    def stats(self):
+        return {
+            'url': self.engine.url.render_as_string(hide_password=True),
+            'healthy': not self.down_until,
+            'reads': self.reads,
+            'failures': self.failures,
+            'pool': pool_stats(self.engine),
+        }
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.replicas = []
+        self.read_your_writes = 5
+        self.primary_routes = set()
+        self._counter = itertools.count()
+
+    def configure(self, engines, read_your_writes=5, retry_interval=10):
+        self.replicas = [_Replica(engine, retry_interval) for engine in engines]
+        self.read_your_writes = read_your_writes
+        for replica in self.replicas:
+            _watch_errors(replica)
+            # Replica yang tidak bisa dihubungi saat startup langsung dilewati
+            # (engine asyncio dicek saat dipakai pertama kali)
+            if not replica.engine.dialect.is_async:
+                replica.probe()
+
+    @property
+    def enabled(self):
+        return bool(self.replicas)
+
+    def pick(self):
+        """Engine replica berikutnya yang sehat (round-robin), None jika semua down."""
+        start = next(self._counter)
+        for offset in range(len(self.replicas)):
+            replica = self.replicas[(start + offset) % len(self.replicas)]
+            if replica.available():
+                replica.reads += 1
+                return replica.engine
+        return None
+
+    def wants_replica(self, request):
+        """True jika SELECT request ini boleh ke replica, None jika belum bisa
+        diputuskan (route belum diketahui)."""
+        if request.method not in READ_METHODS:
+            return False
+        route = getattr(request, 'matched_route', None)
+        if route is None:
+            return None  # belum routing (tween): primary, putuskan lagi nanti
+        if route.name in self.primary_routes:
+            return False
+        until = request.cookies.get(COOKIE_NAME)
+        if until and until.isdigit() and int(until) > time.time():
+            return False
+        return True
+
+    def bind_for_current_request(self):
+        """Engine replica untuk request yang sedang berjalan, None = primary.
+
+        Replica dipilih sekali per request, jadi semua SELECT satu request
+        membaca snapshot dari replica yang sama.
+        """
+        if not self.replicas:
+            return None
+        request = _current_request.get()
+        if request is None:
+            return None
+        bind = request.environ.get(_ENVIRON_KEY, _UNDECIDED)
+        if bind is _UNDECIDED:
+            wanted = self.wants_replica(request)
+            if wanted is None:
+                return None
+            bind = request.environ[_ENVIRON_KEY] = self.pick() if wanted else None
+        return bind
+
+    def stats(self):
+        return [replica.stats() for replica in self.replicas]
+
+
+replica_router = ReplicaRouter()
+
+
+def _watch_errors(replica):
+    @event.listens_for(replica.engine, 'handle_error')
+    def _on_error(context):
+        # connection None = gagal saat connect
+        if context.is_disconnect or context.connection is None:
+            replica.mark_down()
+
+
+# -------------------------------------------------------
+# SESSION
+# -------------------------------------------------------
+def _is_plain_select(clause):
+    return clause is not None and getattr(clause, 'is_select', False) \
+        and getattr(clause, '_for_update_arg', None) is None \
+        and not clause.get_execution_options().get(PRIMARY_OPTION)
+
+
+class RoutingSession(Session):
+    """Session yang mengirim SELECT request baca ke replica (lihat atas)."""
+
+    def get_bind(self, mapper=None, *, clause=None, **kw):
+        if replica_router.replicas and not self._flushing and _is_plain_select(clause):
+            replica = replica_router.bind_for_current_request()
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+def on_primary(query):
+    """Paksa satu query ORM dibaca dari primary (mis. mengisi cache in-process)."""
+    return query.execution_options(**{PRIMARY_OPTION: True})
+
+
+def read_bind(session):
+    """Engine untuk pembacaan di session terpisah (streaming): replica jika request ini boleh."""
+    return replica_router.bind_for_current_request() or session.get_bind()
+
+
+# -------------------------------------------------------
+# PYRAMID: override per view & cookie read-your-writes
+# -------------------------------------------------------
+def db_view_deriver(view, info):
+    """Opsi view_config db='primary': semua query route ini ke primary."""
+    target = info.options.get('db')
+    if target is None:
+        return view
+    if target != 'primary':
+        raise ConfigurationError(f"db={target!r} tidak dikenal, pilihan: 'primary'")
+    route_name = info.options.get('route_name')
+    if route_name is None:
+        raise ConfigurationError("db='primary' hanya untuk view dengan route_name")
+    replica_router.primary_routes.add(route_name)
+    return view
+
+
+db_view_deriver.options = ('db',)
+
+
+def replica_subscriber(event):
+    """Subscriber NewRequest: catat request berjalan & tandai client yang
+    baru menulis (cookie read-your-writes)."""
+    request = event.request
+    if not replica_router.enabled:
+        return
+    _current_request.set(request)
+    request.add_finished_callback(_forget_request)
+    if request.method not in READ_METHODS + ('OPTIONS',):
+        request.add_response_callback(_set_primary_cookie)
+
+
+def _forget_request(request):
+    _current_request.set(None)
+
+
+def _set_primary_cookie(request, response):
+    if response.status_code < 400:
+        window = replica_router.read_your_writes
+        response.set_cookie(COOKIE_NAME, str(int(time.time()) + window), max_age=window,
+                            httponly=True, samesite='Lax')
@@ -0,0 +1,26 @@
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, text
+
+from ..models import Base
+
+
+@contextmanager
+def scratch_schema(url, schema, keep=False, **engine_kwargs):
+    """Engine PostgreSQL yang search_path-nya schema sementara berisi tabel kosong.
+
+    Schema dibuat ulang di awal dan dihapus di akhir (kecuali keep=True),
+    jadi script pengecekan tidak menyentuh data asli di schema public.
+    """
+    engine = create_engine(url, connect_args={'options': f'-csearch_path={schema}'}, **engine_kwargs)
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP SCHEMA IF EXISTS {schema} CASCADE'))
+            conn.execute(text(f'CREATE SCHEMA {schema}'))
+            Base.metadata.create_all(conn)
+        yield engine
+    finally:
+        if not keep:
+            with engine.begin() as conn:
+                conn.execute(text(f'DROP SCHEMA IF EXISTS {schema} CASCADE'))
+        engine.dispose()
@@ -0,0 +1,91 @@
+"""Micro-benchmark serialisasi JSON list appointment.
+
+Membandingkan jalur lama (to_json dengan str()/isoformat() per field +
+renderer json bawaan Pyramid, hasil str di-encode ke body) dengan renderer
+baru (date/time native, bytes langsung) untuk backend orjson dan stdlib.
+Tidak butuh database: appointment dibuat sebagai objek transient.
+
+Contoh:
+    bench_json --count 10000 --repeat 20
+"""
+import argparse
+import sys
+import timeit
+from datetime import date, datetime, time, timedelta
+
+from pyramid.renderers import JSON
+
+from .. import renderers
+from ..models import Appointment
+
+STATUSES = ['pending', 'confirmed', 'completed', 'cancelled']
+
+
+def make_appointments(count):
+    base_day = date(2025, 1, 1)
+    base_created = datetime(2024, 12, 1, 8, 0, 0, 123456)
+    return [
+        Appointment(
+            id=i,
+            patient_id=1000 + i % 5000,
+            doctor_id=1 + i % 200,
+            appointment_date=base_day + timedelta(days=i % 365),
+            appointment_time=time(8 + i % 9, (i % 4) * 15),
+            status=STATUSES[i % 4],
+            created_at=base_created + timedelta(minutes=i)
+        )
+        for i in range(count)
+    ]
+
+
+def legacy_to_json(appt):
+    # Bentuk Appointment.to_json sebelum renderer baru
+    return {
+        "id": appt.id,
+        "patient_id": appt.patient_id,
+        "doctor_id": appt.doctor_id,
+        "appointment_date": str(appt.appointment_date),
+        "appointment_time": str(appt.appointment_time),
+        "status": appt.status,
+        "created_at": appt.created_at.isoformat() if appt.created_at else None
+    }
+
+
+def legacy_path(appointments):
+    render = JSON()(None)
+    text = render({'appointments': [legacy_to_json(a) for a in appointments]}, {})
+    return text.encode('utf-8')
+
+
+def new_path(dumps):
+    def run(appointments):
+        return dumps({'appointments': [a.to_json() for a in appointments]})
+    return run
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=10000, help='Jumlah appointment')
+    parser.add_argument('--repeat', type=int, default=20, help='Pengulangan (diambil yang tercepat)')
+    args = parser.parse_args(argv[1:])
+
+    appointments = make_appointments(args.count)
+    candidates = [('pyramid json (lama)', legacy_path),
+                  ('stdlib (baru)', new_path(renderers.get_dumps('stdlib')))]
+    if renderers.orjson is not None:
+        candidates.append(('orjson (baru)', new_path(renderers.get_dumps('orjson'))))
+    else:
+        print('orjson tidak terpasang, hanya membandingkan stdlib')
+
+    baseline = None
+    print(f'{args.count} appointment, terbaik dari {args.repeat} kali')
+    for name, fn in candidates:
+        body = fn(appointments)
+        best = min(timeit.repeat(lambda: fn(appointments), number=1, repeat=args.repeat))
+        baseline = baseline or best
+        print(f'{name:<22} {best * 1000:8.2f} ms  {len(body) / 1024:8.0f} KiB  x{baseline / best:.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""Cek rencana query (EXPLAIN) untuk query appointment yang paling sering dipakai.
+
+Script ini membuat schema sementara di PostgreSQL, mengisi data sintetis,
+lalu menjalankan EXPLAIN untuk setiap query di HOT_QUERIES. Exit code 1 jika
+ada query yang jatuh ke Seq Scan pada tabel besar (index hilang / tidak cocok).
+
+Contoh:
+    check_query_plans --appointments 200000
+"""
+import argparse
+import sys
+from datetime import date
+
+from dotenv import load_dotenv
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from . import scratch_schema
+from .. import database_url_from_env
+from ..partitions import convert_to_partitioned
+from ..queries import (appointment_export_query, appointment_list_query, medical_record_rows_query,
+                       next_appointment_query, patient_history_query)
+from ..search import SEARCH_VECTOR, ts_query
+
+SCHEMA = 'query_plan_check'
+
+# Tabel yang tidak boleh di-scan penuh oleh query "panas"
+WATCHED_TABLES = {'appointments', 'medical_records'}
+
+SEED_SQL = [
+    """
+    INSERT INTO users (name, email, password, role)
+    SELECT 'user ' || i, 'user' || i || '@seed.local', 'x',
+           CASE WHEN i <= :doctors THEN 'doctor' ELSE 'patient' END
+    FROM generate_series(1, :users) AS i
+    """,
+    """
+    INSERT INTO doctors (user_id, specialization, schedule)
+    SELECT i, 'Spesialis ' || (i % 12), '-'
+    FROM generate_series(1, :doctors) AS i
+    """,
+    """
+    INSERT INTO appointments (patient_id, doctor_id, appointment_date, appointment_time, status, created_at)
+    SELECT :doctors + 1 + floor(random() * (:users - :doctors))::int,
+           1 + floor(random() * :doctors)::int,
+           current_date + ((i % 730) - 365),
+           make_time(8 + i % 9, (i % 4) * 15, 0),
+           (ARRAY['pending', 'confirmed', 'completed', 'cancelled'])[1 + i % 4],
+           now() - make_interval(mins => i)
+    FROM generate_series(1, :appointments) AS i
+    """,
+    """
+    INSERT INTO medical_records (appointment_id, appointment_date, diagnosis, notes)
+    SELECT id, appointment_date, 'Diagnosa ' || (id % 50), '-'
+    FROM appointments WHERE status = 'completed'
+    """,
+]
+
+
+def _appointment_page(**filters):
+    # Bentuk query yang sama dengan pagination.paginate (ORDER BY + LIMIT)
+    def build(session):
+        query, sort = appointment_list_query(session, **filters)
+        return query.order_by(*sort.order_by()).limit(51)
+    return build
+
+
+def _patient_history(patient_id):
+    def build(session):
+        query, sort = patient_history_query(session, patient_id)
+        return query.order_by(*sort.order_by()).limit(51)
+    return build
+
+
+def _next_appointment(**owner):
+    def build(session):
+        return next_appointment_query(session, date.today(), **owner).limit(1)
+    return build
+
+
+def _export_doctor(doctor_id):
+    # Export per dokter untuk satu bulan: index dokter-tanggal-jam, satu partisi
+    def build(session):
+        today = date.today()
+        return appointment_export_query(session, date_from=today.replace(day=1), date_to=today,
+                                        doctor_id=doctor_id)
+    return build
+
+
+def _record_search(q):
+    def build(session):
+        tsq = ts_query(q)
+        return medical_record_rows_query(session)\
+            .filter(SEARCH_VECTOR.op('@@')(tsq))\
+            .order_by(func.ts_rank(SEARCH_VECTOR, tsq).desc()).limit(21)
+    return build
+
+
+HOT_QUERIES = [
+    ('show appointments (page)', _appointment_page()),
+    ('filter doctor', _appointment_page(doctor_id=7)),
+    ('filter doctor upcoming', _appointment_page(doctor_id=7, upcoming_from=date.today())),
+    ('filter patient', _appointment_page(patient_id=1234)),
+    ('filter patient + status', _appointment_page(patient_id=1234, status='completed')),
+    ('filter patient upcoming', _appointment_page(patient_id=1234, upcoming_from=date.today())),
+    ('patient history', _patient_history(1234)),
+    ('stats next visit doctor', _next_appointment(doctor_id=7)),
+    ('stats next visit patient', _next_appointment(patient_id=1234)),
+    ('medical record search', _record_search('diagnosa 7')),
+    ('export doctor month', _export_doctor(7)),
+]
+
+
+def _watched(relation):
+    # Partisi appointments_pYYYY_MM / appointments_default dihitung sebagai appointments
+    if relation and relation.startswith('appointments_'):
+        return 'appointments'
+    return relation if relation in WATCHED_TABLES else None
+
+
+def find_seq_scans(plan):
+    """Kembalikan tabel WATCHED (atau partisinya) yang di-Seq Scan di dalam plan (rekursif)."""
+    found = []
+    relation = _watched(plan.get('Relation Name'))
+    if plan.get('Node Type') == 'Seq Scan' and relation:
+        found.append(plan.get('Relation Name'))
+    for child in plan.get('Plans', []):
+        found.extend(find_seq_scans(child))
+    return found
+
+
+def explain(conn, query):
+    compiled = query.statement.compile(dialect=conn.dialect)
+    result = conn.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params)
+    return result.scalar()[0]['Plan']
+
+
+def seed(conn, users, doctors, appointments):
+    params = {'users': users, 'doctors': doctors, 'appointments': appointments}
+    for sql in SEED_SQL:
+        conn.execute(text(sql), params)
+    # Bentuk tabel sama dengan produksi setelah migration 0007
+    convert_to_partitioned(conn)
+    conn.execute(text('ANALYZE'))
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='URL PostgreSQL (default: dari .env)')
+    parser.add_argument('--users', type=int, default=20000)
+    parser.add_argument('--doctors', type=int, default=200)
+    parser.add_argument('--appointments', type=int, default=200000)
+    parser.add_argument('--keep', action='store_true', help='Jangan hapus schema setelah selesai')
+    args = parser.parse_args(argv[1:])
+
+    load_dotenv()
+    url = args.url or database_url_from_env()
+
+    failures = []
+    with scratch_schema(url, SCHEMA, keep=args.keep) as engine:
+        with engine.begin() as conn:
+            seed(conn, args.users, args.doctors, args.appointments)
+
+        with engine.connect() as conn:
+            session = Session(bind=conn)
+            for name, build in HOT_QUERIES:
+                scans = find_seq_scans(explain(conn, build(session)))
+                if scans:
+                    failures.append(name)
+                    print(f'SEQ SCAN  {name}: {", ".join(scans)}')
+                else:
+                    print(f'OK        {name}')
+            session.close()
+
+    if failures:
+        print(f'{len(failures)} query jatuh ke Seq Scan')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Jadikan user yang sudah terdaftar admin (akses /api/export/...).
+
+Role admin tidak bisa didaftarkan lewat /api/auth/register (lihat
+src/access.py). Daftarkan user biasa, jalankan command ini, lalu login ulang:
+role dibaca dari claim token, jadi token lama tetap dengan role lamanya
+sampai kedaluwarsa (24 jam).
+
+Contoh:
+    grant_admin admin@klinik.id
+    grant_admin admin@klinik.id --revoke patient
+"""
+import argparse
+import sys
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from .. import database_url_from_env
+from ..access import ADMIN_ROLE
+from ..models import User
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('email', help='Email user')
+    parser.add_argument('--url', help='URL database (default: dari .env)')
+    parser.add_argument('--revoke', metavar='ROLE',
+                        help='Cabut admin: kembalikan ke role ini (mis. patient)')
+    args = parser.parse_args(argv[1:])
+
+    role = args.revoke or ADMIN_ROLE
+    if args.revoke == ADMIN_ROLE:
+        parser.error('--revoke butuh role selain admin')
+
+    load_dotenv()
+    engine = create_engine(args.url or database_url_from_env())
+    try:
+        with Session(engine) as session:
+            user = session.query(User).filter(User.email == args.email).first()
+            if user is None:
+                print(f'User {args.email} tidak ditemukan')
+                return 1
+            if user.role == 'doctor' or (args.revoke and user.role != ADMIN_ROLE):
+                print(f'User {args.email} ber-role {user.role}, tidak diubah')
+                return 1
+            user.role = role
+            session.commit()
+    finally:
+        engine.dispose()
+
+    print(f'User {args.email} sekarang ber-role {role} (login ulang untuk token baru)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
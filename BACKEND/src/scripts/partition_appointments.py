@@ -0,0 +1,96 @@
+"""Buat partisi bulanan appointments ke depan dan arsipkan bulan yang sudah tutup.
+
+Tabel appointments di PostgreSQL dipartisi per bulan sejak migration 0007
+(lihat src/partitions.py). Jalankan harian dari cron:
+  - partisi bulan ini s/d --months-ahead bulan ke depan dibuat jika belum ada
+    (baris yang terlanjur masuk partisi default ikut dipindah)
+  - dengan --archive-before YYYY-MM, partisi bulan SEBELUM bulan itu dilepas
+    dari appointments dan dipindah ke schema archive bersama rekam medisnya;
+    partisi yang masih punya appointment pending/confirmed dilewati. Riwayat,
+    detail, pencarian & export rekam medis tetap membaca arsip (hanya-baca)
+
+Setiap partisi diproses di transaksinya sendiri dengan lock_timeout pendek,
+jadi aman dijalankan saat aplikasi hidup (jika lock tidak didapat, jalankan
+ulang nanti).
+
+Contoh:
+    partition_appointments
+    partition_appointments --archive-before 2024-01 --dry-run
+"""
+import argparse
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+
+from .. import database_url_from_env
+from ..partitions import (DEFAULT_MONTHS_AHEAD, archive_candidates, archive_partition, create_partition,
+                          is_partitioned, lock_maintenance, missing_partitions, partition_name)
+
+
+def _month(value):
+    try:
+        return datetime.strptime(value, '%Y-%m').date()
+    except ValueError:
+        raise argparse.ArgumentTypeError('format bulan YYYY-MM')
+
+
+def main(argv=sys.argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', help='URL PostgreSQL (default: dari .env)')
+    parser.add_argument('--months-ahead', type=int, default=DEFAULT_MONTHS_AHEAD,
+                        help='Jumlah bulan ke depan yang disiapkan partisinya')
+    parser.add_argument('--archive-before', type=_month, metavar='YYYY-MM',
+                        help='Arsipkan partisi bulan sebelum bulan ini')
+    parser.add_argument('--lock-timeout', type=int, default=5, help='Detik menunggu lock tabel')
+    parser.add_argument('--dry-run', action='store_true', help='Hanya tampilkan rencana, jangan ubah')
+    args = parser.parse_args(argv[1:])
+
+    load_dotenv()
+    engine = create_engine(args.url or database_url_from_env())
+    try:
+        with engine.connect() as conn:
+            if not is_partitioned(conn):
+                print('Tabel appointments belum dipartisi (PostgreSQL + migration 0007)')
+                return 1
+            missing = missing_partitions(conn, args.months_ahead)
+            candidates = archive_candidates(conn, args.archive_before) if args.archive_before else []
+
+        for month in missing:
+            if args.dry_run:
+                print(f'BUAT     {partition_name(month)} (dry-run)')
+                continue
+            with engine.begin() as conn:
+                lock_maintenance(conn, args.lock_timeout)
+                # Proses lain bisa saja sudah membuatnya
+                if month in missing_partitions(conn, args.months_ahead):
+                    print(f'BUAT     {create_partition(conn, month)}')
+
+        skipped = 0
+        for month, name, open_rows in candidates:
+            if open_rows:
+                skipped += 1
+                print(f'LEWATI   {name}: {open_rows} appointment masih pending/confirmed')
+                continue
+            if args.dry_run:
+                print(f'ARSIPKAN {name} (dry-run)')
+                continue
+            with engine.begin() as conn:
+                lock_maintenance(conn, args.lock_timeout)
+                records = archive_partition(conn, month)
+            if records is None:
+                skipped += 1
+                print(f'LEWATI   {name}: ada appointment pending/confirmed baru')
+                continue
+            print(f'ARSIPKAN {name}: dipindah ke archive bersama {records} rekam medis')
+    finally:
+        engine.dispose()
+
+    if not missing and not candidates:
+        print('Partisi sudah lengkap, tidak ada yang diarsipkan')
+    return 1 if skipped else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import logging
+import math
+import re
+import threading
+
+from sqlalchemy import event, func, literal_column
+from sqlalchemy.orm import Session, aliased
+
+from .models import DBSession, MedicalRecord, User
+from .queries import medical_record_rows_query, record_sources
+
+log = logging.getLogger(__name__)
+
+# =======================================================
+# FULL-TEXT SEARCH REKAM MEDIS
+# =======================================================
+# PostgreSQL: kolom generated medical_records.search_vector (tsvector,
+# config 'indonesian' + 'simple', diagnosis bobot A, notes bobot B) dengan
+# GIN index ix_medical_records_search -> WHERE search_vector @@ query,
+# diurutkan ts_rank.
+#
+# Dialect lain (SQLite untuk test/dev): inverted index in-memory di bawah,
+# dibangun saat search pertama dan di-refresh per rekam medis setelah commit.
+# Semantik query sama: semua kata harus ada, "-kata" untuk mengecualikan.
+
+MAX_SEARCH_LIMIT = 100
+
+# Bobot ts_rank default untuk A (diagnosis) dan B (notes)
+FIELD_WEIGHTS = {'diagnosis': 1.0, 'notes': 0.4}
+
+SEARCH_VECTOR = literal_column('medical_records.search_vector')
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def ts_query(q):
+    # 'indonesian' untuk kata yang di-stem (demam -> demam, pemeriksaan -> periksa),
+    # 'simple' untuk istilah medis / nama obat yang tidak boleh di-stem
+    return func.websearch_to_tsquery('indonesian', q).op('||')(func.websearch_to_tsquery('simple', q))
+
+
+def tokenize(text):
+    return _WORD_RE.findall(text.lower()) if text else []
+
+
+def parse_terms(q):
+    """Query user -> (kata wajib, kata dikecualikan)."""
+    include, exclude = [], []
+    for raw in q.split():
+        target = exclude if raw.startswith('-') and len(raw) > 1 else include
+        target.extend(tokenize(raw))
+    return include, exclude
+
+
+# -------------------------------------------------------
+# INVERTED INDEX (FALLBACK NON-POSTGRESQL)
+# -------------------------------------------------------
+class InvertedIndex:
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings = {}  # token -> {record_id: bobot tf}
+        self._docs = {}      # record_id -> set token (untuk hapus/refresh)
+        self._loaded = False
+
+    def _add_locked(self, record_id, diagnosis, notes):
+        weights = {}
+        for field, text in (('diagnosis', diagnosis), ('notes', notes)):
+            for token in tokenize(text):
+                weights[token] = weights.get(token, 0.0) + FIELD_WEIGHTS[field]
+        for token, weight in weights.items():
+            self._postings.setdefault(token, {})[record_id] = weight
+        self._docs[record_id] = set(weights)
+
+    def _remove_locked(self, record_id):
+        for token in self._docs.pop(record_id, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(record_id, None)
+                if not postings:
+                    del self._postings[token]
+
+    def _rows(self, session, record_ids=None):
+        records, _ = record_sources(session)
+        query = session.query(records.id, records.diagnosis, records.notes)
+        if record_ids is not None:
+            query = query.filter(records.id.in_(record_ids))
+        return query.yield_per(1000)
+
+    def load(self, bind=None):
+        # Dibangun di index baru lalu ditukar: lock tidak ditahan selama
+        # menunggu database (di mode ASGI semua request berbagi satu thread,
+        # RLock tidak melindungi antar request) dan pencarian tetap jalan
+        fresh = InvertedIndex()
+        session = Session(bind=bind or DBSession.get_bind())
+        try:
+            for row in self._rows(session):
+                fresh._add_locked(row.id, row.diagnosis, row.notes)
+        finally:
+            session.close()
+        with self._lock:
+            self._postings, self._docs = fresh._postings, fresh._docs
+            self._loaded = True
+
+    def ensure_loaded(self, bind=None):
+        if not self._loaded:
+            self.load(bind)
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded = False
+
+    def refresh(self, record_ids, bind=None):
+        if not self._loaded or not record_ids:
+            return
+        session = Session(bind=bind or DBSession.get_bind())
+        try:
+            rows = list(self._rows(session, record_ids))
+        finally:
+            session.close()
+        with self._lock:
+            for record_id in record_ids:
+                self._remove_locked(record_id)
+            for row in rows:
+                self._add_locked(row.id, row.diagnosis, row.notes)
+
+    def search(self, q):
+        """Query -> dict record_id -> skor (tf x idf, berbobot per kolom)."""
+        include, exclude = parse_terms(q)
+        if not include:
+            return {}
+        with self._lock:
+            total = len(self._docs) or 1
+            postings = [self._postings.get(token, {}) for token in include]
+            if not all(postings):
+                return {}
+            postings.sort(key=len)
+            scores = {}
+            for record_id in postings[0]:
+                if all(record_id in p for p in postings[1:]):
+                    scores[record_id] = sum(
+                        p[record_id] * math.log(1 + total / len(p)) for p in postings)
+            for token in exclude:
+                for record_id in self._postings.get(token, ()):
+                    scores.pop(record_id, None)
+        return scores
+
+
+record_index = InvertedIndex()
+
+
+# -------------------------------------------------------
+# SEARCH
+# -------------------------------------------------------
+def search_medical_records(session, q, doctor_id=None, date_from=None, date_to=None, limit=20, offset=0):
+    """Cari rekam medis. Mengembalikan (rows, has_more), rows terurut skor tertinggi.
+
+    Setiap row berisi kolom medical_record_rows_query + patient_id,
+    patient_name dan score.
+    """
+    patient = aliased(User)
+    postgres = session.get_bind().dialect.name == 'postgresql'
+
+    if postgres:
+        tsq = ts_query(q)
+        score = func.ts_rank(SEARCH_VECTOR, tsq)
+    else:
+        record_index.ensure_loaded(session.get_bind())
+        scores = record_index.search(q)
+        if not scores:
+            return [], False
+
+    # Termasuk rekam medis bulan yang sudah diarsipkan (queries.record_sources)
+    records, appointments = record_sources(session)
+    query = medical_record_rows_query(
+        session,
+        appointments.patient_id,
+        patient.name.label('patient_name'),
+        *([score.label('score')] if postgres else []),
+        records=records,
+        appointments=appointments
+    ).join(patient, appointments.patient_id == patient.id)
+
+    if doctor_id is not None:
+        query = query.filter(appointments.doctor_id == doctor_id)
+    if date_from is not None:
+        query = query.filter(appointments.appointment_date >= date_from)
+    if date_to is not None:
+        query = query.filter(appointments.appointment_date <= date_to)
+
+    if postgres:
+        query = query.filter(SEARCH_VECTOR.op('@@')(tsq))\
+            .order_by(score.desc(), records.id.desc())\
+            .offset(offset).limit(limit + 1)
+        rows = [dict(row._mapping) for row in query]
+    else:
+        rows = [
+            dict(row._mapping, score=scores[row.id])
+            for row in query.filter(records.id.in_(scores))
+        ]
+        rows.sort(key=lambda r: (-r['score'], -r['id']))
+        rows = rows[offset:offset + limit + 1]
+
+    return rows[:limit], len(rows) > limit
+
+
+# -------------------------------------------------------
+# REFRESH INDEX FALLBACK SETELAH COMMIT
+# -------------------------------------------------------
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    changes = session.info.setdefault('search_changes', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, MedicalRecord):
+            changes.add(obj.id)
+
+
+@event.listens_for(Session, 'after_commit')
+def _apply_changes(session):
+    changes = session.info.pop('search_changes', None)
+    if not changes:
+        return
+    try:
+        record_index.refresh(changes, bind=session.get_bind())
+    except Exception:
+        log.exception('Gagal refresh index pencarian rekam medis')
+        record_index.invalidate()
+
+
+@event.listens_for(Session, 'after_soft_rollback')
+def _forget_changes(session, previous_transaction):
+    session.info.pop('search_changes', None)
@@ -0,0 +1,43 @@
+from pyramid.response import Response
+from sqlalchemy.orm import Session
+
+from . import renderers
+from .models import DBSession
+from .replicas import read_bind
+
+# =======================================================
+# STREAMING JSON RESPONSE
+# =======================================================
+# Untuk hasil yang sangat besar: baris diambil bertahap (yield_per) dan
+# JSON ditulis sepotong-sepotong lewat app_iter, jadi memori worker tetap
+# datar berapapun jumlah barisnya.
+
+YIELD_PER = 500
+
+
+def _iter_json_array(query, bind, key, serialize, yield_per):
+    # Session terpisah: generator ini baru dijalankan setelah pyramid_tm
+    # menutup transaksi request, jadi tidak boleh memakai DBSession.
+    session = Session(bind=bind)
+    try:
+        rows = query.with_session(session).yield_per(yield_per)
+        yield ('{"%s":[' % key).encode('utf-8')
+        first = True
+        for row in rows:
+            chunk = renderers.dumps(serialize(row))
+            if first:
+                first = False
+                yield chunk
+            else:
+                yield b',' + chunk
+        yield b']}'
+    finally:
+        session.close()
+
+
+def stream_json_list(query, key, serialize=lambda obj: obj.to_json(), yield_per=YIELD_PER):
+    """Response berisi {"<key>": [...]} yang ditulis baris per baris."""
+    response = Response(content_type='application/json', charset='utf-8')
+    # Bind dipilih sekarang, selagi request (dan pilihan replica-nya) masih aktif
+    response.app_iter = _iter_json_array(query, read_bind(DBSession), key, serialize, yield_per)
+    return response
@@ -0,0 +1,36 @@
+"""Plugin pytest untuk query budget.
+
+Aktifkan di conftest.py:
+
+    pytest_plugins = ['src.testing']
+
+lalu di test:
+
+    def test_daftar_dokter(testapp, query_budget):
+        with query_budget(2):
+            testapp.get('/api/doctors')
+
+    def test_riwayat(testapp, query_counter):
+        testapp.get('/api/medical-records/history?patient_id=1')
+        assert query_counter.count <= 2, query_counter.shapes()
+
+Decorator tanpa fixture: src.querybudget.max_queries.
+"""
+import pytest
+
+from .querybudget import QueryCounter, assert_max_queries
+
+
+@pytest.fixture
+def query_counter():
+    """Semua statement SQL selama test (thread test saja)."""
+    with QueryCounter() as counter:
+        yield counter
+
+
+@pytest.fixture
+def query_budget():
+    """Factory context manager: query_budget(limit, max_repeats=None)."""
+    def factory(limit, max_repeats=None, engine=None):
+        return assert_max_queries(limit, engine=engine, max_repeats=max_repeats)
+    return factory
@@ -0,0 +1,223 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+from pyramid.events import NewRequest
+from pyramid.response import Response
+from pyramid.security import Allowed
+
+# =======================================================
+# VERIFIKASI JWT (TWEEN + SECURITY POLICY)
+# =======================================================
+# Tween memverifikasi header "Authorization: Bearer <token>" sekali per
+# request, lalu hasilnya dibaca JWTSecurityPolicy sebagai request.identity.
+# - Token yang sudah pernah lolos verifikasi disimpan di LRU (kunci: signature)
+#   sampai exp-nya, jadi request berikutnya tidak perlu HMAC + decode JSON lagi.
+# - Token yang di-logout masuk RevocationSet (Bloom filter + dict exp),
+#   dicek O(1) tanpa query database.
+
+ALGORITHMS = ['HS256']
+
+# Path yang tetap boleh diakses tanpa token walau auth.require_token = true.
+# Dicocokkan persis (bukan prefix): /api/doctors publik, tetapi
+# /api/doctors/{id}/queue dan /slots tidak
+PUBLIC_PATHS = frozenset({'/api/auth/login', '/api/auth/register', '/api/doctors'})
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def split_signature(token):
+    """"header.payload.signature" -> ("header.payload", "signature")."""
+    signing_input, _, signature = token.rpartition('.')
+    if not signing_input or not signature:
+        raise InvalidToken('Format token salah')
+    return signing_input, signature
+
+
+class BloomFilter:
+    def __init__(self, bits=1 << 16, hashes=4):
+        self.bits = bits
+        self.hashes = hashes
+        self._array = bytearray(bits // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=4 * self.hashes).digest()
+        for i in range(self.hashes):
+            yield int.from_bytes(digest[4 * i:4 * i + 4], 'little') % self.bits
+
+    def add(self, key):
+        for pos in self._positions(key):
+            self._array[pos >> 3] |= 1 << (pos & 7)
+
+    def __contains__(self, key):
+        return all(self._array[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+
+class RevocationSet:
+    """Signature token yang sudah di-logout, otomatis dibuang setelah exp."""
+
+    def __init__(self, prune_interval=60, bloom_bits=1 << 16):
+        self.prune_interval = prune_interval
+        self.bloom_bits = bloom_bits
+        self._expiry = {}
+        self._bloom = BloomFilter(bloom_bits)
+        self._next_prune = time.time() + prune_interval
+        self._lock = threading.Lock()
+
+    def revoke(self, signature, exp):
+        with self._lock:
+            self._expiry[signature] = exp
+            self._bloom.add(signature)
+
+    def is_revoked(self, signature, now=None):
+        now = now or time.time()
+        if now >= self._next_prune:
+            self.prune(now)
+        # Mayoritas token tidak pernah di-revoke: cukup cek Bloom filter
+        if signature not in self._bloom:
+            return False
+        exp = self._expiry.get(signature)
+        return exp is not None and exp > now
+
+    def prune(self, now=None):
+        # Bloom filter tidak bisa menghapus, jadi dibangun ulang dari sisa entri
+        now = now or time.time()
+        with self._lock:
+            self._expiry = {sig: exp for sig, exp in self._expiry.items() if exp > now}
+            bloom = BloomFilter(self.bloom_bits)
+            for sig in self._expiry:
+                bloom.add(sig)
+            self._bloom = bloom
+            self._next_prune = now + self.prune_interval
+
+    def __len__(self):
+        return len(self._expiry)
+
+
+class TokenVerifier:
+    def __init__(self, secret=None, cache_size=4096, revocations=None):
+        self._secret = secret
+        self.cache_size = cache_size
+        self.revocations = revocations or RevocationSet()
+        self._cache = OrderedDict()  # signature -> (signing_input, claims, exp)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls(
+            secret=settings.get('auth.jwt_secret'),
+            cache_size=int(settings.get('auth.token_cache_size', 4096)),
+            revocations=RevocationSet(
+                prune_interval=int(settings.get('auth.revocation_prune_interval', 60))),
+        )
+
+    @property
+    def secret(self):
+        # Default sama dengan yang dipakai AuthViews.login
+        return self._secret or os.getenv('JWT')
+
+    def verify(self, token, now=None):
+        """Kembalikan claims token; raise InvalidToken jika tidak valid."""
+        now = now or time.time()
+        signing_input, signature = split_signature(token)
+
+        if self.revocations.is_revoked(signature, now):
+            raise InvalidToken('Token sudah tidak berlaku (logout)')
+
+        with self._lock:
+            cached = self._cache.get(signature)
+            if cached is not None:
+                if cached[0] == signing_input and cached[2] > now:
+                    self._cache.move_to_end(signature)
+                    self.hits += 1
+                    return cached[1]
+                del self._cache[signature]
+            self.misses += 1
+
+        try:
+            claims = jwt.decode(token, self.secret, algorithms=ALGORITHMS)
+        except jwt.InvalidTokenError as e:
+            raise InvalidToken(str(e)) from e
+
+        exp = claims.get('exp')
+        if exp is not None:
+            with self._lock:
+                self._cache[signature] = (signing_input, claims, exp)
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return claims
+
+    def revoke(self, token):
+        """Cabut token (dipakai saat logout)."""
+        claims = self.verify(token)
+        _, signature = split_signature(token)
+        self.revocations.revoke(signature, claims.get('exp', time.time() + 86400))
+        with self._lock:
+            self._cache.pop(signature, None)
+
+
+def bearer_token(request):
+    header = request.headers.get('Authorization', '')
+    scheme, _, token = header.partition(' ')
+    if scheme.lower() == 'bearer' and token.strip():
+        return token.strip()
+    return None
+
+
+def _unauthorized(request, message):
+    # Request berhenti di tween (sebelum router mengirim NewRequest), jadi
+    # subscriber NewRequest (CORS) dipanggil manual agar header tetap ada.
+    request.registry.notify(NewRequest(request))
+    response = Response(status=401, json_body={'error': message})
+    response.headers['WWW-Authenticate'] = 'Bearer'
+    return response
+
+
+def jwt_tween_factory(handler, registry):
+    verifier = registry.tokens
+    require_token = registry.settings.get('auth.require_token', 'false') == 'true'
+
+    def jwt_tween(request):
+        request.jwt_claims = None
+        if request.method == 'OPTIONS':
+            return handler(request)
+
+        token = bearer_token(request)
+        if token:
+            try:
+                request.jwt_claims = verifier.verify(token)
+            except InvalidToken:
+                return _unauthorized(request, 'Token tidak valid atau sudah kedaluwarsa')
+        elif require_token and request.path.rstrip('/') not in PUBLIC_PATHS:
+            return _unauthorized(request, 'Token wajib disertakan')
+
+        return handler(request)
+
+    return jwt_tween
+
+
+class JWTSecurityPolicy:
+    """request.identity = claims JWT yang sudah diverifikasi oleh tween."""
+
+    def identity(self, request):
+        return getattr(request, 'jwt_claims', None)
+
+    def authenticated_userid(self, request):
+        identity = self.identity(request)
+        return int(identity['sub']) if identity and 'sub' in identity else None
+
+    def permits(self, request, context, permission):
+        return Allowed('Belum ada ACL')
+
+    def remember(self, request, userid, **kw):
+        return []
+
+    def forget(self, request, **kw):
+        return []
@@ -0,0 +1,31 @@
+# =======================================================
+# ATURAN TRANSISI STATUS APPOINTMENT
+# =======================================================
+# Dipakai bersama oleh edit_appointment (satu item) dan endpoint bulk,
+# supaya aturan state machine hanya ditulis di satu tempat.
+
+VALID_STATUSES = ['pending', 'confirmed', 'completed', 'cancelled']
+
+
+def transition_error(current_status, new_status):
+    """Pesan error jika transisi current -> new tidak boleh, None jika boleh."""
+    # Validasi Input Status
+    if new_status not in VALID_STATUSES:
+        return f'Status tidak valid. Pilihan: {VALID_STATUSES}'
+
+    # Dokter MENERIMA
+    if new_status == 'confirmed':
+        if current_status != 'pending':
+            return 'Hanya janji temu "pending" yang bisa dikonfirmasi'
+
+    # Dokter MENOLAK / Membatalkan
+    elif new_status == 'cancelled':
+        if current_status == 'completed':
+            return 'Janji temu yang sudah selesai tidak bisa dibatalkan'
+
+    # Skenario: Dokter Menyelesaikan Tugas
+    elif new_status == 'completed':
+        if current_status != 'confirmed':
+            return 'Hanya janji temu yang sudah dikonfirmasi yang bisa diselesaikan'
+
+    return None
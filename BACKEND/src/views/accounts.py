@@ -1,6 +1,12 @@
 from pyramid.view import view_config, view_defaults
-from ..models import DBSession, User, Doctor
-import bcrypt
+from ..models import DBSession, User, Doctor, DoctorAvailabilityException
+from ..availability import (
+    parse_interval_json, parse_exception_json, parse_legacy_schedule,
+    replace_weekly, DEFAULT_SLOT_MINUTES
+)
+from ..tokens import bearer_token, InvalidToken
+from ..cache import get_user
+from ..conditional import etag_validator, latest, table_versions
 import transaction
 
 @view_defaults(renderer='json')
@@ -21,7 +27,7 @@ class AccountViews:
             self.request.response.status = 400
             return {'error': 'Parameter user_id wajib disertakan'}
 
-        user = DBSession.query(User).filter(User.id == int(user_id)).first()
+        user = get_user(DBSession, user_id)
 
         if not user:
             self.request.response.status = 404
@@ -33,7 +39,7 @@ class AccountViews:
             'name': user.name,
             'email': user.email,
             'role': user.role,
-            'created_at': str(user.created_at)
+            'created_at': user.created_at
         }
 
         #  tambahkan data spesialisasi & jadwal
@@ -60,22 +66,23 @@ class AccountViews:
             self.request.response.status = 400
             return {'error': 'Mohon isi user_id, password lama, dan password baru'}
 
-        user = DBSession.query(User).filter(User.id == user_id).first()
+        user = get_user(DBSession, user_id)
 
         if not user:
             self.request.response.status = 404
             return {'error': 'User tidak ditemukan'}
 
         # Verifikasi Password Lama
-        if not bcrypt.checkpw(old_password.encode('utf-8'), user.password.encode('utf-8')):
+        hasher = self.request.hasher
+        if not hasher.check(old_password, user.password):
             self.request.response.status = 401
             return {'error': 'Password lama salah'}
 
         # Hash Password Baru
-        hashed_new_pw = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
+        hashed_new_pw = hasher.hash(new_password)
         
         try:
-            user.password = hashed_new_pw.decode('utf-8')
+            user.password = hashed_new_pw
             # DBSession.flush() 
             return {'status': 'success', 'message': 'Password berhasil diubah'}
         except Exception as e:
@@ -85,18 +92,49 @@ class AccountViews:
     # =======================================================
     # 3. UBAH JADWAL PRAKTIK (SETTING DOKTER)
     # =======================================================
+    # Body: schedule (teks tampilan) dan/atau availability (terstruktur):
+    #   "availability": [{"weekday": 0, "start": "09:00", "end": "15:00", "slot_minutes": 30}]
+    #   "exceptions":   [{"date": "2025-12-25"}]  -> libur seharian
+    # Jika availability tidak dikirim, teks schedule di-parse otomatis; teks
+    # yang tidak bisa dibaca ditolak (400) supaya jam praktik lama tidak
+    # diam-diam tetap berlaku di bawah teks jadwal yang baru.
     @view_config(route_name='account_update_schedule', request_method='PUT')
     def update_schedule(self):
         data = self.request.json_body
         user_id = data.get('user_id')
         new_schedule = data.get('schedule') # misal: "Senin-Jumat, 09.00 - 15.00"
+        availability = data.get('availability')
+        exceptions = data.get('exceptions')
 
-        if not user_id or not new_schedule:
+        if not user_id or not (new_schedule or availability is not None):
             self.request.response.status = 400
-            return {'error': 'user_id dan schedule baru wajib diisi'}
+            return {'error': 'user_id dan schedule/availability baru wajib diisi'}
+
+        if availability is None:
+            try:
+                legacy = parse_legacy_schedule(new_schedule)
+            except ValueError as e:
+                self.request.response.status = 400
+                return {
+                    'error': 'Teks schedule tidak dikenali, kirim juga availability terstruktur',
+                    'details': str(e)
+                }
+
+        try:
+            if availability is not None:
+                intervals = [parse_interval_json(item) for item in availability]
+            else:
+                intervals = [
+                    {'weekday': day, 'start_time': start, 'end_time': end, 'slot_minutes': DEFAULT_SLOT_MINUTES}
+                    for day, start, end in legacy
+                ]
+            exception_rows = [parse_exception_json(item) for item in (exceptions or [])]
+        except (KeyError, TypeError, ValueError):
+            self.request.response.status = 400
+            return {'error': 'Format availability/exceptions salah. Gunakan weekday 0-6, jam HH:MM, tanggal YYYY-MM-DD'}
 
         # Cari user dan pastikan dia dokter
-        user = DBSession.query(User).filter(User.id == user_id).first()
+        user = get_user(DBSession, user_id)
 
         if not user:
             self.request.response.status = 404
@@ -108,8 +146,23 @@ class AccountViews:
         
         # Update Jadwal di tabel Doctors
         if user.doctor:
-            user.doctor.schedule = new_schedule
-            return {'status': 'success', 'message': 'Jadwal praktik berhasil diperbarui', 'schedule': new_schedule}
+            doctor = user.doctor
+            if new_schedule:
+                doctor.schedule = new_schedule
+            replace_weekly(doctor, intervals)
+            if exception_rows:
+                # Pengecualian di tanggal yang sama diganti
+                DBSession.query(DoctorAvailabilityException).filter(
+                    DoctorAvailabilityException.doctor_id == doctor.id,
+                    DoctorAvailabilityException.exception_date.in_({r['exception_date'] for r in exception_rows})
+                ).delete(synchronize_session=False)
+                DBSession.add_all([DoctorAvailabilityException(doctor_id=doctor.id, **r) for r in exception_rows])
+            return {
+                'status': 'success',
+                'message': 'Jadwal praktik berhasil diperbarui',
+                'schedule': doctor.schedule,
+                'availability': [a.to_json() for a in doctor.availability]
+            }
         else:
             self.request.response.status = 404
             return {'error': 'Data profil dokter belum lengkap'}
@@ -118,8 +171,28 @@ class AccountViews:
     # 4. LOGOUT
     # =======================================================
     # Cocok untuk: Pasien & Dokter
-    # jika nanti ingin menerapkan blacklist token atau session server-side.
+    # Token di header Authorization dimasukkan ke daftar revoke (in-memory)
+    # sehingga tidak bisa dipakai lagi sampai exp-nya habis.
     @view_config(route_name='account_logout', request_method='POST')
     def logout(self):
-        # Di masa depan: Masukkan token ke blacklist Redis/DB
-        return {'status': 'success', 'message': 'Logout berhasil. Silakan hapus token di sisi Client.'}
\ No newline at end of file
+        token = bearer_token(self.request)
+        if token:
+            try:
+                self.request.registry.tokens.revoke(token)
+            except InvalidToken:
+                pass
+        return {'status': 'success', 'message': 'Logout berhasil. Silakan hapus token di sisi Client.'}
+
+
+# ETag profil: diambil dari cache entitas, jadi validasi 304 tanpa query
+@etag_validator('account_profile')
+def profile_version(request):
+    try:
+        user = get_user(DBSession, request.params.get('user_id'))
+    except (TypeError, ValueError):
+        return None
+    if user is None:
+        return None
+    doctor_update = user.doctor.updated_at if user.doctor else None
+    version = table_versions.get(User.__tablename__, Doctor.__tablename__)
+    return (user.updated_at, doctor_update, version), latest(user.updated_at, doctor_update)
@@ -1,5 +1,16 @@
 from pyramid.view import view_config, view_defaults
 from ..models import DBSession, User, Doctor, Appointment as AppointmentModel 
+from ..pagination import InvalidCursor, paginate, parse_limit
+from ..queries import appointment_list_query, insert_appointment_if_free
+from ..streaming import stream_json_list
+from ..conditional import etag_validator, table_versions
+from ..transitions import transition_error
+from ..bulk import MAX_BULK_ITEMS, bulk_create, bulk_update
+from ..live import live_hub, publish_appointment, sse_response
+from ..counters import count_transition
+from ..partitions import RECORD_MOVE_ERROR, is_record_fk_violation
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, date, time
 import transaction
 
@@ -31,22 +42,37 @@ class AppointmentViews:
                 self.request.response.status = 400
                 return {'error': 'Tanggal dan waktu janji temu harus di masa depan'}
             
-            # Simpan ke DB dengan status awal 'pending'
-            new_appointment = AppointmentModel(
+            # Simpan ke DB dengan status awal 'pending'.
+            # ON CONFLICT DO NOTHING: slot yang sudah terisi -> tidak ada baris
+            # yang di-insert (id None), tanpa SELECT pengecekan terpisah.
+            appointment_id = insert_appointment_if_free(
+                DBSession,
                 patient_id=data['patient_id'],
                 doctor_id=data['doctor_id'],
                 appointment_date=date_obj,
                 appointment_time=time_obj,
                 status='pending' # Default status
             )
+
+            if appointment_id is None:
+                self.request.response.status = 409
+                return {'error': 'Slot jadwal dokter ini sudah dipesan. Silakan pilih jam lain.'}
             
-            DBSession.add(new_appointment)
-            DBSession.flush() 
-            
+            count_transition(DBSession, int(data['doctor_id']), int(data['patient_id']), None, 'pending')
+            # Dikirim ke subscriber live setelah commit
+            publish_appointment(DBSession, 'created', {
+                'id': appointment_id,
+                'doctor_id': int(data['doctor_id']),
+                'patient_id': int(data['patient_id']),
+                'status': 'pending',
+                'appointment_date': date_obj,
+                'appointment_time': time_obj
+            })
+
             return {
                 'status': 'success', 
                 'message': 'Janji temu berhasil dibuat', 
-                'appointment_id': new_appointment.id
+                'appointment_id': appointment_id
             }
             
         except ValueError:
@@ -68,8 +94,17 @@ class AppointmentViews:
             self.request.response.status = 400
             return {'error': 'appointment_id wajib disertakan'}
         
-        # Cari data appointment
-        appointment = DBSession.query(AppointmentModel).filter(AppointmentModel.id == appointment_id).first()
+        # Cari data appointment. current_date (opsional, tanggal appointment
+        # saat ini) membuat lookup hanya menyentuh satu partisi bulan
+        query = DBSession.query(AppointmentModel).filter(AppointmentModel.id == appointment_id)
+        if data.get('current_date'):
+            try:
+                current_date = datetime.strptime(data['current_date'], '%Y-%m-%d').date()
+            except (TypeError, ValueError):
+                self.request.response.status = 400
+                return {'error': 'Format tanggal/jam salah'}
+            query = query.filter(AppointmentModel.appointment_date == current_date)
+        appointment = query.first()
         if not appointment:
             self.request.response.status = 404
             return {'error': 'Janji temu tidak ditemukan'}
@@ -84,37 +119,20 @@ class AppointmentViews:
             # Update Status
             if 'status' in data:
                 new_status = data['status']
-                current_status = appointment.status
-                
-                valid_statuses = ['pending', 'confirmed', 'completed', 'cancelled']
-                
-                # Validasi Input Status
-                if new_status not in valid_statuses:
+                error = transition_error(appointment.status, new_status)
+                if error:
                     self.request.response.status = 400
-                    return {'error': f'Status tidak valid. Pilihan: {valid_statuses}'}
-
-                # Logika Transisi Status 
-                
-                # Dokter MENERIMA
-                if new_status == 'confirmed':
-                    if current_status != 'pending':
-                        self.request.response.status = 400
-                        return {'error': 'Hanya janji temu "pending" yang bisa dikonfirmasi'}
-                
-                # Dokter MENOLAK / Membatalkan
-                elif new_status == 'cancelled':
-                    if current_status == 'completed':
-                        self.request.response.status = 400
-                        return {'error': 'Janji temu yang sudah selesai tidak bisa dibatalkan'}
-                    
-                # Skenario: Dokter Menyelesaikan Tugas
-                elif new_status == 'completed':
-                    if current_status != 'confirmed':
-                        self.request.response.status = 400
-                        return {'error': 'Hanya janji temu yang sudah dikonfirmasi yang bisa diselesaikan'}
-
-                # Terapkan perubahan status
+                    return {'error': error}
+
+                # Terapkan perubahan status (counter dashboard ikut di transaksi ini)
+                count_transition(DBSession, appointment.doctor_id, appointment.patient_id,
+                                 appointment.status, new_status)
                 appointment.status = new_status
+
+            # Reschedule / aktif lagi bisa bentrok dengan slot appointment lain
+            # (partial unique index) -> dicek saat flush
+            DBSession.flush()
+            publish_appointment(DBSession, 'updated', appointment)
             
             return {
                 'status': 'success', 
@@ -122,68 +140,180 @@ class AppointmentViews:
                 'data': {
                     'id': appointment.id,
                     'status': appointment.status,
-                    'date': str(appointment.appointment_date),
-                    'time': str(appointment.appointment_time)
+                    'date': appointment.appointment_date,
+                    'time': appointment.appointment_time
                 }
             }
 
         except ValueError:
              self.request.response.status = 400
              return {'error': 'Format tanggal/jam salah'}
+        except IntegrityError as e:
+            self.request.tm.doom()
+            self.request.response.status = 409
+            if is_record_fk_violation(e):
+                return {'error': RECORD_MOVE_ERROR}
+            return {'error': 'Slot jadwal dokter ini sudah dipesan. Silakan pilih jam lain.'}
+
+    # ---------------------------------------------------------
+    # LIVE SYNC (Server-Sent Events)
+    # ---------------------------------------------------------
+    # ?doctor_id= dan/atau ?patient_id= -> event "appointment" setiap ada
+    # appointment dibuat, berubah status/jadwal, atau selesai diperiksa.
+    # Event "resync" -> muat ulang list lewat filter-appointments (live.py)
+    @view_config(route_name='stream-appointments', request_method='GET')
+    def stream_appointments(self):
+        try:
+            filters = filter_params(self.request.params)
+        except ValueError:
+            self.request.response.status = 400
+            return {'error': 'ID harus berupa angka'}
+        if filters['doctor_id'] is None and filters['patient_id'] is None:
+            self.request.response.status = 400
+            return {'error': 'doctor_id atau patient_id wajib disertakan'}
+
+        subscription = live_hub.subscribe(doctor_id=filters['doctor_id'], patient_id=filters['patient_id'])
+        return sse_response(subscription)
+
+    # ---------------------------------------------------------
+    # BULK CREATE / UPDATE (Front-desk)
+    # ---------------------------------------------------------
+    # Body: {"appointments": [ {...}, {...} ]} -- isi tiap item sama dengan
+    # create-appointment / edit-appointment. Hasil per item ada di "results"
+    # (urutan sama dengan input); item yang gagal tidak membatalkan item lain.
+    def _bulk_items(self):
+        try:
+            items = self.request.json_body.get('appointments')
+        except (ValueError, AttributeError):
+            items = None
+        if not isinstance(items, list) or not items:
+            return None, {'error': 'Body wajib berisi list "appointments"'}
+        if len(items) > MAX_BULK_ITEMS:
+            return None, {'error': f'Maksimal {MAX_BULK_ITEMS} item per request'}
+        return items, None
+
+    def _bulk_response(self, results):
+        succeeded = sum(1 for r in results if r['status'] == 'success')
+        return {
+            'status': 'success' if succeeded == len(results) else 'partial',
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results
+        }
+
+    @view_config(route_name='bulk-appointments', request_method='POST')
+    def bulk_create_appointments(self):
+        items, error = self._bulk_items()
+        if error:
+            self.request.response.status = 400
+            return error
+        return self._bulk_response(bulk_create(DBSession, items))
+
+    @view_config(route_name='bulk-appointments', request_method='PUT')
+    def bulk_update_appointments(self):
+        items, error = self._bulk_items()
+        if error:
+            self.request.response.status = 400
+            return error
+        try:
+            results = bulk_update(DBSession, items)
+        except IntegrityError as e:
+            self.request.tm.doom()
+            self.request.response.status = 409
+            if is_record_fk_violation(e):
+                return {'error': RECORD_MOVE_ERROR}
+            # Slot direbut request lain di antara pengecekan dan UPDATE
+            return {'error': 'Sebagian slot baru saja dipesan. Silakan ulangi.'}
+        return self._bulk_response(results)
 
    # ---------------------------------------------------------
+    # LIST HELPER (Pagination / Streaming)
+    # ---------------------------------------------------------
+    # Mode response ditentukan query params:
+    # - ?stream=true       -> JSON array ditulis bertahap (yield_per), memori datar
+    # - ?limit=&after=     -> keyset pagination, response menyertakan next_cursor
+    # - tanpa keduanya     -> perilaku lama (seluruh list sekaligus)
+    def _render_list(self, query, sort):
+        params = self.request.params
+        after = params.get('after')
+        try:
+            if params.get('stream') == 'true':
+                if after:
+                    query = sort.apply_after(query, sort.decode(after))
+                query = query.order_by(*sort.order_by())
+                if params.get('limit'):
+                    query = query.limit(parse_limit(params, maximum=None))
+                return stream_json_list(query, 'appointments')
+
+            if 'limit' in params or after:
+                appointments, next_cursor = paginate(query, sort, after=after, limit=parse_limit(params))
+                return {
+                    'appointments': [appt.to_json() for appt in appointments],
+                    'next_cursor': next_cursor
+                }
+        except InvalidCursor:
+            self.request.response.status = 400
+            return {'error': 'Parameter after (cursor) tidak valid'}
+        except ValueError:
+            self.request.response.status = 400
+            return {'error': 'Parameter limit harus berupa angka positif'}
+
+        appointments = query.order_by(*sort.order_by()).all()
+        return {'appointments': [appt.to_json() for appt in appointments]}
+
+    # ---------------------------------------------------------
     # SHOW ALL APPOINTMENTS
     # ---------------------------------------------------------
     @view_config(route_name="show-appointments", request_method='GET')
     def show_appointments(self):
-        appointments = DBSession.query(AppointmentModel).all()
-        return {'appointments': [appt.to_json() for appt in appointments]}
+        query, sort = appointment_list_query(DBSession)
+        return self._render_list(query, sort)
     
     # ---------------------------------------------------------
     # FILTER APPOINTMENTS
     # ---------------------------------------------------------
     @view_config(route_name="filter-appointments", request_method='GET')
     def filter_appointments(self):
-        request_params = self.request.params
-        doctor_id = request_params.get('doctor_id')
-        patient_id = request_params.get('patient_id')
-        status = request_params.get('status')
-        
-        # Parameter baru: 'upcoming'
-        is_upcoming = request_params.get('upcoming')
-        
-        query = DBSession.query(AppointmentModel)
-        
         try:
-            # Filter User ID
-            if doctor_id:
-                query = query.filter(AppointmentModel.doctor_id == int(doctor_id))
-            if patient_id:
-                query = query.filter(AppointmentModel.patient_id == int(patient_id))
-            
-            # Filter Status
-            if status:
-                query = query.filter(AppointmentModel.status == status)
-            
-            # FITUR BARU: Filter Upcoming
-            if is_upcoming == 'true':
-                today = date.today()
-                # Ambil yang tanggalnya >= hari ini
-                query = query.filter(AppointmentModel.appointment_date >= today)
-                # PENTING: Urutkan dari tanggal terdekat, lalu jam terdekat
-                query = query.order_by(
-                    AppointmentModel.appointment_date.asc(), 
-                    AppointmentModel.appointment_time.asc()
-                )
-            else:
-                # Default: Urutkan dari yang terbaru dibuat
-                query = query.order_by(AppointmentModel.created_at.desc())
-
-            appointments = query.all()
-            
-            # Convert ke JSON
-            return {'appointments': [appt.to_json() for appt in appointments]}
-            
+            filters = filter_params(self.request.params)
         except ValueError:
             self.request.response.status = 400
-            return {'error': 'ID harus berupa angka'}
\ No newline at end of file
+            return {'error': 'ID harus berupa angka'}
+
+        query, sort = appointment_list_query(DBSession, **filters)
+        return self._render_list(query, sort)
+
+
+def filter_params(request_params):
+    """Query params filter -> kwargs appointment_list_query (ValueError jika ID bukan angka)."""
+    doctor_id = request_params.get('doctor_id')
+    patient_id = request_params.get('patient_id')
+
+    # Parameter baru: 'upcoming'
+    # Ambil yang tanggalnya >= hari ini, urut dari tanggal & jam terdekat.
+    # Default: urutkan dari yang terbaru dibuat.
+    is_upcoming = request_params.get('upcoming')
+
+    return {
+        'doctor_id': int(doctor_id) if doctor_id else None,
+        'patient_id': int(patient_id) if patient_id else None,
+        'status': request_params.get('status'),
+        'upcoming_from': date.today() if is_upcoming == 'true' else None,
+    }
+
+
+# ETag filter: jumlah baris + updated_at terbaru di scope filter yang sama,
+# ditambah versi tabel (tulis yang tidak menggeser MAX(updated_at))
+@etag_validator('filter-appointments')
+def filter_appointments_version(request):
+    try:
+        filters = filter_params(request.params)
+    except ValueError:
+        return None
+    query, _ = appointment_list_query(DBSession, **filters)
+    count, last_update = query.with_entities(
+        func.count(AppointmentModel.id),
+        func.max(AppointmentModel.updated_at)
+    ).one()
+    version = table_versions.get(AppointmentModel.__tablename__)
+    return (count, last_update, filters['upcoming_from'], version), last_update
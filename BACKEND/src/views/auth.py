@@ -1,6 +1,7 @@
 from pyramid.view import view_config, view_defaults
 from ..models import DBSession, User, Doctor 
-import bcrypt
+from ..access import ADMIN_ROLE
+from sqlalchemy.orm import joinedload
 import transaction
 import os 
 import jwt
@@ -28,6 +29,11 @@ class AuthViews:
             self.request.response.status = 400
             return {'error': 'Data tidak lengkap. Wajib: name, email, password, role'}
 
+        # Role admin (akses export massal) hanya lewat command grant_admin
+        if data['role'] == ADMIN_ROLE:
+            self.request.response.status = 403
+            return {'error': 'Role admin tidak bisa didaftarkan lewat API'}
+
         # 2. Cek Email Duplikat
         email_input = data['email']
         existing_user = DBSession.query(User).filter(User.email == email_input).first()
@@ -36,15 +42,15 @@ class AuthViews:
             self.request.response.status = 409 
             return {'error': 'Email sudah terpakai'}
         
-        # 3. Hash Password
-        hashed_pw = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt())
+        # 3. Hash Password (di executor hashing, bukan di thread request)
+        hashed_pw = self.request.hasher.hash(data['password'])
 
         try:
             # 4. Simpan User
             new_user = User(
                 name=data['name'],
                 email=data['email'],
-                password=hashed_pw.decode('utf-8'),
+                password=hashed_pw,
                 role=data['role'] 
             )
             DBSession.add(new_user)
@@ -85,9 +91,16 @@ class AuthViews:
         email = data.get('email')
         password = data.get('password')
 
-        user = DBSession.query(User).filter(User.email == email).first()
+        # joinedload: user.doctor ikut dalam satu query (tanpa lazy-load kedua)
+        user = DBSession.query(User).options(joinedload(User.doctor))\
+            .filter(User.email == email).first()
+
+        hasher = self.request.hasher
+        if user and hasher.check(password, user.password):
 
-        if user and bcrypt.checkpw(password.encode('utf-8'), user.password.encode('utf-8')):
+            # Rehash transparan jika cost factor di DB berbeda dari setting
+            if hasher.needs_rehash(user.password):
+                user.password = hasher.hash(password)
             
             # Secret Key
             secret_key = os.getenv("JWT")
@@ -100,7 +113,7 @@ class AuthViews:
 
             # 3. Siapkan Isi Tiket (Payload)
             payload = {
-                'sub': user.id,          # Subject (ID User)
+                'sub': str(user.id),     # Subject (ID User), wajib string (RFC 7519)
                 'name': user.name,       # Info tambahan (opsional)
                 'role': user.role,       # Info role (penting buat frontend)
                 'exp': expiration_time,  # Kapan tiket hangus
@@ -135,4 +148,4 @@ class AuthViews:
         
         else:
             self.request.response.status = 401
-            return {'error': 'Email atau Password Salah'}
\ No newline at end of file
+            return {'error': 'Email atau Password Salah'}
\ No newline at end of file
@@ -1,5 +1,11 @@
 from pyramid.view import view_config, view_defaults
-from ..models import DBSession, Doctor, User
+from ..models import DBSession, Doctor
+from ..conditional import etag_validator
+from ..directory import doctor_directory
+from ..doctor_queue import doctor_queue
+from ..pagination import parse_limit
+from ..availability import free_slots, format_slots, MAX_RANGE_DAYS
+from datetime import datetime, date, timedelta
 
 @view_defaults(renderer='json')
 class DoctorViews:
@@ -7,17 +13,90 @@ class DoctorViews:
         self.request = request
 
     # Endpoint: /api/doctors
+    # Tanpa parameter: list seluruh dokter (format lama).
+    # Dengan ?specialization=, ?q= (prefix nama), ?limit=, ?after= :
+    # {doctors, total, facets, next_cursor} dari index in-memory.
     @view_config(route_name='get_doctors', request_method='GET')
     def get_doctors(self):
-        doctors = DBSession.query(Doctor).join(User).all()
-        
-        results = []
-        for doc in doctors:
-            results.append({
-                "id": doc.id,             # ID Dokter 
-                "name": doc.user.name,    # Nama 
-                "specialization": doc.specialization,
-                "schedule": doc.schedule
-            })
-        
-        return results
\ No newline at end of file
+        params = self.request.params
+        if not any(k in params for k in ('specialization', 'q', 'limit', 'after')):
+            return doctor_directory.all()
+
+        try:
+            limit = parse_limit(params)
+            after = int(params['after']) if params.get('after') else None
+        except ValueError:
+            self.request.response.status = 400
+            return {'error': 'Parameter limit/after harus berupa angka'}
+
+        result = doctor_directory.search(
+            specialization=params.get('specialization') or None,
+            q=params.get('q', '').strip() or None,
+            after=after,
+            limit=limit
+        )
+        return result
+
+    # Endpoint: /api/doctors/{id}/slots?from=YYYY-MM-DD&to=YYYY-MM-DD
+    # Slot kosong = jam praktik terstruktur - appointment yang belum dibatalkan
+    # Dibaca dari primary: dipakai tepat sebelum booking, slot yang baru
+    # diambil pasien lain tidak boleh masih tampak kosong karena lag replica
+    @view_config(route_name='doctor_slots', request_method='GET', db='primary')
+    def get_slots(self):
+        params = self.request.params
+        try:
+            doctor_id = int(self.request.matchdict['id'])
+            start_date = datetime.strptime(params['from'], '%Y-%m-%d').date() if params.get('from') else date.today()
+            end_date = datetime.strptime(params['to'], '%Y-%m-%d').date() if params.get('to') else start_date + timedelta(days=6)
+        except ValueError:
+            self.request.response.status = 400
+            return {'error': 'Format salah. Gunakan id angka dan tanggal YYYY-MM-DD'}
+
+        if end_date < start_date or (end_date - start_date).days >= MAX_RANGE_DAYS:
+            self.request.response.status = 400
+            return {'error': f'Rentang tanggal tidak valid (maksimal {MAX_RANGE_DAYS} hari)'}
+
+        if not DBSession.query(Doctor.id).filter(Doctor.id == doctor_id).first():
+            self.request.response.status = 404
+            return {'error': 'Dokter tidak ditemukan'}
+
+        slots = free_slots(DBSession, doctor_id, start_date, end_date)
+        return {
+            'status': 'success',
+            'doctor_id': doctor_id,
+            'from': start_date,
+            'to': end_date,
+            'slots': format_slots(slots)
+        }
+
+    # Endpoint: /api/doctors/{id}/queue
+    # Antrian hari ini (pending & confirmed, urut jam) dari struktur in-memory
+    # yang diperbarui setiap commit appointment (doctor_queue.py), tanpa query
+    @view_config(route_name='doctor_queue', request_method='GET')
+    def get_queue(self):
+        try:
+            doctor_id = int(self.request.matchdict['id'])
+        except ValueError:
+            self.request.response.status = 400
+            return {'error': 'ID harus berupa angka'}
+
+        if doctor_directory.get(doctor_id) is None:
+            self.request.response.status = 404
+            return {'error': 'Dokter tidak ditemukan'}
+
+        day, appointments = doctor_queue.get(doctor_id)
+        return {
+            'status': 'success',
+            'doctor_id': doctor_id,
+            'date': day,
+            'total': len(appointments),
+            'appointments': appointments
+        }
+
+
+# ETag daftar dokter: digest snapshot index direktori yang juga dipakai untuk
+# body-nya (bukan query ke database, yang bisa lebih baru dari index)
+@etag_validator('get_doctors')
+def doctors_version(request):
+    digest, last_modified = doctor_directory.version()
+    return (digest,), last_modified
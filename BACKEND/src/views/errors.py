@@ -0,0 +1,42 @@
+import math
+
+from pyramid.view import view_config
+from sqlalchemy.exc import TimeoutError as PoolTimeout
+from ..hashing import HashingBusy
+from ..live import TooManySubscribers
+from ..ratelimit import RateLimited
+
+# =======================================================
+# EXCEPTION VIEWS (Overload -> respon cepat)
+# =======================================================
+
+# Antrian bcrypt penuh: tolak cepat daripada menahan thread Waitress
+@view_config(context=HashingBusy, renderer='json')
+def hashing_busy(exc, request):
+    request.response.status = 503
+    request.response.headers['Retry-After'] = '1'
+    return {'error': 'Server sedang sibuk, silakan coba lagi sebentar lagi'}
+
+
+# Semua koneksi database sedang dipakai lebih lama dari sqlalchemy.pool_timeout
+@view_config(context=PoolTimeout, renderer='json')
+def pool_timeout(exc, request):
+    request.response.status = 503
+    request.response.headers['Retry-After'] = '1'
+    return {'error': 'Server sedang sibuk, silakan coba lagi sebentar lagi'}
+
+
+# Koneksi SSE per proses sudah mencapai live.max_subscribers
+@view_config(context=TooManySubscribers, renderer='json')
+def too_many_subscribers(exc, request):
+    request.response.status = 503
+    request.response.headers['Retry-After'] = '5'
+    return {'error': 'Terlalu banyak koneksi live, silakan coba lagi sebentar lagi'}
+
+
+# Rate limit / batas konkurensi endpoint auth (ratelimit.py)
+@view_config(context=RateLimited, renderer='json')
+def rate_limited(exc, request):
+    request.response.status = 429
+    request.response.headers['Retry-After'] = str(max(1, math.ceil(exc.retry_after)))
+    return {'error': 'Terlalu banyak percobaan, silakan coba lagi nanti'}
@@ -0,0 +1,60 @@
+from pyramid.view import view_config, view_defaults
+from ..models import DBSession
+from ..export import FORMATS, stream_export
+from ..queries import appointment_export_query, medical_record_export_query
+from datetime import date
+
+@view_defaults(renderer='json')
+class ExportViews:
+    def __init__(self, request):
+        self.request = request
+
+    # =======================================================
+    # EXPORT MASSAL (ADMIN / ASURANSI)
+    # =======================================================
+    # ?format=csv|ndjson&from=YYYY-MM-DD&to=YYYY-MM-DD&doctor_id=&patient_id=
+    # Semua filter opsional. Baris ditulis bertahap dari server-side cursor
+    # (lihat export.py), gzip jika client mengirim Accept-Encoding: gzip.
+    def _params(self):
+        params = self.request.params
+        fmt = params.get('format', 'csv')
+        if fmt not in FORMATS:
+            raise ValueError(f'format harus salah satu dari: {", ".join(FORMATS)}')
+        try:
+            filters = {
+                'date_from': date.fromisoformat(params['from']) if params.get('from') else None,
+                'date_to': date.fromisoformat(params['to']) if params.get('to') else None,
+                'doctor_id': int(params['doctor_id']) if params.get('doctor_id') else None,
+                'patient_id': int(params['patient_id']) if params.get('patient_id') else None,
+            }
+        except ValueError:
+            raise ValueError('doctor_id/patient_id harus angka, from/to format YYYY-MM-DD')
+        return fmt, filters
+
+    def _filename(self, name, filters):
+        parts = [name]
+        if filters['date_from'] or filters['date_to']:
+            parts.append(f"{filters['date_from'] or ''}_{filters['date_to'] or ''}")
+        return '-'.join(parts)
+
+    @view_config(route_name='export_appointments', request_method='GET')
+    def export_appointments(self):
+        try:
+            fmt, filters = self._params()
+        except ValueError as e:
+            self.request.response.status = 400
+            return {'error': str(e)}
+
+        query = appointment_export_query(DBSession, status=self.request.params.get('status'), **filters)
+        return stream_export(self.request, query, fmt, self._filename('appointments', filters))
+
+    @view_config(route_name='export_medical_records', request_method='GET')
+    def export_medical_records(self):
+        try:
+            fmt, filters = self._params()
+        except ValueError as e:
+            self.request.response.status = 400
+            return {'error': str(e)}
+
+        query = medical_record_export_query(DBSession, **filters)
+        return stream_export(self.request, query, fmt, self._filename('medical-records', filters))
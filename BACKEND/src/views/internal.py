@@ -0,0 +1,56 @@
+from pyramid.response import Response
+from pyramid.view import view_config, view_defaults
+from ..cache import entity_cache
+from ..doctor_queue import doctor_queue
+from ..live import live_hub
+from ..metrics import render_prometheus, request_metrics
+from ..models import DBSession
+from ..pool import pool_stats as engine_pool_stats
+from ..replicas import replica_router
+
+@view_defaults(renderer='json')
+class InternalViews:
+    def __init__(self, request):
+        self.request = request
+
+    # =======================================================
+    # STATISTIK CACHE ENTITAS (untuk tuning cache.ttl / cache.max_size)
+    # =======================================================
+    @view_config(route_name='cache_stats', request_method='GET')
+    def cache_stats(self):
+        return {
+            'status': 'success',
+            'data': entity_cache.stats(),
+            # Antrian hari ini per dokter (in-memory)
+            'doctor_queue': doctor_queue.stats()
+        }
+
+    # =======================================================
+    # STATISTIK CONNECTION POOL (untuk tuning sqlalchemy.pool_size dkk)
+    # =======================================================
+    @view_config(route_name='pool_stats', request_method='GET')
+    def pool_stats(self):
+        limiter = self.request.registry.auth_limiter
+        return {
+            'status': 'success',
+            'data': engine_pool_stats(DBSession.get_bind()),
+            # Status & jumlah pembacaan tiap read replica (kosong jika tidak dipakai)
+            'replicas': replica_router.stats(),
+            # Koneksi SSE live sync & listener LISTEN/NOTIFY proses ini
+            'live': live_hub.stats(),
+            # Query paling lambat per route (teks SQL; metriknya di /api/_metrics)
+            'slowest_queries': request_metrics.slowest_queries(),
+            # Rate limit endpoint auth (None jika ratelimit.enabled = false)
+            'auth_limiter': limiter.stats() if limiter is not None else None
+        }
+
+    # =======================================================
+    # METRIK PROMETHEUS (latensi & biaya SQL per route, pool)
+    # =======================================================
+    @view_config(route_name='metrics', request_method='GET')
+    def metrics(self):
+        body = render_prometheus(pool=engine_pool_stats(DBSession.get_bind()))
+        response = Response(body, content_type='text/plain', charset='utf-8')
+        response.content_type_params = {'version': '0.0.4', 'charset': 'utf-8'}
+        response.cache_control = 'no-store'
+        return response
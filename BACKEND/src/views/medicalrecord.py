@@ -1,5 +1,13 @@
 from pyramid.view import view_config, view_defaults
-from ..models import DBSession, MedicalRecord, Appointment
+from ..models import DBSession, MedicalRecord, Appointment, Doctor, User
+from ..conditional import etag_validator, latest, table_versions
+from ..pagination import InvalidCursor, paginate, parse_limit
+from ..queries import patient_history_query, record_sources
+from ..search import MAX_SEARCH_LIMIT, search_medical_records
+from ..live import publish_appointment
+from ..counters import count_transition
+from sqlalchemy import func
+from datetime import date
 import transaction
 
 @view_defaults(renderer='json')
@@ -18,8 +26,9 @@ class MedicalRecordViews:
             self.request.response.status = 400
             return {'error': 'appointment_id wajib disertakan'}
 
-        # Cari data rekam medis berdasarkan ID janji temu
-        record = DBSession.query(MedicalRecord).filter(MedicalRecord.appointment_id == appointment_id).first()
+        # Cari data rekam medis berdasarkan ID janji temu (termasuk arsip)
+        records, _ = record_sources(DBSession)
+        record = DBSession.query(records).filter(records.appointment_id == appointment_id).first()
 
         if not record:
             self.request.response.status = 404
@@ -33,7 +42,7 @@ class MedicalRecordViews:
                 'appointment_id': record.appointment_id,
                 'diagnosis': record.diagnosis,
                 'notes': record.notes,
-                'created_at': str(record.created_at)
+                'created_at': record.created_at
             }
         }
 
@@ -48,23 +57,103 @@ class MedicalRecordViews:
             self.request.response.status = 400
             return {'error': 'patient_id wajib disertakan'}
         
-        # Join tabel Appointment untuk filter berdasarkan patient_id
-        records = DBSession.query(MedicalRecord)\
-            .join(Appointment, MedicalRecord.appointment_id == Appointment.id)\
-            .filter(Appointment.patient_id == patient_id)\
-            .all()
-            
+        # Rentang tanggal kunjungan opsional (?from=YYYY-MM-DD&to=YYYY-MM-DD)
+        try:
+            patient_id = int(patient_id)
+            date_from = date.fromisoformat(self.request.params['from']) if self.request.params.get('from') else None
+            date_to = date.fromisoformat(self.request.params['to']) if self.request.params.get('to') else None
+        except ValueError:
+            self.request.response.status = 400
+            return {'error': 'patient_id harus angka, from/to format YYYY-MM-DD'}
+
+        # Satu query berproyeksi (rekam medis + tanggal kunjungan + dokter),
+        # urut kunjungan terbaru dulu
+        query, sort = patient_history_query(DBSession, patient_id, date_from, date_to)
+
+        params = self.request.params
+        paginated = 'limit' in params or bool(params.get('after'))
+        next_cursor = None
+        try:
+            if paginated:
+                records, next_cursor = paginate(query, sort, after=params.get('after'), limit=parse_limit(params))
+            else:
+                records = query.order_by(*sort.order_by()).all()
+        except InvalidCursor:
+            self.request.response.status = 400
+            return {'error': 'Parameter after (cursor) tidak valid'}
+        except ValueError:
+            self.request.response.status = 400
+            return {'error': 'Parameter limit harus berupa angka positif'}
+
         result = []
         for r in records:
             result.append({
                 'id': r.id,
                 'appointment_id': r.appointment_id,
-                'appointment_date': str(r.appointment.appointment_date), # Info tambahan tanggal
+                'appointment_date': r.appointment_date, # Info tambahan tanggal
+                'appointment_time': r.appointment_time,
+                'doctor_id': r.doctor_id,
+                'doctor_name': r.doctor_name,
+                'specialization': r.specialization,
                 'diagnosis': r.diagnosis,
-                'notes': r.notes
+                'notes': r.notes,
+                'created_at': r.created_at
             })
-            
-        return {'status': 'success', 'data': result}
+
+        response = {'status': 'success', 'data': result}
+        if paginated:
+            response['next_cursor'] = next_cursor
+        return response
+
+    # =======================================================
+    # 2b. CARI REKAM MEDIS (FULL-TEXT, KHUSUS DOKTER)
+    # =======================================================
+    # ?q=demam berdarah&doctor_id=&from=YYYY-MM-DD&to=YYYY-MM-DD&limit=&offset=
+    @view_config(route_name='search_medical_records', request_method='GET')
+    def search_medical_records(self):
+        params = self.request.params
+        q = (params.get('q') or '').strip()
+        if not q:
+            self.request.response.status = 400
+            return {'error': 'Parameter q wajib diisi'}
+
+        try:
+            doctor_id = int(params['doctor_id']) if params.get('doctor_id') else None
+            date_from = date.fromisoformat(params['from']) if params.get('from') else None
+            date_to = date.fromisoformat(params['to']) if params.get('to') else None
+            limit = parse_limit(params, default=20, maximum=MAX_SEARCH_LIMIT)
+            offset = int(params.get('offset') or 0)
+            if offset < 0:
+                raise ValueError(offset)
+        except ValueError:
+            self.request.response.status = 400
+            return {'error': 'doctor_id/limit/offset harus angka, from/to format YYYY-MM-DD'}
+
+        rows, has_more = search_medical_records(
+            DBSession, q, doctor_id=doctor_id, date_from=date_from, date_to=date_to,
+            limit=limit, offset=offset
+        )
+
+        result = []
+        for r in rows:
+            result.append({
+                'id': r['id'],
+                'appointment_id': r['appointment_id'],
+                'appointment_date': r['appointment_date'],
+                'patient_id': r['patient_id'],
+                'patient_name': r['patient_name'],
+                'doctor_id': r['doctor_id'],
+                'doctor_name': r['doctor_name'],
+                'diagnosis': r['diagnosis'],
+                'notes': r['notes'],
+                'score': round(float(r['score']), 4)
+            })
+
+        return {
+            'status': 'success',
+            'data': result,
+            'next_offset': offset + limit if has_more else None
+        }
 
     # =======================================================
     # 3. BUAT REKAM MEDIS (KHUSUS DOKTER)
@@ -78,8 +167,16 @@ class MedicalRecordViews:
             self.request.response.status = 400
             return {'error': 'appointment_id dan diagnosis wajib diisi'}
 
-        # Cek apakah appointment ada?
-        appt = DBSession.query(Appointment).filter(Appointment.id == data['appointment_id']).first()
+        # Cek apakah appointment ada? appointment_date (opsional) membuat
+        # lookup hanya menyentuh satu partisi bulan
+        query = DBSession.query(Appointment).filter(Appointment.id == data['appointment_id'])
+        if data.get('appointment_date'):
+            try:
+                query = query.filter(Appointment.appointment_date == date.fromisoformat(data['appointment_date']))
+            except (TypeError, ValueError):
+                self.request.response.status = 400
+                return {'error': 'appointment_date harus format YYYY-MM-DD'}
+        appt = query.first()
         if not appt:
             self.request.response.status = 404
             return {'error': 'Appointment tidak ditemukan'}
@@ -93,17 +190,43 @@ class MedicalRecordViews:
         try:
             new_record = MedicalRecord(
                 appointment_id=data['appointment_id'],
+                appointment_date=appt.appointment_date,  # bagian foreign key (tabel partisi)
                 diagnosis=data['diagnosis'],
                 notes=data.get('notes', '-') # Opsional
             )
             DBSession.add(new_record)
             
             # Update status appointment jadi 'completed' otomatis
+            count_transition(DBSession, appt.doctor_id, appt.patient_id, appt.status, 'completed')
             appt.status = 'completed'
             
             DBSession.flush()
+            publish_appointment(DBSession, 'medical_record', appt, medical_record_id=new_record.id)
             return {'status': 'success', 'message': 'Rekam medis berhasil dibuat', 'id': new_record.id}
             
         except Exception as e:
             self.request.response.status = 500
-            return {'error': 'Gagal menyimpan data', 'details': str(e)}
\ No newline at end of file
+            return {'error': 'Gagal menyimpan data', 'details': str(e)}
+
+
+# ETag riwayat: jumlah rekam medis + updated_at terbaru (rekam medis & appointment)
+# + versi tabel yang ikut ditampilkan (nama & spesialisasi dokter)
+@etag_validator('get_patient_history')
+def patient_history_version(request):
+    try:
+        patient_id = int(request.params.get('patient_id'))
+    except (TypeError, ValueError):
+        return None
+    records, appointments = record_sources(DBSession)
+    count, record_update, appointment_update = DBSession.query(
+        func.count(records.id),
+        func.max(records.updated_at),
+        func.max(appointments.updated_at)
+    ).select_from(records)\
+        .join(appointments, (records.appointment_id == appointments.id)
+              & (records.appointment_date == appointments.appointment_date))\
+        .filter(appointments.patient_id == patient_id)\
+        .one()
+    version = table_versions.get(MedicalRecord.__tablename__, Appointment.__tablename__,
+                                 Doctor.__tablename__, User.__tablename__)
+    return (count, record_update, appointment_update, version), latest(record_update, appointment_update)
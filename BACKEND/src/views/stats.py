@@ -0,0 +1,57 @@
+from pyramid.view import view_config, view_defaults
+from ..models import DBSession
+from ..cache import get_user
+from ..counters import STATUSES, get_counts_and_next
+from ..directory import doctor_directory
+from datetime import date
+
+@view_defaults(renderer='json')
+class StatsViews:
+    def __init__(self, request):
+        self.request = request
+
+    # =======================================================
+    # STATISTIK DASHBOARD (counter per status + kunjungan terdekat)
+    # =======================================================
+    # Counter (appointment_counters, lookup primary key, lihat counters.py) dan
+    # kunjungan terdekat (satu baris lewat index jadwal) dibaca dalam SATU
+    # query. Pemilik hanya dicek jika belum punya baris counter: dokter dari
+    # index direktori (in-memory), pasien dari cache entitas.
+    def _stats(self, owner_type, owner_id, exists):
+        counts, upcoming = get_counts_and_next(DBSession, owner_type, owner_id, date.today())
+        if counts is None:
+            if not exists(owner_id):
+                self.request.response.status = 404
+                return {'error': 'Dokter tidak ditemukan' if owner_type == 'doctor' else 'Pasien tidak ditemukan'}
+            counts = dict.fromkeys(STATUSES, 0)
+        return {
+            'status': 'success',
+            'data': {
+                f'{owner_type}_id': owner_id,
+                'counts': counts,
+                'total': sum(counts.values()),
+                'next_appointment': upcoming.to_json() if upcoming else None
+            }
+        }
+
+    def _owner_id(self):
+        try:
+            return int(self.request.matchdict['id'])
+        except ValueError:
+            return None
+
+    @view_config(route_name='doctor_stats', request_method='GET')
+    def doctor_stats(self):
+        doctor_id = self._owner_id()
+        if doctor_id is None:
+            self.request.response.status = 400
+            return {'error': 'ID harus berupa angka'}
+        return self._stats('doctor', doctor_id, lambda id_: doctor_directory.get(id_) is not None)
+
+    @view_config(route_name='patient_stats', request_method='GET')
+    def patient_stats(self):
+        patient_id = self._owner_id()
+        if patient_id is None:
+            self.request.response.status = 400
+            return {'error': 'ID harus berupa angka'}
+        return self._stats('patient', patient_id, lambda id_: get_user(DBSession, id_) is not None)
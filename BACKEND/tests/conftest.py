@@ -0,0 +1,101 @@
+import os
+
+import pytest
+import transaction
+from sqlalchemy import create_engine
+from webtest import TestApp
+
+# Secret JWT test (login & verifikasi token); .env tidak menimpanya
+os.environ.setdefault('JWT', 'test-secret-' + 'x' * 32)
+
+from src import main
+from src.models import Base, DBSession, Doctor, User
+from src.scripts.grant_admin import main as grant_admin
+
+# Fixture query_counter / query_budget (src/testing.py)
+pytest_plugins = ['src.testing']
+
+# Setting aplikasi untuk test: SQLite file sementara, bcrypt ringan di
+# thread, tanpa rate limit (test login berulang dari IP yang sama)
+TEST_SETTINGS = {
+    'db.url_from_env': 'false',
+    'hashing.executor': 'thread',
+    'hashing.rounds': '4',
+    'ratelimit.enabled': 'false',
+    'query_budget.enabled': 'false',
+}
+
+
+@pytest.fixture
+def db_url(tmp_path):
+    return f'sqlite:///{tmp_path / "test.sqlite"}'
+
+
+@pytest.fixture
+def engine(db_url):
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def clinic(engine):
+    """Satu dokter (id dokter & user) dan satu pasien, dibuat sebelum aplikasi start."""
+    DBSession.configure(bind=engine)
+    with transaction.manager:
+        doctor_user = User(name='Dr. Budi', email='budi@test.local', password='x', role='doctor')
+        patient = User(name='Andi', email='andi@test.local', password='x', role='patient')
+        DBSession.add_all([doctor_user, patient])
+        DBSession.flush()
+        doctor = Doctor(user_id=doctor_user.id, specialization='Umum', schedule='-')
+        DBSession.add(doctor)
+        DBSession.flush()
+        ids = {'doctor_id': doctor.id, 'doctor_user_id': doctor_user.id, 'patient_id': patient.id}
+    DBSession.remove()
+    return ids
+
+
+@pytest.fixture
+def app_settings(db_url):
+    return dict(TEST_SETTINGS, **{'sqlalchemy.url': db_url})
+
+
+@pytest.fixture
+def testapp(clinic, app_settings):
+    wsgi_app = main({}, **app_settings)
+    yield TestApp(wsgi_app)
+    wsgi_app.registry.hasher.shutdown()
+    DBSession.remove()
+
+
+@pytest.fixture
+def book(testapp, clinic):
+    """book(tanggal, jam, **field) -> response POST /api/appointments/create."""
+    def factory(appointment_date, appointment_time, status=200, **fields):
+        body = dict(clinic, appointment_date=appointment_date, appointment_time=appointment_time, **fields)
+        body.pop('doctor_user_id')
+        return testapp.post_json('/api/appointments/create', body, status=status)
+    return factory
+
+
+@pytest.fixture
+def login(testapp):
+    """login(role, email) -> token JWT user baru yang didaftarkan lewat API."""
+    def factory(role='patient', email=None, password='rahasia123', **fields):
+        email = email or f'{role}{len(fields)}@login.test'
+        body = dict({'name': role.title(), 'email': email, 'password': password, 'role': role}, **fields)
+        if role == 'doctor':
+            body.setdefault('specialization', 'Umum')
+        testapp.post_json('/api/auth/register', body)
+        return testapp.post_json('/api/auth/login', {'email': email, 'password': password}).json['token']
+    return factory
+
+
+@pytest.fixture
+def admin_headers(testapp, login, db_url):
+    """Header Authorization token admin: daftar lewat API, grant_admin, login ulang."""
+    login(email='admin@test.local')
+    assert grant_admin(['grant_admin', 'admin@test.local', '--url', db_url]) == 0
+    token = testapp.post_json('/api/auth/login', {'email': 'admin@test.local', 'password': 'rahasia123'}).json['token']
+    return {'Authorization': f'Bearer {token}'}
@@ -0,0 +1,72 @@
+import pytest
+from sqlalchemy import event, text
+from sqlalchemy.engine import Engine
+
+from src.search import record_index
+
+ARCHIVED, CURRENT = '2031-01-15', '2031-03-10'
+
+# Meniru partitions.archive_partition di SQLite: database "archive" di-ATTACH
+# ke setiap koneksi, bulan Januari dipindah ke archive.* (rekam medis dulu)
+ARCHIVE_SQL = [
+    'CREATE TABLE archive.appointments AS SELECT * FROM main.appointments WHERE 0',
+    'CREATE TABLE archive.medical_records AS SELECT * FROM main.medical_records WHERE 0',
+    "INSERT INTO archive.appointments SELECT * FROM main.appointments WHERE appointment_date < '2031-02-01'",
+    "INSERT INTO archive.medical_records SELECT * FROM main.medical_records WHERE appointment_date < '2031-02-01'",
+    "DELETE FROM main.medical_records WHERE appointment_date < '2031-02-01'",
+    "DELETE FROM main.appointments WHERE appointment_date < '2031-02-01'",
+]
+
+
+@pytest.fixture(autouse=True)
+def archive_db(tmp_path, monkeypatch):
+    path = str(tmp_path / 'archive.sqlite')
+
+    def attach(dbapi_connection, connection_record):
+        dbapi_connection.execute(f"ATTACH DATABASE '{path}' AS archive")
+
+    event.listen(Engine, 'connect', attach)
+    monkeypatch.setattr('src.queries.archive_available', lambda connection: True)
+    record_index.invalidate()
+    yield
+    event.remove(Engine, 'connect', attach)
+
+
+@pytest.fixture
+def archived(testapp, engine, clinic, book):
+    """Dua kunjungan dengan rekam medis; yang bulan Januari sudah diarsipkan."""
+    ids = {}
+    for day, diagnosis in ((ARCHIVED, 'Demam berdarah'), (CURRENT, 'Demam tifoid')):
+        ids[day] = book(day, '09:00').json['appointment_id']
+        testapp.post_json('/api/medical-records/create', {'appointment_id': ids[day], 'diagnosis': diagnosis})
+    with engine.begin() as conn:
+        for sql in ARCHIVE_SQL:
+            conn.execute(text(sql))
+    return ids
+
+
+def test_history_and_detail_include_archive(testapp, clinic, archived):
+    history = f'/api/medical-records/history?patient_id={clinic["patient_id"]}'
+    rows = testapp.get(history).json['data']
+    assert [r['appointment_date'] for r in rows] == [CURRENT, ARCHIVED]
+
+    # Cursor halaman kedua menunjuk ke baris arsip
+    first = testapp.get(history + '&limit=1').json
+    second = testapp.get(history + f'&limit=1&after={first["next_cursor"]}').json
+    assert [r['appointment_id'] for r in second['data']] == [archived[ARCHIVED]]
+
+    detail = testapp.get(f'/api/medical-records/detail?appointment_id={archived[ARCHIVED]}').json
+    assert detail['data']['diagnosis'] == 'Demam berdarah'
+
+
+def test_search_includes_archive(testapp, archived):
+    rows = testapp.get('/api/medical-records/search?q=demam').json['data']
+    assert {r['appointment_id'] for r in rows} == set(archived.values())
+
+
+def test_export_includes_archive(testapp, archived, admin_headers):
+    records = testapp.get('/api/export/medical-records?format=ndjson', headers=admin_headers).text.splitlines()
+    assert len(records) == 2
+    appointments = testapp.get('/api/export/appointments?format=csv&to=2031-01-31',
+                               headers=admin_headers).text.splitlines()
+    assert len(appointments) == 2 and appointments[1].startswith(str(archived[ARCHIVED]))
@@ -0,0 +1,42 @@
+import asyncio
+
+from src.asgi import AsgiApp
+
+
+class _WsgiApp:
+    """Aplikasi WSGI gaya lama: sebagian body lewat write(), sisanya app_iter."""
+    registry = None
+
+    def __call__(self, environ, start_response):
+        write = start_response('200 OK', [('Content-Type', 'text/plain')])
+        write(b'satu ')
+        write(b'')
+        write(b'dua ')
+        return [b'tiga']
+
+
+def _call(app):
+    scope = {'type': 'http', 'method': 'GET', 'path': '/', 'query_string': b'', 'headers': []}
+    messages = []
+    incoming = [{'type': 'http.request', 'body': b''}]
+
+    async def receive():
+        if incoming:
+            return incoming.pop()
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return messages
+
+
+def test_write_callable_is_sent_before_app_iter():
+    messages = _call(AsgiApp(_WsgiApp()))
+
+    assert messages[0]['type'] == 'http.response.start'
+    assert messages[0]['status'] == 200
+    body = b''.join(m.get('body', b'') for m in messages[1:])
+    assert body == b'satu dua tiga'
+    assert messages[-1] == {'type': 'http.response.body', 'body': b''}
@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+import pytest
+
+from src.availability import parse_legacy_schedule
+
+
+def _hours(text):
+    return [(day, start.strftime('%H:%M'), end.strftime('%H:%M'))
+            for day, start, end in parse_legacy_schedule(text)]
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('Senin-Jumat, 09.00 - 15.00', [(d, '09:00', '15:00') for d in range(5)]),
+    ('Senin - Jumat (09:00 - 15:00); Sabtu (10:00 - 12:00)',
+     [(d, '09:00', '15:00') for d in range(5)] + [(5, '10:00', '12:00')]),
+    ('Senin, Rabu 09.00-12.00, Jumat 13.00-15.00',
+     [(0, '09:00', '12:00'), (2, '09:00', '12:00'), (4, '13:00', '15:00')]),
+    ('Sabtu Minggu 10:00-14:00', [(5, '10:00', '14:00'), (6, '10:00', '14:00')]),
+    ('Setiap hari 08.00-16.00', [(d, '08:00', '16:00') for d in range(7)]),
+    ('Senin 08.00-12.00, 13.00-16.00', [(0, '08:00', '12:00'), (0, '13:00', '16:00')]),
+    ("Jum'at - Senin 19.00 WIB - 21.00 WIB", [(d, '19:00', '21:00') for d in (0, 4, 5, 6)]),
+])
+def test_parse_legacy_schedule(text, expected):
+    assert _hours(text) == expected
+
+
+@pytest.mark.parametrize('text', [
+    '-', '', None, '09.00-12.00', 'Senin 09.00-12.00, Jumat', 'Senin 12.00-09.00', 'Senin 25.00-26.00',
+])
+def test_parse_legacy_schedule_rejects_unreadable(text):
+    with pytest.raises(ValueError):
+        parse_legacy_schedule(text)
+
+
+def test_update_schedule_from_text(testapp, clinic):
+    body = {'user_id': clinic['doctor_user_id'], 'schedule': 'Setiap hari 08.00-16.00'}
+    result = testapp.put_json('/api/account/update-schedule', body).json
+    assert [a['weekday'] for a in result['availability']] == list(range(7))
+
+
+def test_update_schedule_rejects_unreadable_text(testapp, clinic):
+    user_id = clinic['doctor_user_id']
+    testapp.put_json('/api/account/update-schedule', {'user_id': user_id, 'schedule': 'Senin 09.00-12.00'})
+
+    response = testapp.put_json('/api/account/update-schedule',
+                                {'user_id': user_id, 'schedule': 'Sesuai perjanjian'}, status=400)
+    assert 'details' in response.json
+
+    # Jadwal lama (teks & jam praktik) tidak berubah
+    profile = testapp.get(f'/api/account/profile?user_id={user_id}').json
+    assert profile['data']['doctor_info']['schedule'] == 'Senin 09.00-12.00'
+    monday = date.today() + timedelta(days=7 - date.today().weekday())
+    slots = testapp.get(f'/api/doctors/{clinic["doctor_id"]}/slots?from={monday}&to={monday}').json
+    assert slots['slots'][0]['times'] == ['09:00', '09:30', '10:00', '10:30', '11:00', '11:30']
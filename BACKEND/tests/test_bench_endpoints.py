@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+from src.scripts import bench_endpoints, seed_clinic
+from src.scripts.bench_endpoints import SCENARIOS
+from src.search import record_index
+
+# Route tanpa endpoint yang perlu diukur
+NOT_BENCHMARKED = {'cors-options'}
+
+
+@pytest.fixture
+def seeded_url(tmp_path):
+    url = f'sqlite:///{tmp_path / "bench.sqlite"}'
+    seed_clinic.main(['seed_clinic', url, '--doctors', '2', '--patients', '20', '--appointments', '300'])
+    yield url
+    record_index.invalidate()
+
+
+def test_every_route_has_a_scenario(testapp):
+    introspector = testapp.app.registry.introspector
+    routes = {view['route_name'] for view in
+              (item['introspectable'] for item in introspector.get_category('views'))
+              if view['route_name']}
+    missing = {route for route in routes - NOT_BENCHMARKED
+               if not any(name == route or name.startswith(route + '_') for name in SCENARIOS)}
+    assert missing == set()
+
+
+def test_every_scenario_runs_without_errors(seeded_url, tmp_path):
+    output = tmp_path / 'bench.json'
+    assert bench_endpoints.main(['bench_endpoints', seeded_url, '--requests', '1', '--warmup', '0',
+                                 '--output', str(output)]) == 0
+    routes = json.loads(output.read_text())['routes']
+    assert set(routes) == set(SCENARIOS)
+    assert {name: r['errors'] for name, r in routes.items() if r['errors']} == {}
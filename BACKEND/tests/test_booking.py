@@ -0,0 +1,107 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, time, timedelta
+
+import pytest
+from sqlalchemy import func, text
+from sqlalchemy.orm import Session
+
+from src.models import Appointment
+from src.queries import insert_appointment_if_free
+from src.scripts import scratch_schema
+
+TOMORROW = (date.today() + timedelta(days=1)).isoformat()
+
+
+# -------------------------------------------------------
+# SATU SLOT AKTIF PER DOKTER (SQLite)
+# -------------------------------------------------------
+def test_insert_if_free_returns_none_for_taken_slot(engine, clinic):
+    values = dict(patient_id=clinic['patient_id'], doctor_id=clinic['doctor_id'],
+                  appointment_date=date.today() + timedelta(days=1), appointment_time=time(9, 0))
+    with Session(bind=engine) as session:
+        first = insert_appointment_if_free(session, status='pending', **values)
+        assert first is not None
+        assert insert_appointment_if_free(session, status='pending', **values) is None
+
+        # Slot yang dibatalkan boleh dipesan lagi
+        session.query(Appointment).filter(Appointment.id == first).update({'status': 'cancelled'})
+        assert insert_appointment_if_free(session, status='pending', **values) is not None
+        session.commit()
+
+
+def test_create_conflict_returns_409(book):
+    book(TOMORROW, '09:00')
+    response = book(TOMORROW, '09:00', status=409)
+    assert 'sudah dipesan' in response.json['error']
+
+
+def test_edit_reschedule_into_taken_slot_returns_409(testapp, book, clinic):
+    book(TOMORROW, '09:00')
+    moved = book(TOMORROW, '10:00').json['appointment_id']
+
+    response = testapp.put_json('/api/appointments/edit', {
+        'appointment_id': moved, 'appointment_time': '09:00'}, status=409)
+    assert 'sudah dipesan' in response.json['error']
+
+    # Transaksi dibatalkan: appointment tetap di jam lama
+    rows = testapp.get(f'/api/appointments/filter?doctor_id={clinic["doctor_id"]}').json['appointments']
+    assert [a['appointment_time'] for a in rows if a['id'] == moved] == ['10:00:00']
+
+
+def test_edit_reactivating_cancelled_into_taken_slot_returns_409(testapp, book):
+    cancelled = book(TOMORROW, '09:00').json['appointment_id']
+    testapp.put_json('/api/appointments/edit', {'appointment_id': cancelled, 'status': 'cancelled'})
+    book(TOMORROW, '09:00')
+
+    testapp.put_json('/api/appointments/edit', {'appointment_id': cancelled, 'status': 'pending'}, status=409)
+
+
+# -------------------------------------------------------
+# BALAPAN BOOKING (PostgreSQL)
+# -------------------------------------------------------
+# Banyak koneksi memesan slot yang sama bersamaan: tepat satu yang menang.
+# Butuh PostgreSQL sungguhan (partial unique index + ON CONFLICT di bawah
+# konkurensi); tabel dibuat di schema sementara, data asli tidak disentuh.
+PG_URL = os.environ.get('TEST_DATABASE_URL')
+WORKERS = 16
+ROUNDS = 5
+
+
+def _book(engine, barrier, patient_id, slot_date):
+    with Session(bind=engine) as session:
+        barrier.wait()
+        new_id = insert_appointment_if_free(session, patient_id=patient_id, doctor_id=1,
+                                            appointment_date=slot_date, appointment_time=time(9, 0),
+                                            status='pending')
+        session.commit()
+        return new_id
+
+
+@pytest.mark.skipif(not PG_URL, reason='TEST_DATABASE_URL (PostgreSQL) tidak di-set')
+def test_concurrent_booking_has_single_winner():
+    with scratch_schema(PG_URL, 'booking_race_check', pool_size=WORKERS, max_overflow=0) as engine:
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO users (id, name, email, password, role) "
+                "SELECT i, 'user ' || i, 'user' || i || '@seed.local', 'x', "
+                "CASE WHEN i = 1 THEN 'doctor' ELSE 'patient' END "
+                "FROM generate_series(1, :n) AS i"), {'n': WORKERS + 1})
+            conn.execute(text("INSERT INTO doctors (id, user_id, specialization, schedule) "
+                              "VALUES (1, 1, 'Umum', '-')"))
+
+        with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+            for i in range(ROUNDS):
+                slot_date = date.today() + timedelta(days=1 + i)
+                barrier = threading.Barrier(WORKERS)
+                futures = [pool.submit(_book, engine, barrier, patient_id, slot_date)
+                           for patient_id in range(2, WORKERS + 2)]
+                winners = [f.result() for f in futures if f.result() is not None]
+
+                with Session(bind=engine) as session:
+                    active = session.query(func.count(Appointment.id)).filter(
+                        Appointment.doctor_id == 1,
+                        Appointment.appointment_date == slot_date,
+                        Appointment.status != 'cancelled').scalar()
+                assert (len(winners), active) == (1, 1), slot_date
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from src.conditional import table_versions
+
+DAY = '2031-05-20'
+
+
+def test_edit_in_same_second_invalidates_etag(testapp, clinic, book):
+    appointment_id = book(DAY, '09:00').json['appointment_id']
+    url = f'/api/appointments/filter?doctor_id={clinic["doctor_id"]}'
+    etag = testapp.get(url).headers['ETag']
+
+    # updated_at (CURRENT_TIMESTAMP, per detik) bisa sama dengan sebelumnya
+    testapp.put_json('/api/appointments/edit', {'appointment_id': appointment_id, 'status': 'confirmed'})
+    response = testapp.get(url, headers={'If-None-Match': etag}, status=200)
+    assert response.json['appointments'][0]['status'] == 'confirmed'
+    testapp.get(url, headers={'If-None-Match': response.headers['ETag']}, status=304)
+
+
+def test_bulk_update_bumps_version(testapp, clinic, book):
+    appointment_id = book(DAY, '09:00').json['appointment_id']
+    history = f'/api/medical-records/history?patient_id={clinic["patient_id"]}'
+    testapp.post_json('/api/medical-records/create', {'appointment_id': appointment_id, 'diagnosis': 'ISPA'})
+    etag = testapp.get(history).headers['ETag']
+
+    before = table_versions.get('appointments')
+    testapp.put_json('/api/appointments/bulk', {'appointments': [
+        {'appointment_id': appointment_id, 'appointment_time': '10:00'}]})
+    assert table_versions.get('appointments') > before
+    response = testapp.get(history, headers={'If-None-Match': etag}, status=200)
+    assert response.json['data'][0]['appointment_time'] == '10:00:00'
+
+
+def test_last_modified_is_utc_on_sqlite(testapp, engine, clinic, book):
+    book(DAY, '09:00')
+    with engine.connect() as conn:
+        stored = conn.execute(text('SELECT max(updated_at) FROM appointments')).scalar()
+    response = testapp.get(f'/api/appointments/filter?doctor_id={clinic["doctor_id"]}')
+    expected = datetime.fromisoformat(stored).replace(tzinfo=timezone.utc, microsecond=0)
+    assert response.last_modified == expected
@@ -0,0 +1,31 @@
+from sqlalchemy import text
+
+from src.directory import doctor_directory
+
+
+def test_etag_follows_directory_snapshot(testapp, engine, clinic):
+    first = testapp.get('/api/doctors')
+    assert [d['name'] for d in first.json] == ['Dr. Budi']
+    testapp.get('/api/doctors', headers={'If-None-Match': first.headers['ETag']}, status=304)
+
+    # Ditulis proses lain (tanpa event session): index belum tahu, jadi ETag
+    # harus tetap sama dengan body lama yang masih disajikan
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE users SET name = 'Dr. Budi S.', updated_at = CURRENT_TIMESTAMP "
+                          "WHERE id = :id"), {'id': clinic['doctor_user_id']})
+    stale = testapp.get('/api/doctors')
+    assert stale.headers['ETag'] == first.headers['ETag']
+    assert [d['name'] for d in stale.json] == ['Dr. Budi']
+
+    doctor_directory.invalidate()
+    fresh = testapp.get('/api/doctors', headers={'If-None-Match': first.headers['ETag']})
+    assert fresh.headers['ETag'] != first.headers['ETag']
+    assert [d['name'] for d in fresh.json] == ['Dr. Budi S.']
+
+
+def test_etag_changes_after_commit_through_app(testapp, login):
+    before = testapp.get('/api/doctors')
+    login(role='doctor', email='baru@test.local', name='Dr. Citra', specialization='Anak')
+    after = testapp.get('/api/doctors', headers={'If-None-Match': before.headers['ETag']})
+    assert after.headers['ETag'] != before.headers['ETag']
+    assert {d['name'] for d in after.json} == {'Dr. Budi', 'Dr. Citra'}
@@ -0,0 +1,37 @@
+import pytest
+
+from src.scripts.grant_admin import main as grant_admin
+
+EXPORTS = ['/api/export/appointments', '/api/export/medical-records']
+
+
+@pytest.mark.parametrize('url', EXPORTS)
+def test_export_requires_admin_token(testapp, login, url):
+    response = testapp.get(url, status=401)
+    assert response.headers['WWW-Authenticate'] == 'Bearer'
+
+    patient = {'Authorization': f'Bearer {login()}'}
+    assert testapp.get(url, headers=patient, status=403).json['error'] == 'Endpoint ini khusus admin'
+
+
+def test_export_with_admin_token(testapp, book, admin_headers):
+    appointment_id = book('2031-05-20', '09:00').json['appointment_id']
+    rows = testapp.get('/api/export/appointments', headers=admin_headers).text.splitlines()
+    assert rows[0].startswith('id,') and rows[1].startswith(f'{appointment_id},')
+
+
+def test_admin_role_cannot_be_registered(testapp):
+    testapp.post_json('/api/auth/register', {
+        'name': 'Admin', 'email': 'admin@test.local', 'password': 'rahasia123', 'role': 'admin'}, status=403)
+    testapp.post_json('/api/auth/login', {'email': 'admin@test.local', 'password': 'rahasia123'}, status=401)
+
+
+def test_grant_admin_revoke(testapp, login, db_url):
+    login(email='staf@test.local')
+    argv = ['grant_admin', 'staf@test.local', '--url', db_url]
+    assert grant_admin(argv) == 0
+    assert grant_admin(argv + ['--revoke', 'patient']) == 0
+    token = testapp.post_json('/api/auth/login', {'email': 'staf@test.local', 'password': 'rahasia123'}).json['token']
+    testapp.get(EXPORTS[0], headers={'Authorization': f'Bearer {token}'}, status=403)
+
+    assert grant_admin(['grant_admin', 'tidak-ada@test.local', '--url', db_url]) == 1
@@ -0,0 +1,35 @@
+import pytest
+
+LOCAL = {'REMOTE_ADDR': '127.0.0.1'}
+REMOTE = {'REMOTE_ADDR': '203.0.113.7'}
+
+
+@pytest.mark.parametrize('url', ['/api/_cache/stats', '/api/_pool/stats', '/api/_metrics'])
+def test_internal_endpoints_only_from_localhost(testapp, url):
+    testapp.get(url, extra_environ=LOCAL, status=200)
+    response = testapp.get(url, extra_environ=REMOTE, status=403)
+    assert 'internal.allowed_ips' in response.json['error']
+    testapp.get(url, status=403)
+
+
+class TestAllowedNetworks:
+    @pytest.fixture
+    def app_settings(self, app_settings):
+        return dict(app_settings, **{'internal.allowed_ips': '10.0.0.0/8\n192.168.1.5'})
+
+    def test_cidr_and_single_address(self, testapp):
+        testapp.get('/api/_pool/stats', extra_environ={'REMOTE_ADDR': '10.20.30.40'}, status=200)
+        testapp.get('/api/_pool/stats', extra_environ={'REMOTE_ADDR': '192.168.1.5'}, status=200)
+        testapp.get('/api/_pool/stats', extra_environ={'REMOTE_ADDR': '192.168.1.6'}, status=403)
+        testapp.get('/api/_pool/stats', extra_environ=LOCAL, status=403)
+
+
+def test_slowest_query_statement_not_a_metric_label(testapp, clinic):
+    testapp.get('/api/doctors', status=200)
+    metrics = testapp.get('/api/_metrics', extra_environ=LOCAL).text
+    slowest = [line for line in metrics.splitlines() if line.startswith('cliniga_db_slowest_query_seconds{')]
+    assert slowest and not any('statement=' in line for line in slowest)
+
+    stats = testapp.get('/api/_pool/stats', extra_environ=LOCAL).json['slowest_queries']
+    assert stats and all(entry['statement'].startswith(('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH'))
+                         for entry in stats.values())
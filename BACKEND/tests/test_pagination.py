@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+
+def walk(testapp, url):
+    """Ikuti next_cursor sampai habis; gagal jika cursor tidak maju."""
+    ids, cursor, seen_cursors = [], None, set()
+    while True:
+        page = testapp.get(url + (f'&after={cursor}' if cursor else '')).json
+        ids.extend(a['id'] for a in page['appointments'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            return ids
+        assert cursor not in seen_cursors, 'cursor tidak maju'
+        seen_cursors.add(cursor)
+
+
+def test_created_order_walks_every_page(testapp, book):
+    created = [book('2031-01-06', f'{9 + i:02d}:00').json['appointment_id'] for i in range(7)]
+
+    ids = walk(testapp, '/api/appointments/show?limit=3')
+
+    assert ids == sorted(created, reverse=True)
+
+
+def test_created_order_with_raw_inserted_rows(testapp, engine, clinic):
+    # Server default (CURRENT_TIMESTAMP, tanpa mikrodetik) dan nilai dari
+    # Python (dengan mikrodetik) bercampur di kolom yang sama
+    created_at = ['2031-01-01 10:00:00', '2031-01-01 10:00:00', '2031-01-01 10:00:00.250000',
+                  '2031-01-01 10:00:01', None]
+    with engine.begin() as conn:
+        for i, value in enumerate(created_at, start=1):
+            conn.execute(text(
+                "INSERT INTO appointments (id, patient_id, doctor_id, appointment_date, appointment_time, status"
+                + (", created_at" if value else "") + ") VALUES (:id, :patient, :doctor, '2031-01-06', :at, 'pending'"
+                + (", :created" if value else "") + ")"),
+                {'id': i, 'patient': clinic['patient_id'], 'doctor': clinic['doctor_id'],
+                 'at': f'{8 + i:02d}:00:00.000000', 'created': value})
+
+    # Terbaru dulu, id sebagai tie-breaker; baris 5 (server default = sekarang) paling lama
+    assert walk(testapp, '/api/appointments/show?limit=2') == [4, 3, 2, 1, 5]
+
+
+def test_schedule_order_walks_every_page(testapp, book, clinic):
+    start = date(2031, 1, 6)
+    for i in range(7):
+        book((start + timedelta(days=i % 3)).isoformat(), f'{9 + i:02d}:00')
+
+    ids = walk(testapp, f'/api/appointments/filter?upcoming=true&doctor_id={clinic["doctor_id"]}&limit=2')
+    rows = testapp.get('/api/appointments/filter?upcoming=true').json['appointments']
+
+    assert len(ids) == len(set(ids)) == 7
+    assert ids == [a['id'] for a in rows]
+    assert [(a['appointment_date'], a['appointment_time']) for a in rows] == \
+        sorted((a['appointment_date'], a['appointment_time']) for a in rows)
+
+
+def test_invalid_cursor_is_400(testapp):
+    assert testapp.get('/api/appointments/show?limit=3&after=zzz', status=400).json['error']
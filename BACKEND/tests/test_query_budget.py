@@ -0,0 +1,50 @@
+import pytest
+
+from src.querybudget import QueryBudgetExceeded
+
+
+@pytest.fixture
+def history(testapp, book, clinic):
+    """Lima rekam medis untuk pasien clinic; mengembalikan URL riwayatnya."""
+    for i in range(5):
+        appointment_id = book('2031-03-03', f'{9 + i:02d}:00').json['appointment_id']
+        testapp.post_json('/api/medical-records/create', {'appointment_id': appointment_id, 'diagnosis': 'ISPA'})
+    return f'/api/medical-records/history?patient_id={clinic["patient_id"]}'
+
+
+def test_get_doctors_served_without_queries(testapp, login, query_budget):
+    login(role='doctor', email='dokter2@test.local', name='Dr. Citra')
+    with query_budget(0):
+        response = testapp.get('/api/doctors')
+        testapp.get('/api/doctors?specialization=Umum&limit=1')
+        testapp.get('/api/doctors', headers={'If-None-Match': response.headers['ETag']}, status=304)
+
+
+def test_patient_history_does_not_grow_with_records(testapp, history, query_budget):
+    # Validator ETag + satu query riwayat (join dokter, tanpa lazy-load per baris)
+    with query_budget(2, max_repeats=1):
+        response = testapp.get(history)
+    assert len(response.json['data']) == 5
+
+    with query_budget(2, max_repeats=1):
+        assert len(testapp.get(history + '&limit=2').json['data']) == 2
+
+    with query_budget(1):
+        testapp.get(history, headers={'If-None-Match': response.headers['ETag']}, status=304)
+
+
+def test_login_single_lookup(testapp, login, query_counter):
+    login(email='pasien@test.local')
+    before = query_counter.count
+    testapp.post_json('/api/auth/login', {'email': 'pasien@test.local', 'password': 'rahasia123'})
+    testapp.post_json('/api/auth/login', {'email': 'pasien@test.local', 'password': 'salah'}, status=401)
+    # Satu SELECT user (+ dokter, eager) per login, berhasil maupun gagal
+    assert query_counter.count - before == 2, query_counter.shapes()
+
+
+def test_budget_reports_repeated_shapes(testapp, history, query_budget):
+    with pytest.raises(QueryBudgetExceeded, match='kemungkinan N\\+1'):
+        with query_budget(10, max_repeats=1):
+            testapp.get(history)
+            testapp.get(history + '&limit=2')
+            testapp.get(history + '&limit=3')
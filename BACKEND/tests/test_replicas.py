@@ -0,0 +1,69 @@
+import shutil
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from src.replicas import COOKIE_NAME, replica_router
+
+DAY = '2031-04-07'
+
+
+@pytest.fixture
+def replica_url(tmp_path, db_url, clinic):
+    """Salinan file SQLite primary (setelah data clinic) sebagai "replica"."""
+    shutil.copy(db_url[len('sqlite:///'):], tmp_path / 'replica.sqlite')
+    return f'sqlite:///{tmp_path / "replica.sqlite"}'
+
+
+@pytest.fixture
+def app_settings(app_settings, replica_url):
+    return dict(app_settings, **{'db.replica_urls': replica_url, 'db.read_your_writes': '60'})
+
+
+@pytest.fixture(autouse=True)
+def reset_router():
+    yield
+    replica_router.configure([])
+
+
+def appointment_ids(testapp, clinic):
+    rows = testapp.get(f'/api/appointments/filter?doctor_id={clinic["doctor_id"]}').json['appointments']
+    return {a['id'] for a in rows}
+
+
+def test_get_reads_from_replica(testapp, clinic, replica_url):
+    # Baris yang hanya ada di replica: GET harus melihatnya
+    engine = create_engine(replica_url)
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO appointments (id, patient_id, doctor_id, appointment_date, appointment_time, status) "
+            "VALUES (900, :patient, :doctor, :day, '09:00:00.000000', 'pending')"),
+            {'patient': clinic['patient_id'], 'doctor': clinic['doctor_id'], 'day': DAY})
+    engine.dispose()
+
+    assert appointment_ids(testapp, clinic) == {900}
+    assert replica_router.stats()[0]['reads'] >= 1
+
+
+def test_writes_go_to_primary_with_read_your_writes_cookie(testapp, clinic, book):
+    response = book(DAY, '10:00')
+    created = response.json['appointment_id']
+    assert COOKIE_NAME in response.headers['Set-Cookie']
+
+    # Client yang baru menulis membaca dari primary
+    assert appointment_ids(testapp, clinic) == {created}
+
+    # Client lain (tanpa cookie) membaca replica, yang belum punya baris tsb
+    testapp.reset()
+    assert appointment_ids(testapp, clinic) == set()
+
+
+def test_primary_route_ignores_replica(testapp, clinic, book):
+    testapp.put_json('/api/account/update-schedule', {
+        'user_id': clinic['doctor_user_id'], 'schedule': 'Setiap hari 09.00-11.00'})
+    book(DAY, '10:00')
+    testapp.reset()
+    # /api/doctors/{id}/slots ditandai db='primary': jam praktik & booking di
+    # atas belum ada di replica, tapi tetap terlihat tanpa cookie
+    slots = testapp.get(f'/api/doctors/{clinic["doctor_id"]}/slots?from={DAY}&to={DAY}').json
+    assert slots['slots'] == [{'date': DAY, 'times': ['09:00', '09:30', '10:30']}]
@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from src.partitions import RECORD_FK, RECORD_MOVE_ERROR
+
+
+def _with_record(testapp, book, day, at):
+    appointment_id = book(day, at).json['appointment_id']
+    testapp.post_json('/api/medical-records/create', {'appointment_id': appointment_id, 'diagnosis': 'Migrain'})
+    return appointment_id
+
+
+def _history(testapp, clinic):
+    rows = testapp.get(f'/api/medical-records/history?patient_id={clinic["patient_id"]}').json['data']
+    return {r['appointment_id']: r['appointment_date'] for r in rows}
+
+
+def _record_dates(engine):
+    with engine.connect() as conn:
+        return dict(conn.execute(text('SELECT appointment_id, appointment_date FROM medical_records')).all())
+
+
+def test_reschedule_carries_record_date(testapp, engine, clinic, book):
+    moved = _with_record(testapp, book, '2031-05-20', '09:00')
+    testapp.put_json('/api/appointments/edit', {'appointment_id': moved, 'appointment_date': '2031-06-03'})
+
+    # ON UPDATE CASCADE juga di SQLite (PRAGMA foreign_keys)
+    assert _record_dates(engine) == {moved: '2031-06-03'}
+    assert _history(testapp, clinic) == {moved: '2031-06-03'}
+    detail = testapp.get(f'/api/medical-records/detail?appointment_id={moved}').json
+    assert detail['status'] == 'success'
+
+
+def test_bulk_reschedule_carries_record_date(testapp, engine, clinic, book):
+    moved = _with_record(testapp, book, '2031-05-20', '10:00')
+    result = testapp.put_json('/api/appointments/bulk', {'appointments': [
+        {'appointment_id': moved, 'appointment_date': '2031-07-01', 'appointment_time': '11:00'}]}).json
+    assert result['results'][0]['status'] == 'success'
+
+    assert _record_dates(engine) == {moved: '2031-07-01'}
+    assert _history(testapp, clinic) == {moved: '2031-07-01'}
+
+
+class _ForeignKeyViolation(Exception):
+    """Meniru psycopg2 ForeignKeyViolation RECORD_FK (PostgreSQL < 15, pindah bulan)."""
+    pgcode = '23503'
+    diag = SimpleNamespace(constraint_name=RECORD_FK)
+
+
+def _fk_violation():
+    return IntegrityError('UPDATE appointments ...', {}, _ForeignKeyViolation())
+
+
+def test_record_fk_violation_is_not_reported_as_slot_taken(testapp, book, monkeypatch):
+    moved = _with_record(testapp, book, '2031-05-20', '09:00')
+    real_flush = Session.flush
+
+    def flush(self, objects=None):
+        if self.dirty:
+            raise _fk_violation()
+        return real_flush(self, objects)
+
+    monkeypatch.setattr(Session, 'flush', flush)
+    response = testapp.put_json('/api/appointments/edit', {
+        'appointment_id': moved, 'appointment_date': '2031-06-03'}, status=409)
+    assert response.json['error'] == RECORD_MOVE_ERROR
+
+    def update_appointments(session, rows):
+        raise _fk_violation()
+
+    monkeypatch.setattr('src.bulk.update_appointments', update_appointments)
+    response = testapp.put_json('/api/appointments/bulk', {'appointments': [
+        {'appointment_id': moved, 'appointment_date': '2031-06-03'}]}, status=409)
+    assert response.json['error'] == RECORD_MOVE_ERROR
+
+
+def test_current_date_narrows_lookup(testapp, book):
+    appointment_id = book('2031-05-20', '09:00').json['appointment_id']
+
+    testapp.put_json('/api/appointments/edit', {
+        'appointment_id': appointment_id, 'current_date': '2031-05-21', 'status': 'confirmed'}, status=404)
+    testapp.put_json('/api/appointments/edit', {
+        'appointment_id': appointment_id, 'current_date': 'kemarin', 'status': 'confirmed'}, status=400)
+    testapp.put_json('/api/appointments/edit', {
+        'appointment_id': appointment_id, 'current_date': '2031-05-20', 'status': 'confirmed'})
+
+    results = testapp.put_json('/api/appointments/bulk', {'appointments': [
+        {'appointment_id': appointment_id, 'current_date': '2031-05-21', 'appointment_time': '10:00'},
+    ]}).json['results']
+    assert results[0]['code'] == 404
+    results = testapp.put_json('/api/appointments/bulk', {'appointments': [
+        {'appointment_id': appointment_id, 'current_date': '2031-05-20', 'appointment_time': '10:00'},
+    ]}).json['results']
+    assert results[0]['status'] == 'success'
+
+    testapp.post_json('/api/medical-records/create', {
+        'appointment_id': appointment_id, 'appointment_date': '2031-05-21', 'diagnosis': 'ISPA'}, status=404)
+    testapp.post_json('/api/medical-records/create', {
+        'appointment_id': appointment_id, 'appointment_date': '2031-05-20', 'diagnosis': 'ISPA'})
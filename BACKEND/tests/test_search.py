@@ -0,0 +1,68 @@
+import pytest
+import transaction
+
+from src.models import DBSession, MedicalRecord
+from src.search import record_index
+
+DAY = '2031-02-03'
+
+
+@pytest.fixture(autouse=True)
+def fresh_index():
+    # Index fallback SQLite global per proses: bangun ulang dari database test ini
+    record_index.invalidate()
+    yield
+    record_index.invalidate()
+
+
+@pytest.fixture
+def records(testapp, book):
+    """Buat rekam medis lewat API, mengembalikan id per nama."""
+    def factory(**items):
+        ids = {}
+        for i, (name, (diagnosis, notes)) in enumerate(items.items()):
+            appointment_id = book(DAY, f'{9 + i:02d}:00').json['appointment_id']
+            ids[name] = testapp.post_json('/api/medical-records/create', {
+                'appointment_id': appointment_id, 'diagnosis': diagnosis, 'notes': notes}).json['id']
+        return ids
+    return factory
+
+
+def search(testapp, q):
+    return [r['id'] for r in testapp.get('/api/medical-records/search', {'q': q}).json['data']]
+
+
+def test_ranking_prefers_diagnosis_and_requires_every_term(testapp, records):
+    ids = records(
+        in_notes=('Faringitis', 'demam sejak kemarin'),
+        in_diagnosis=('Demam tifoid', 'kontrol seminggu lagi'),
+        both=('Demam berdarah dengue', 'demam tinggi tiga hari'),
+        unrelated=('Hipertensi', 'cek tensi rutin'),
+    )
+
+    assert search(testapp, 'demam') == [ids['both'], ids['in_diagnosis'], ids['in_notes']]
+    assert search(testapp, 'demam tinggi') == [ids['both']]
+    assert search(testapp, 'asma') == []
+
+
+def test_minus_term_excludes_records(testapp, records):
+    ids = records(
+        dengue=('Demam berdarah dengue', 'trombosit turun'),
+        tifoid=('Demam tifoid', '-'),
+    )
+
+    assert search(testapp, 'demam -dengue') == [ids['tifoid']]
+    assert search(testapp, 'demam -trombosit -tifoid') == []
+
+
+def test_index_refreshed_after_record_edit(testapp, records):
+    ids = records(edited=('Demam', 'observasi'))
+    assert search(testapp, 'demam') == [ids['edited']]
+
+    with transaction.manager:
+        record = DBSession.get(MedicalRecord, ids['edited'])
+        record.diagnosis = 'Bronkitis akut'
+    DBSession.remove()
+
+    assert search(testapp, 'demam') == []
+    assert search(testapp, 'bronkitis') == [ids['edited']]
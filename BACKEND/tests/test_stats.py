@@ -0,0 +1,55 @@
+from datetime import date, timedelta
+
+from sqlalchemy.orm import Session
+
+from src.counters import reconcile_counters
+
+TOMORROW = (date.today() + timedelta(days=1)).isoformat()
+LATER = (date.today() + timedelta(days=2)).isoformat()
+
+
+def test_counters_match_reconcile_after_every_write_path(testapp, engine, clinic, book):
+    first = book(TOMORROW, '09:00').json['appointment_id']
+    second = book(TOMORROW, '10:00').json['appointment_id']
+    testapp.put_json('/api/appointments/edit', {'appointment_id': first, 'status': 'confirmed'})
+    testapp.put_json('/api/appointments/edit', {'appointment_id': second, 'status': 'cancelled'})
+    testapp.post_json('/api/medical-records/create', {'appointment_id': first, 'diagnosis': 'ISPA'})
+
+    base = {k: clinic[k] for k in ('patient_id', 'doctor_id')}
+    created = testapp.post_json('/api/appointments/bulk', {'appointments': [
+        dict(base, appointment_date=LATER, appointment_time=f'{9 + i:02d}:00') for i in range(3)
+    ]}).json['results']
+    testapp.put_json('/api/appointments/bulk', {'appointments': [
+        {'appointment_id': created[0]['appointment_id'], 'status': 'confirmed'},
+        {'appointment_id': created[1]['appointment_id'], 'appointment_date': TOMORROW, 'appointment_time': '11:00'},
+        {'appointment_id': created[2]['appointment_id'], 'status': 'cancelled'},
+    ]})
+
+    expected = {'pending': 1, 'confirmed': 1, 'completed': 1, 'cancelled': 2}
+    for url in (f'/api/stats/doctor/{clinic["doctor_id"]}', f'/api/stats/patient/{clinic["patient_id"]}'):
+        data = testapp.get(url).json['data']
+        assert data['counts'] == expected
+        assert data['total'] == 5
+        assert data['next_appointment']['appointment_time'] == '11:00:00'
+
+    # Sama dengan reconcile_counters --dry-run: tidak ada drift
+    with Session(bind=engine) as session:
+        assert reconcile_counters(session, fix=False) == []
+
+
+def test_stats_is_one_query(testapp, clinic, book, query_budget):
+    book(TOMORROW, '09:00')
+    with query_budget(1):
+        testapp.get(f'/api/stats/doctor/{clinic["doctor_id"]}')
+    with query_budget(1):
+        testapp.get(f'/api/stats/patient/{clinic["patient_id"]}')
+
+
+def test_stats_without_appointments(testapp, clinic):
+    data = testapp.get(f'/api/stats/doctor/{clinic["doctor_id"]}').json['data']
+    assert data['counts'] == {'pending': 0, 'confirmed': 0, 'completed': 0, 'cancelled': 0}
+    assert data['next_appointment'] is None
+
+    testapp.get('/api/stats/doctor/999', status=404)
+    testapp.get('/api/stats/patient/999', status=404)
+    testapp.get('/api/stats/patient/abc', status=400)
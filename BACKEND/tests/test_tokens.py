@@ -0,0 +1,28 @@
+import pytest
+
+from src.tokens import PUBLIC_PATHS
+
+
+@pytest.fixture
+def app_settings(app_settings):
+    return dict(app_settings, **{'auth.require_token': 'true'})
+
+
+@pytest.mark.parametrize('path', sorted(PUBLIC_PATHS - {'/api/auth/login', '/api/auth/register'}))
+def test_public_paths_without_token(testapp, path):
+    testapp.get(path, status=200)
+
+
+@pytest.mark.parametrize('suffix', ['queue', 'slots'])
+def test_doctor_subroutes_are_not_public(testapp, clinic, suffix):
+    url = f'/api/doctors/{clinic["doctor_id"]}/{suffix}'
+    assert testapp.get(url, status=401).json['error'] == 'Token wajib disertakan'
+
+
+def test_doctor_subroutes_with_token(testapp, clinic, login):
+    headers = {'Authorization': f'Bearer {login()}'}
+    testapp.get(f'/api/doctors/{clinic["doctor_id"]}/queue', headers=headers, status=200)
+
+
+def test_invalid_token_rejected(testapp):
+    testapp.get('/api/doctors', headers={'Authorization': 'Bearer a.b.c'}, status=401)
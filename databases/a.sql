@@ -9,6 +9,8 @@
 -- =====================================================
 -- DROP TABLE (AGAR BISA RE-RUN)
 -- =====================================================
+DROP TABLE IF EXISTS doctor_availability_exceptions CASCADE;
+DROP TABLE IF EXISTS doctor_availability CASCADE;
 DROP TABLE IF EXISTS medical_records CASCADE;
 DROP TABLE IF EXISTS appointments CASCADE;
 DROP TABLE IF EXISTS doctors CASCADE;
@@ -23,7 +25,8 @@ CREATE TABLE users (
     email VARCHAR(100) UNIQUE NOT NULL,
     password TEXT NOT NULL,
     role VARCHAR(20) NOT NULL CHECK (role IN ('patient', 'doctor')),
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
 -- =====================================================
@@ -35,6 +38,7 @@ CREATE TABLE doctors (
     specialization VARCHAR(100) NOT NULL,
     schedule TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT fk_doctor_user
         FOREIGN KEY (user_id)
         REFERENCES users(id)
@@ -52,6 +56,7 @@ CREATE TABLE appointments (
     appointment_time TIME NOT NULL,
     status VARCHAR(20) NOT NULL CHECK (status IN ('pending', 'confirmed', 'completed', 'cancelled')),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT fk_patient
         FOREIGN KEY (patient_id)
         REFERENCES users(id)
@@ -71,8 +76,66 @@ CREATE TABLE medical_records (
     diagnosis TEXT NOT NULL,
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT fk_appointment
         FOREIGN KEY (appointment_id)
         REFERENCES appointments(id)
         ON DELETE CASCADE
 );
+
+-- =====================================================
+-- DOCTOR AVAILABILITY (jam praktik mingguan, 0 = Senin)
+-- =====================================================
+CREATE TABLE doctor_availability (
+    id SERIAL PRIMARY KEY,
+    doctor_id INT NOT NULL,
+    weekday INT NOT NULL CHECK (weekday BETWEEN 0 AND 6),
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    slot_minutes INT NOT NULL DEFAULT 30 CHECK (slot_minutes > 0),
+    CHECK (end_time > start_time),
+    CONSTRAINT fk_availability_doctor
+        FOREIGN KEY (doctor_id)
+        REFERENCES doctors(id)
+        ON DELETE CASCADE
+);
+CREATE INDEX ix_doctor_availability_doctor_id ON doctor_availability (doctor_id);
+
+-- =====================================================
+-- DOCTOR AVAILABILITY EXCEPTIONS (libur / jam tambahan)
+-- =====================================================
+CREATE TABLE doctor_availability_exceptions (
+    id SERIAL PRIMARY KEY,
+    doctor_id INT NOT NULL,
+    exception_date DATE NOT NULL,
+    start_time TIME,
+    end_time TIME,
+    is_available BOOLEAN NOT NULL DEFAULT FALSE,
+    slot_minutes INT NOT NULL DEFAULT 30,
+    note TEXT,
+    CONSTRAINT fk_exception_doctor
+        FOREIGN KEY (doctor_id)
+        REFERENCES doctors(id)
+        ON DELETE CASCADE
+);
+CREATE INDEX ix_availability_exceptions_doctor_date ON doctor_availability_exceptions (doctor_id, exception_date);
+
+-- =====================================================
+-- INDEXES (sama dengan alembic 0001_appointment_indexes)
+-- =====================================================
+CREATE INDEX ix_appointments_doctor_date_time ON appointments (doctor_id, appointment_date, appointment_time);
+CREATE INDEX ix_appointments_patient_status_date ON appointments (patient_id, status, appointment_date);
+CREATE INDEX ix_appointments_created_at_id ON appointments (created_at, id);
+-- Satu slot dokter hanya untuk satu appointment aktif (alembic 0004_unique_active_slot)
+CREATE UNIQUE INDEX uq_appointments_doctor_slot ON appointments (doctor_id, appointment_date, appointment_time) WHERE status <> 'cancelled';
+
+-- =====================================================
+-- FULL-TEXT SEARCH REKAM MEDIS (alembic 0005_medical_record_search)
+-- =====================================================
+ALTER TABLE medical_records ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+    setweight(to_tsvector('indonesian', coalesce(diagnosis, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(diagnosis, '')), 'A') ||
+    setweight(to_tsvector('indonesian', coalesce(notes, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(notes, '')), 'B')
+) STORED;
+CREATE INDEX ix_medical_records_search ON medical_records USING gin (search_vector);